@@ -0,0 +1,72 @@
+"""Benchmark the startup time of simple commands, which is mostly spent importing.
+
+Run with `poetry run python -m benchmarks.cli_startup 10`.
+"""
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+DEFAULT_REPEATS = 10
+# Commands that don't read tables or talk to GitHub
+COMMANDS = [
+    ["--help"],
+    ["saved-token", "--verify"],
+    ["config", "--display-in"],
+    ["sql", "--help"],
+    ["js-fetch", "--help"],
+]
+SLOWEST_IMPORTS = 8
+
+
+def time_command(args: List[str], repeats: int) -> List[float]:
+    """Time a command in a new interpreter every time."""
+    elapsed = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, capture_output=True)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+def slowest_imports(args: List[str]) -> Dict[str, int]:
+    """Find the top-level imports taking the most microseconds with their imports."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Imports indented by their importer are counted in it
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return dict(sorted(imports.items(), key=lambda item: -item[1])[:SLOWEST_IMPORTS])
+
+
+def run(repeats: int):
+    """Time every simple command against an interpreter doing nothing."""
+    baseline = statistics.median(time_command([sys.executable, "-c", "pass"], repeats))
+    print(f"{'python -c pass':>28}: {baseline:.3f}s")
+    for command in COMMANDS:
+        elapsed = time_command(
+            [sys.executable, "-m", "gatortracer.cli", *command], repeats
+        )
+        print(
+            f"{' '.join(command):>28}: {statistics.median(elapsed):.3f}s median, "
+            f"{min(elapsed):.3f}s fastest"
+        )
+    print("slowest imports of saved-token --verify:")
+    for name, microseconds in slowest_imports(
+        ["-m", "gatortracer.cli", "saved-token", "--verify"]
+    ).items():
+        print(f"{name:>28}: {microseconds / 1e6:.3f}s")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS)
@@ -0,0 +1,542 @@
+"""A local stand-in of the GitHub api serving the repositories of fixtures.
+
+Run with `poetry run python -m benchmarks.fake_github fixtures --generate 100`
+and fetch from it with `gatortracer js-fetch --api-url http://127.0.0.1:8000 ...`.
+
+A fixture directory holds a directory per organization, a directory per repository
+in it and a directory per branch in that,
+e.g. `org-0/repo-0/insight/insight/insight-0.json`.
+The fixtures are read at every request, so changing a file pushes the repository.
+"""
+import argparse
+import base64
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+from benchmarks.synthetic import FILES_PER_REPO, synthetic_tree
+
+DEFAULT_PORT = 8000
+DEFAULT_RATE_LIMIT = 5000
+# GitHub resets the rate limit of a token every hour
+DEFAULT_RESET_SECONDS = 3600
+# GitHub cuts the listing of a recursive tree beyond this many entries
+DEFAULT_TREE_LIMIT = 100000
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+REPO_PATH = r"/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)"
+# Every endpoint JsonFetch uses, matched against the path of a request in order
+ROUTES = [
+    ("rate_limit", re.compile(r"/rate_limit")),
+    ("user", re.compile(r"/user")),
+    ("orgs", re.compile(r"/user/orgs")),
+    ("org", re.compile(r"/orgs/(?P<org>[^/]+)")),
+    ("repos", re.compile(r"/orgs/(?P<org>[^/]+)/repos")),
+    ("repo", re.compile(REPO_PATH)),
+    ("contents", re.compile(REPO_PATH + r"/contents(?:/(?P<path>.*))?")),
+    ("tree", re.compile(REPO_PATH + r"/git/trees/(?P<branch>.+)")),
+    ("blob", re.compile(REPO_PATH + r"/git/blobs/(?P<sha>[0-9a-f]{40})")),
+    ("ref", re.compile(REPO_PATH + r"/git/refs?/heads/(?P<branch>.+)")),
+]
+
+
+class FixtureError(Exception):
+    """A request for something missing from the fixtures."""
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """Serve the fixtures the way the GitHub api does, in a thread per request.
+
+    Every request waits for the latency before it is answered and counts against
+    the rate limit, except the conditional requests answered with 304 Not Modified.
+    Every response carries the rate limit headers of GitHub.
+    """
+
+    # pylint: disable = too-many-instance-attributes
+
+    daemon_threads = True
+
+    # pylint: disable = too-many-arguments
+    def __init__(
+        self,
+        fixture_dir: str,
+        port: int = 0,
+        latency: float = 0.0,
+        rate_limit: int = DEFAULT_RATE_LIMIT,
+        reset_seconds: float = DEFAULT_RESET_SECONDS,
+        tree_limit: int = DEFAULT_TREE_LIMIT,
+    ) -> None:
+        """Initialize FakeGitHub instance.
+
+        Args:
+            fixture_dir: the directory of organization directories
+            port: the port to listen on, any free port if 0
+            latency: the seconds every request waits before it is answered
+            rate_limit: the amount of requests allowed until the rate limit resets
+            reset_seconds: the seconds between the resets of rate limit
+            tree_limit: the amount of entries a recursive tree is truncated at
+        """
+        super().__init__(("127.0.0.1", port), FakeGitHubHandler)
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.reset_seconds = reset_seconds
+        self.tree_limit = tree_limit
+        self.lock = threading.Lock()
+        self.remaining = rate_limit
+        self.reset_time = time.time() + reset_seconds
+        # The amount of requests answered by every endpoint
+        self.requests: Counter = Counter()
+        self.bytes_sent = 0
+        # The blob sha of every fixture file, until the file changes
+        self.blob_shas: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Get the base url to create a GitHub client with."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> "FakeGitHub":
+        """Serve the requests in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        """Start serving in a thread."""
+        return self.start()
+
+    def __exit__(self, *_):
+        """Stop serving."""
+        self.stop()
+
+    def reset(self):
+        """Forget the counted requests and reset the rate limit."""
+        with self.lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+            self.remaining = self.rate_limit
+            self.reset_time = time.time() + self.reset_seconds
+
+    def spend_request(self) -> bool:
+        """Count a request against the rate limit, False if it is used up."""
+        with self.lock:
+            if time.time() >= self.reset_time:
+                self.remaining = self.rate_limit
+                self.reset_time = time.time() + self.reset_seconds
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def rate_limit_headers(self) -> Dict[str, str]:
+        """Get the rate limit headers GitHub sends with every response."""
+        with self.lock:
+            return {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.remaining),
+                "X-RateLimit-Used": str(self.rate_limit - self.remaining),
+                "X-RateLimit-Reset": str(int(self.reset_time)),
+                "X-RateLimit-Resource": "core",
+            }
+
+    def rate(self) -> Dict:
+        """Get the state of rate limit as the rate_limit endpoint describes it."""
+        with self.lock:
+            return {
+                "limit": self.rate_limit,
+                "remaining": self.remaining,
+                "reset": int(self.reset_time),
+                "used": self.rate_limit - self.remaining,
+            }
+
+    def blob_sha(self, file_path: Path) -> str:
+        """Compute the git blob sha of a fixture file, once until it changes."""
+        stat = file_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self.blob_shas.get(file_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        content = file_path.read_bytes()
+        sha = hashlib.sha1(f"blob {len(content)}\0".encode() + content).hexdigest()
+        self.blob_shas[file_path] = (version, sha)
+        return sha
+
+    def org_dir(self, org: str) -> Path:
+        """Get the directory of an organization."""
+        org_dir = self.fixture_dir / org
+        if not org_dir.is_dir():
+            raise FixtureError(f"No organization {org}")
+        return org_dir
+
+    def repo_dir(self, org: str, repo: str) -> Path:
+        """Get the directory of a repository."""
+        repo_dir = self.org_dir(org) / repo
+        if not repo_dir.is_dir():
+            raise FixtureError(f"No repository {org}/{repo}")
+        return repo_dir
+
+    def branch_dir(self, org: str, repo: str, branch: str) -> Path:
+        """Get the directory of a branch."""
+        branch_dir = self.repo_dir(org, repo) / branch
+        if not branch_dir.is_dir():
+            raise FixtureError(f"No branch {branch} in {org}/{repo}")
+        return branch_dir
+
+    def branch_files(self, branch_dir: Path) -> List[Path]:
+        """List all the files of a branch, nested ones included, in path order."""
+        return sorted(
+            (path for path in branch_dir.rglob("*") if path.is_file()),
+            key=lambda path: path.relative_to(branch_dir).as_posix(),
+        )
+
+    def head_sha(self, branch_dir: Path) -> str:
+        """Compute the head of a branch from its files, changing whenever one does."""
+        head = hashlib.sha1()
+        for path in self.branch_files(branch_dir):
+            head.update(path.relative_to(branch_dir).as_posix().encode())
+            head.update(self.blob_sha(path).encode())
+        return head.hexdigest()
+
+    def find_blob(self, repo_dir: Path, sha: str) -> bytes:
+        """Find the content of a blob in any branch of a repository."""
+        for path in repo_dir.rglob("*"):
+            if path.is_file() and self.blob_sha(path) == sha:
+                return path.read_bytes()
+        raise FixtureError(f"No blob {sha}")
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """Answer a request to the GitHub api from the fixtures of server."""
+
+    server: FakeGitHub
+    # Keep the connection open between requests like GitHub does
+    protocol_version = "HTTP/1.1"
+    # Send the headers and the body at once instead of waiting for an acknowledgement
+    disable_nagle_algorithm = True
+
+    def log_message(self, *_):  # pylint: disable = arguments-differ
+        """Don't log every request."""
+
+    def do_GET(self):  # pylint: disable = invalid-name
+        """Answer a GET request after the latency."""
+        time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        for endpoint, pattern in ROUTES:
+            match = pattern.fullmatch(url.path.rstrip("/") or "/")
+            if match is not None:
+                break
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"message": "Not Found"})
+            return
+        # The rate limit endpoint doesn't count against the rate limit
+        if endpoint != "rate_limit" and not self.server.spend_request():
+            self.send_json(
+                HTTPStatus.FORBIDDEN,
+                {"message": "API rate limit exceeded for user."},
+            )
+            return
+        with self.server.lock:
+            self.server.requests[endpoint] += 1
+        try:
+            params = {
+                name: unquote(value)
+                for name, value in match.groupdict().items()
+                if value
+            }
+            data, links = getattr(self, f"get_{endpoint}")(query=query, **params)
+        except FixtureError as error:
+            self.send_json(HTTPStatus.NOT_FOUND, {"message": str(error)})
+            return
+        self.send_json(HTTPStatus.OK, data, links)
+
+    def send_json(self, status: HTTPStatus, data, links: str = ""):
+        """Send data as json, or 304 Not Modified if the client has the same data."""
+        body = json.dumps(data).encode()
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        if status == HTTPStatus.OK and self.headers.get("If-None-Match") == etag:
+            # The request counted against the rate limit is given back
+            with self.server.lock:
+                self.server.remaining += 1
+            status, body = HTTPStatus.NOT_MODIFIED, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        if links:
+            self.send_header("Link", links)
+        for header, value in self.server.rate_limit_headers().items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def api_url(self, path: str, query: Optional[Dict] = None) -> str:
+        """Get the absolute url of an api path, as GitHub links objects."""
+        url = f"http://{self.headers.get('Host', '127.0.0.1')}{quote(path)}"
+        return f"{url}?{urlencode(query)}" if query else url
+
+    def paginate(self, path: str, query: Dict, items: List) -> Tuple[List, str]:
+        """Get a page of items and the Link header to the next and last pages."""
+        per_page = min(int(query.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = int(query.get("page", 1))
+        last_page = max(-(-len(items) // per_page), 1)
+        links = []
+        if page < last_page:
+            for rel, rel_page in [("next", page + 1), ("last", last_page)]:
+                page_url = self.api_url(
+                    path, {**query, "page": rel_page, "per_page": per_page}
+                )
+                links.append(f'<{page_url}>; rel="{rel}"')
+        return items[(page - 1) * per_page : page * per_page], ", ".join(links)
+
+    def org_json(self, org: str) -> Dict:
+        """Describe an organization."""
+        return {
+            "login": org,
+            "id": int(hashlib.sha1(org.encode()).hexdigest()[:8], 16),
+            "url": self.api_url(f"/orgs/{org}"),
+            "repos_url": self.api_url(f"/orgs/{org}/repos"),
+        }
+
+    def repo_json(self, org: str, repo: str) -> Dict:
+        """Describe a repository, pushed when any of its files last changed."""
+        repo_dir = self.server.repo_dir(org, repo)
+        pushed_at = max(
+            (path.stat().st_mtime for path in repo_dir.rglob("*")),
+            default=repo_dir.stat().st_mtime,
+        )
+        return {
+            "name": repo,
+            "full_name": f"{org}/{repo}",
+            "owner": self.org_json(org),
+            "private": True,
+            "url": self.api_url(f"/repos/{org}/{repo}"),
+            "pushed_at": datetime.fromtimestamp(pushed_at, timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            ),
+        }
+
+    def content_json(self, org: str, repo: str, branch: str, path: Path) -> Dict:
+        """Describe a file or a directory of the contents api, without content."""
+        branch_dir = self.server.branch_dir(org, repo, branch)
+        relative_path = path.relative_to(branch_dir).as_posix()
+        is_file = path.is_file()
+        return {
+            "name": path.name,
+            "path": relative_path,
+            "type": "file" if is_file else "dir",
+            "size": path.stat().st_size if is_file else 0,
+            "sha": self.server.blob_sha(path)
+            if is_file
+            else hashlib.sha1(relative_path.encode()).hexdigest(),
+            "url": self.api_url(
+                f"/repos/{org}/{repo}/contents/{relative_path}", {"ref": branch}
+            ),
+        }
+
+    # pylint: disable = unused-argument
+    def get_rate_limit(self, query: Dict) -> Tuple[Dict, str]:
+        """Describe the state of rate limit."""
+        rate = self.server.rate()
+        return {
+            "resources": {"core": rate, "search": rate, "graphql": rate},
+            "rate": rate,
+        }, ""
+
+    def get_user(self, query: Dict) -> Tuple[Dict, str]:
+        """Describe the authenticated user."""
+        return {"login": "fake-user", "url": self.api_url("/user")}, ""
+
+    def get_orgs(self, query: Dict) -> Tuple[List, str]:
+        """List the organizations of the user."""
+        orgs = sorted(
+            path.name for path in self.server.fixture_dir.iterdir() if path.is_dir()
+        )
+        return self.paginate("/user/orgs", query, [self.org_json(org) for org in orgs])
+
+    def get_org(self, query: Dict, org: str) -> Tuple[Dict, str]:
+        """Describe an organization."""
+        self.server.org_dir(org)
+        return self.org_json(org), ""
+
+    def get_repos(self, query: Dict, org: str) -> Tuple[List, str]:
+        """List the repositories of an organization."""
+        repos = sorted(
+            path.name for path in self.server.org_dir(org).iterdir() if path.is_dir()
+        )
+        page, links = self.paginate(f"/orgs/{org}/repos", query, repos)
+        return [self.repo_json(org, repo) for repo in page], links
+
+    def get_repo(self, query: Dict, org: str, repo: str) -> Tuple[Dict, str]:
+        """Describe a repository."""
+        return self.repo_json(org, repo), ""
+
+    def get_contents(
+        self, query: Dict, org: str, repo: str, path: str = ""
+    ) -> Tuple[object, str]:
+        """List a directory, or describe a file with its base64 content."""
+        branch = query.get("ref", "main")
+        branch_dir = self.server.branch_dir(org, repo, branch)
+        content_path = branch_dir / path
+        if not content_path.exists() or branch_dir not in [
+            content_path,
+            *content_path.parents,
+        ]:
+            raise FixtureError(f"No {path} in {branch} of {org}/{repo}")
+        if content_path.is_dir():
+            return [
+                self.content_json(org, repo, branch, child)
+                for child in sorted(content_path.iterdir())
+            ], ""
+        return {
+            **self.content_json(org, repo, branch, content_path),
+            "content": base64.encodebytes(content_path.read_bytes()).decode(),
+            "encoding": "base64",
+        }, ""
+
+    def get_tree(
+        self, query: Dict, org: str, repo: str, branch: str
+    ) -> Tuple[Dict, str]:
+        """List a branch, recursively if asked, truncated beyond the tree limit."""
+        branch_dir = self.server.branch_dir(org, repo, branch)
+        paths = (
+            branch_dir.rglob("*") if query.get("recursive") else branch_dir.iterdir()
+        )
+        entries = []
+        for path in sorted(
+            paths, key=lambda path: path.relative_to(branch_dir).as_posix()
+        ):
+            is_file = path.is_file()
+            relative_path = path.relative_to(branch_dir).as_posix()
+            entries.append(
+                {
+                    "path": relative_path,
+                    "mode": "100644" if is_file else "040000",
+                    "type": "blob" if is_file else "tree",
+                    "sha": self.server.blob_sha(path)
+                    if is_file
+                    else hashlib.sha1(relative_path.encode()).hexdigest(),
+                    "size": path.stat().st_size if is_file else 0,
+                }
+            )
+        return {
+            "sha": self.server.head_sha(branch_dir),
+            "url": self.api_url(f"/repos/{org}/{repo}/git/trees/{branch}"),
+            "tree": entries[: self.server.tree_limit],
+            "truncated": len(entries) > self.server.tree_limit,
+        }, ""
+
+    def get_blob(self, query: Dict, org: str, repo: str, sha: str) -> Tuple[Dict, str]:
+        """Get the base64 content of a blob."""
+        content = self.server.find_blob(self.server.repo_dir(org, repo), sha)
+        return {
+            "sha": sha,
+            "size": len(content),
+            "url": self.api_url(f"/repos/{org}/{repo}/git/blobs/{sha}"),
+            "content": base64.encodebytes(content).decode(),
+            "encoding": "base64",
+        }, ""
+
+    def get_ref(
+        self, query: Dict, org: str, repo: str, branch: str
+    ) -> Tuple[Dict, str]:
+        """Describe the head of a branch."""
+        head = self.server.head_sha(self.server.branch_dir(org, repo, branch))
+        return {
+            "ref": f"refs/heads/{branch}",
+            "url": self.api_url(f"/repos/{org}/{repo}/git/refs/heads/{branch}"),
+            "object": {
+                "sha": head,
+                "type": "commit",
+                "url": self.api_url(f"/repos/{org}/{repo}/git/commits/{head}"),
+            },
+        }, ""
+
+
+def write_fixtures(
+    fixture_dir: str, tree: Dict, branch: str = "insight", directory: str = "insight"
+) -> int:
+    """Write a fetched tree of insights as fixtures, returning the amount of files.
+
+    Args:
+        fixture_dir: the directory to write the organization directories in
+        tree: the fetched tree, e.g. generated by synthetic_tree
+        branch: the branch of every repository
+        directory: the directory of insight files in the branch
+    """
+    file_amount = 0
+    for org in tree["organizations"]:
+        for repo in org["repositories"]:
+            insight_dir = Path(fixture_dir, org["org-name"], repo["repo-name"], branch)
+            insight_dir = insight_dir / directory
+            insight_dir.mkdir(parents=True, exist_ok=True)
+            for insight in repo["insights"]:
+                insight_path = insight_dir / f"{insight['file-name']}.json"
+                insight_path.write_text(insight["insight"], encoding="utf-8")
+                file_amount += 1
+    return file_amount
+
+
+def main():
+    """Serve a fixture directory until interrupted, generating the fixtures if asked."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "fixture_dir", help="The directory of organization directories."
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="The seconds of every request."
+    )
+    parser.add_argument("--rate-limit", type=int, default=DEFAULT_RATE_LIMIT)
+    parser.add_argument("--reset-seconds", type=float, default=DEFAULT_RESET_SECONDS)
+    parser.add_argument("--tree-limit", type=int, default=DEFAULT_TREE_LIMIT)
+    parser.add_argument(
+        "--generate",
+        type=int,
+        default=0,
+        help="Write this many synthetic repositories of insights first.",
+    )
+    args = parser.parse_args()
+    if args.generate:
+        tree = synthetic_tree(args.generate, FILES_PER_REPO)
+        file_amount = write_fixtures(args.fixture_dir, tree)
+        print(f"Wrote {file_amount} insight files to {args.fixture_dir}")
+    server = FakeGitHub(
+        args.fixture_dir,
+        args.port,
+        args.latency,
+        args.rate_limit,
+        args.reset_seconds,
+        args.tree_limit,
+    )
+    print(f"Serving {args.fixture_dir} at {server.url}")
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+    server.server_close()
+    print(dict(server.requests))
+
+
+if __name__ == "__main__":
+    main()
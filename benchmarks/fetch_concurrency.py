@@ -0,0 +1,132 @@
+"""Benchmark concurrent fetching of JsonFetch against a fake GitHub with latency.
+
+Run with `poetry run python -m benchmarks.fetch_concurrency 300 0.05`.
+"""
+# pylint: disable = too-few-public-methods
+import base64
+import contextlib
+import io
+import random
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.synthetic import synthetic_insight
+from gatortracer.blob_cache import BlobCache
+from gatortracer.json_fetch import JsonFetch
+
+DEFAULT_REPOS = 300
+DEFAULT_LATENCY = 0.05
+CONCURRENCIES = [1, 4, 8, 16]
+
+
+class FakeContentFile:
+    """A file of a directory listing."""
+
+    def __init__(self, name: str, content: str) -> None:
+        """Initialize FakeContentFile instance."""
+        self.name = name
+        self.type = "file"
+        self.sha = BlobCache.blob_sha(content)
+        self.content = base64.b64encode(content.encode("utf-8")).decode()
+
+
+class FakeRepository:
+    """A repository answering contents requests after some latency."""
+
+    def __init__(self, name: str, files: List[FakeContentFile], latency: float):
+        """Initialize FakeRepository instance."""
+        self.name = name
+        self.full_name = f"org/{name}"
+        self.files = files
+        self.latency = latency
+
+    def get_contents(self, _directory, ref):  # pylint: disable = unused-argument
+        """Return the directory listing after the latency of a request."""
+        time.sleep(self.latency)
+        return self.files
+
+
+class FakeOrganization:
+    """An organization of repositories."""
+
+    def __init__(self, repos: List[FakeRepository]) -> None:
+        """Initialize FakeOrganization instance."""
+        self.login = "org"
+        self.repos = repos
+
+    def get_repos(self):
+        """List the repositories."""
+        return self.repos
+
+
+class FakeGithub:
+    """A stand-in of github.Github serving one organization."""
+
+    rate_limiting = (5000, 5000)
+    rate_limiting_resettime = 0
+
+    def __init__(self, org: FakeOrganization) -> None:
+        """Initialize FakeGithub instance."""
+        self.org = org
+        self.repos: Dict[str, FakeRepository] = {
+            repo.full_name: repo for repo in org.repos
+        }
+
+    def get_user(self):
+        """Return the authenticated user, which is itself here."""
+        return self
+
+    def get_orgs(self):
+        """List the organizations of the user."""
+        return [self.org]
+
+    def get_repo(self, full_name: str, lazy: bool = False):  # pylint: disable = W0613
+        """Get a repository by its full name."""
+        return self.repos[full_name]
+
+
+def fake_org(repo_amount: int, latency: float) -> FakeOrganization:
+    """Build an organization whose repositories hold a few insight files each."""
+    rng = random.Random(0)
+    files = [
+        FakeContentFile(f"insight-{idx}.json", synthetic_insight(rng))
+        for idx in range(3)
+    ]
+    return FakeOrganization(
+        [FakeRepository(f"repo-{idx}", files, latency) for idx in range(repo_amount)]
+    )
+
+
+def run(repo_amount: int, latency: float):
+    """Time fetching all the repositories with every concurrency."""
+    org = fake_org(repo_amount, latency)
+
+    class FakeJsonFetch(JsonFetch):
+        """JsonFetch talking to the fake GitHub."""
+
+        def create_api(self):
+            return FakeGithub(org)
+
+    print(f"{repo_amount} repositories, {latency * 1000:.0f} ms per request")
+    print(f"{'concurrency':>12} {'seconds':>8}")
+    serial_matrix = None
+    for concurrency in CONCURRENCIES:
+        json_fetch = FakeJsonFetch("", (["org"], ["repo-"], [], []), concurrency)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            tree = json_fetch.get_insight_jsons("insight", "insight", ".")
+        elapsed = time.perf_counter() - start
+        with contextlib.redirect_stdout(io.StringIO()):
+            matrix = tree.to_flatten_matrix()
+        # Concurrent fetching keeps the order of repositories
+        serial_matrix = serial_matrix or matrix
+        assert matrix == serial_matrix
+        print(f"{concurrency:>12} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPOS,
+        float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY,
+    )
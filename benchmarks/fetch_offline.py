@@ -0,0 +1,91 @@
+"""Benchmark fetching through the GitHub client from the local stand-in of GitHub.
+
+Run with `poetry run python -m benchmarks.fetch_offline 50 0.02`.
+Every fetch strategy and concurrency is timed cold, with a warm cache
+and incrementally, counting the requests GitHub would have answered.
+"""
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from benchmarks.fake_github import FakeGitHub, write_fixtures
+from benchmarks.synthetic import synthetic_tree
+from gatortracer.blob_cache import BlobCache
+from gatortracer.json_fetch import FetchManifest, JsonFetch
+
+DEFAULT_REPOS = 50
+DEFAULT_LATENCY = 0.02
+CONCURRENCIES = [1, 8]
+# Every organization and repository, the same as an empty inclusion configuration
+INSTRUCTIONS: Tuple[List[str], ...] = ([".*"], [".*"], [], [])
+
+
+def fetch(
+    server: FakeGitHub,
+    strategy: str,
+    concurrency: int,
+    cache: Optional[BlobCache] = None,
+    manifest: Optional[FetchManifest] = None,
+) -> str:
+    """Fetch all the insights once, describing the time, files and requests it took."""
+    server.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        json_fetch = JsonFetch(
+            "fake-token",
+            INSTRUCTIONS,
+            concurrency,
+            manifest=manifest,
+            cache=cache,
+            strategy=strategy,
+            base_url=server.url,
+        )
+        start = time.perf_counter()
+        file_amount = 0
+        for _, repo_full_names, batch_files in json_fetch.iter_insight_batches(
+            "insight", "insight", "."
+        ):
+            file_amount += batch_files
+            if manifest is not None:
+                manifest.save(repo_full_names)
+        elapsed = time.perf_counter() - start
+    return (
+        f"{elapsed:>7.2f}s {file_amount:>6} files "
+        f"{sum(server.requests.values()):>6} requests"
+    )
+
+
+def run(repo_amount: int, latency: float):
+    """Time every fetch strategy and concurrency cold, cached and incrementally."""
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        file_amount = write_fixtures(fixture_dir, synthetic_tree(repo_amount))
+        print(f"{repo_amount} repositories, {file_amount} files, {latency}s latency")
+        with FakeGitHub(fixture_dir, latency=latency) as server:
+            for strategy in ["contents", "tree"]:
+                for concurrency in CONCURRENCIES:
+                    with tempfile.TemporaryDirectory() as work_dir:
+                        cache = BlobCache(Path(work_dir) / "cache")
+                        manifest = FetchManifest(Path(work_dir) / "manifest.json")
+                        label = f"{strategy:>8} x{concurrency:<2}"
+                        cold = fetch(server, strategy, concurrency)
+                        print(f"{label} cold:        {cold}")
+                        fetch(server, strategy, concurrency, cache)
+                        print(
+                            f"{label} cached:      "
+                            f"{fetch(server, strategy, concurrency, cache)}"
+                        )
+                        fetch(server, strategy, concurrency, manifest=manifest)
+                        print(
+                            f"{label} incremental: "
+                            f"{fetch(server, strategy, concurrency, manifest=manifest)}"
+                        )
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPOS,
+        float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_LATENCY,
+    )
@@ -0,0 +1,122 @@
+"""Benchmark the requests per repository of every fetch strategy of JsonFetch.
+
+Run with `poetry run python -m benchmarks.fetch_strategies 50 10`.
+"""
+# pylint: disable = too-few-public-methods
+import base64
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List
+
+from benchmarks.fetch_concurrency import FakeGithub, FakeOrganization, FakeRepository
+from benchmarks.synthetic import synthetic_insight
+from gatortracer.blob_cache import BlobCache
+from gatortracer.json_fetch import FETCH_STRATEGIES, JsonFetch
+
+DEFAULT_REPOS = 50
+DEFAULT_FILES = 10
+
+
+class ListedFile:
+    """A file of a directory listing, whose content costs a request as on GitHub."""
+
+    def __init__(self, repo: "CountingRepository", name: str, sha: str) -> None:
+        """Initialize ListedFile instance."""
+        self.repo = repo
+        self.name = name
+        self.type = "file"
+        self.sha = sha
+
+    @property
+    def content(self) -> str:
+        """Get the base64 content of the file."""
+        return self.repo.content_of(self.sha)
+
+
+class CountingRepository(FakeRepository):
+    """A repository counting the requests sent to it."""
+
+    def __init__(self, name: str, contents: List[str]) -> None:
+        """Initialize CountingRepository instance with its insight files."""
+        super().__init__(name, [], 0)
+        self.requests = 0
+        self.blobs = {
+            BlobCache.blob_sha(content): base64.b64encode(content.encode()).decode()
+            for content in contents
+        }
+
+    def content_of(self, sha: str) -> str:
+        """Get the base64 content of a blob, a request each time."""
+        self.requests += 1
+        return self.blobs[sha]
+
+    def get_contents(self, _directory, ref):  # pylint: disable = unused-argument
+        """List the directory."""
+        self.requests += 1
+        return [
+            ListedFile(self, f"insight-{idx}.json", sha)
+            for idx, sha in enumerate(self.blobs)
+        ]
+
+    def get_git_tree(self, _sha, recursive):  # pylint: disable = unused-argument
+        """List every file of the branch at once."""
+        self.requests += 1
+        elements = [SimpleNamespace(path="README.md", type="blob", sha="0")] + [
+            SimpleNamespace(path=f"insight/insight-{idx}.json", type="blob", sha=sha)
+            for idx, sha in enumerate(self.blobs)
+        ]
+        return SimpleNamespace(raw_data={}, tree=elements)
+
+    def get_git_blob(self, sha: str):
+        """Get a blob."""
+        return SimpleNamespace(content=self.content_of(sha))
+
+
+def run(repo_amount: int, file_amount: int):
+    """Count the requests of every strategy, with a cold and a warm cache."""
+    rng = random.Random(0)
+    repos = [
+        CountingRepository(
+            f"repo-{idx}", [synthetic_insight(rng) for _ in range(file_amount)]
+        )
+        for idx in range(repo_amount)
+    ]
+    org = FakeOrganization([*repos])
+
+    class FakeJsonFetch(JsonFetch):
+        """JsonFetch talking to the fake GitHub."""
+
+        def create_api(self):
+            return FakeGithub(org)
+
+    print(f"{repo_amount} repositories, {file_amount} insight files each")
+    print(f"{'strategy':>10} {'cache':>6} {'requests/repo':>14} {'seconds':>8}")
+    for strategy in FETCH_STRATEGIES:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for cache in ["cold", "warm"]:
+                for repo in repos:
+                    repo.requests = 0
+                json_fetch = FakeJsonFetch(
+                    "",
+                    (["org"], ["repo-"], [], []),
+                    cache=BlobCache(cache_dir),
+                    strategy=strategy,
+                )
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    json_fetch.get_insight_jsons("insight", "insight", ".")
+                elapsed = time.perf_counter() - start
+                requests = sum(repo.requests for repo in repos) / repo_amount
+                print(f"{strategy:>10} {cache:>6} {requests:>14.1f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPOS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FILES,
+    )
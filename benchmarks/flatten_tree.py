@@ -0,0 +1,75 @@
+"""Benchmark flattening a fetched tree of insights into a matrix.
+
+Run with `poetry run python -m benchmarks.flatten_tree 500 50`.
+"""
+import contextlib
+import copy
+import io
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.synthetic import synthetic_tree
+from gatortracer.json_fetch import TreeDict
+
+DEFAULT_REPOS = 500
+DEFAULT_INSIGHTS = 50
+
+
+def deepcopy_flatten(nested_dict: Dict) -> List[List]:
+    """Flatten the tree recursively, deep copying the values at every dictionary."""
+    rows = []
+    title = []
+
+    def flatten(root_dict, values):
+        keys_to_list = []
+        found_list = False
+        for k in root_dict:
+            if isinstance(root_dict[k], (str, int)):
+                values.append(root_dict[k])
+                if k not in title:
+                    title.append(k)
+            elif isinstance(root_dict[k], list) and all(
+                isinstance(sub, dict) for sub in root_dict[k]
+            ):
+                keys_to_list.append(k)
+                found_list = True
+        if not found_list:
+            rows.append(copy.deepcopy(values))
+        else:
+            for k in keys_to_list:
+                for sub_d in root_dict[k]:
+                    flatten(sub_d, copy.deepcopy(values))
+
+    flatten(nested_dict, [])
+    return [title] + rows
+
+
+def run(repo_amount: int, insight_amount: int):
+    """Time the recursive deepcopy flattener against TreeDict."""
+    nested_dict = synthetic_tree(repo_amount, insight_amount)
+    print(f"{repo_amount} repositories x {insight_amount} insights")
+
+    start = time.perf_counter()
+    expected = deepcopy_flatten(nested_dict)
+    print(f"recursive deepcopy: {time.perf_counter() - start:.3f} seconds")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        matrix = TreeDict(nested_dict).to_flatten_matrix()
+        matrix_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        columns = TreeDict(nested_dict).to_flatten_columns()
+        columns_elapsed = time.perf_counter() - start
+    print(f"iterative matrix:   {matrix_elapsed:.3f} seconds")
+    print(f"iterative columns:  {columns_elapsed:.3f} seconds")
+    assert matrix == expected
+    assert list(columns) == expected[0]
+    assert list(zip(*columns.values())) == [tuple(row) for row in expected[1:]]
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPOS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_INSIGHTS,
+    )
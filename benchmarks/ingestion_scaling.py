@@ -0,0 +1,34 @@
+"""Benchmark the scaling of TableManager.append_table_from_matrix.
+
+Run with `poetry run python -m benchmarks.ingestion_scaling 1000 10000 100000`,
+set WORKERS=4 to parse the insights with 4 processes.
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import TableManager
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def run(sizes: List[int], workers: int = 1):
+    """Time the ingestion of every size into an empty table directory."""
+    print(f"{'insight files':>14} {'seconds':>10} {'ms per 1k files':>16}")
+    for size in sizes:
+        matrix = synthetic_matrix(size)
+        with tempfile.TemporaryDirectory() as table_dir:
+            start = time.perf_counter()
+            TableManager(table_dir, workers=workers).append_table_from_matrix(matrix)
+            elapsed = time.perf_counter() - start
+        print(f"{size:>14} {elapsed:>10.2f} {elapsed / size * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    run(
+        [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES,
+        int(os.environ.get("WORKERS", "1")),
+    )
@@ -0,0 +1,59 @@
+"""Benchmark gluing insight reports to matching checks with with_report.
+
+Run with `poetry run python -m benchmarks.report_join 12000`.
+"""
+import contextlib
+import io
+import sys
+import tempfile
+import time
+
+import polars as pl
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import MAIN_TABLE_NAME, UID_VAR, TableManager
+
+# Enough reports for 10k passing checks of ConfirmFileExists
+DEFAULT_SIZE = 12000
+MIN_MATCHES = 10000
+
+
+def per_uid_reports(checks: pl.DataFrame, main_table: pl.DataFrame) -> pl.DataFrame:
+    """Glue reports to checks by filtering the main table once per uid."""
+    reports = pl.DataFrame()
+    for uid in checks[UID_VAR].to_list():
+        reports = pl.concat(
+            [reports, main_table.filter(pl.col(UID_VAR) == uid).drop(UID_VAR)],
+            how="vertical",
+        )
+    return pl.concat([checks, reports], how="horizontal")
+
+
+def run(size: int):
+    """Select all the failing checks of a check table with and without reports."""
+    with tempfile.TemporaryDirectory() as table_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            TableManager(table_dir).append_table_from_matrix(synthetic_matrix(size))
+        table_manager = TableManager(table_dir)
+        checks = table_manager.get_checks_by_attribute_one_table(
+            "status", "true", table="ConfirmFileExists"
+        )
+        print(f"{checks.height} matching checks, {size} insight reports")
+        assert (
+            checks.height >= MIN_MATCHES
+        ), f"Only {checks.height} matching checks, benchmark at least {MIN_MATCHES}"
+
+        start = time.perf_counter()
+        joined = table_manager.get_checks_by_attribute_one_table(
+            "status", "true", with_report=True, table="ConfirmFileExists"
+        )
+        print(f"join on uid:       {time.perf_counter() - start:.3f} seconds")
+
+        start = time.perf_counter()
+        looped = per_uid_reports(checks, table_manager.get_table(MAIN_TABLE_NAME))
+        print(f"filter per uid:    {time.perf_counter() - start:.3f} seconds")
+        assert joined.frame_equal(looped.select(joined.columns))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
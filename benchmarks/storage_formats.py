@@ -0,0 +1,83 @@
+"""Compare reopening time, query time and disk size of the table storages.
+
+Run with `poetry run python -m benchmarks.storage_formats 20000`.
+Opening only finds the tables, a query of one check table reads that table
+and loading reads every table, as a query across all the check tables does.
+"""
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import TableManager
+from gatortracer.table_storage import STORAGES, convert_table_dir
+
+DEFAULT_SIZE = 20000
+REPEATS = 5
+QUERIED_TABLE = "ConfirmFileExists"
+
+
+def dir_size(path: Path) -> int:
+    """Sum the size of all the files under a directory."""
+    return sum(file.stat().st_size for file in path.glob("**/*") if file.is_file())
+
+
+def open_tables(table_dir: Path) -> TableManager:
+    """Open the tables without reading them."""
+    return TableManager(str(table_dir))
+
+
+def query_table(table_dir: Path) -> int:
+    """Open the tables and select the passing checks of one check table."""
+    return (
+        TableManager(str(table_dir))
+        .get_checks_by_attribute_one_table("status", "true", table=QUERIED_TABLE)
+        .height
+    )
+
+
+def load_tables(table_dir: Path) -> int:
+    """Open the tables and read every one of them."""
+    table_manager = TableManager(str(table_dir))
+    return sum(table.df.height for table in table_manager.tables.values())
+
+
+def time_repeats(func: Callable[[Path], object], table_dir: Path) -> float:
+    """Time a function of the tables, on average of REPEATS runs."""
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func(table_dir)
+    return (time.perf_counter() - start) / REPEATS
+
+
+def run(size: int):
+    """Build csv tables, convert them to every storage and time reopening them."""
+    with tempfile.TemporaryDirectory() as root:
+        csv_dir = Path(root) / "csv"
+        with contextlib.redirect_stdout(io.StringIO()):
+            TableManager(str(csv_dir)).append_table_from_matrix(synthetic_matrix(size))
+        print(
+            f"{'format':>8} {'open seconds':>13} {'query seconds':>14} "
+            f"{'load seconds':>13} {'size in KiB':>12}"
+        )
+        for name, storage in STORAGES.items():
+            table_dir = Path(root) / name
+            if name != "csv":
+                convert_table_dir(csv_dir, table_dir, storage)
+            # Every format holds the same rows
+            assert load_tables(table_dir) == load_tables(csv_dir)
+            assert query_table(table_dir) == query_table(csv_dir)
+            print(
+                f"{name:>8} {time_repeats(open_tables, table_dir):>13.4f} "
+                f"{time_repeats(query_table, table_dir):>14.4f} "
+                f"{time_repeats(load_tables, table_dir):>13.4f} "
+                f"{dir_size(table_dir) / 1024:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,167 @@
+"""Time and measure the memory of the main operations at several scales.
+
+Run with `poetry run python -m benchmarks.suite 1000 10000 > results.json`.
+The results are written as json to compare versions, with a summary on stderr.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import polars as pl
+
+from benchmarks.synthetic import FILES_PER_REPO, synthetic_tree
+from gatortracer.check_tables import TableManager, TableManagerHelper
+from gatortracer.json_fetch import TreeDict
+
+DEFAULT_SIZES = [1000, 10000]
+LOOKUPS = 20
+# How often the resident memory is sampled while an operation runs
+SAMPLE_INTERVAL = 0.005
+
+
+class MemorySampler:
+    """Sample the resident memory of this process in a thread to find its peak."""
+
+    def __init__(self) -> None:
+        """Initialize MemorySampler instance."""
+        self.peak = 0
+        self.running = False
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    @staticmethod
+    def resident_memory() -> int:
+        """Get the resident memory of this process in bytes, 0 if it isn't known."""
+        try:
+            with open("/proc/self/statm", encoding="utf-8") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return 0
+
+    def sample(self):
+        """Keep the largest resident memory until stopped."""
+        while self.running:
+            self.peak = max(self.peak, MemorySampler.resident_memory())
+            time.sleep(SAMPLE_INTERVAL)
+
+    def __enter__(self):
+        """Start sampling the resident memory."""
+        self.peak = MemorySampler.resident_memory()
+        self.running = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_):
+        """Stop sampling and keep the resident memory at exit if it is the largest."""
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, MemorySampler.resident_memory())
+
+
+def measure(operation: Callable, repeats: int = 1) -> Dict:
+    """Time an operation and find the peak resident memory while it runs."""
+    before = MemorySampler.resident_memory()
+    with MemorySampler() as sampler, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            operation()
+        elapsed = (time.perf_counter() - start) / repeats
+    return {
+        "seconds": round(elapsed, 6),
+        "peak_rss_bytes": sampler.peak,
+        "rss_growth_bytes": max(sampler.peak - before, 0),
+    }
+
+
+def run_scale(size: int) -> List[Dict]:
+    """Measure every operation on a corpus of size insight files."""
+    tree = synthetic_tree(-(-size // FILES_PER_REPO))
+    results = {}
+    results["to_flatten_matrix"] = measure(lambda: TreeDict(tree).to_flatten_matrix())
+    with contextlib.redirect_stdout(io.StringIO()):
+        matrix = pl.DataFrame(TreeDict(tree).to_flatten_columns())
+
+    with tempfile.TemporaryDirectory() as table_dir:
+        results["append_table_from_matrix"] = measure(
+            lambda: TableManager(table_dir).append_table_from_matrix(matrix)
+        )
+        # Opening the tables and reading every one of them
+        results["load_existing_tables"] = measure(
+            lambda: [
+                table.df
+                for table in TableManagerHelper.load_existing_tables(
+                    Path(table_dir)
+                ).values()
+            ]
+        )
+        table_manager = TableManager(table_dir)
+        uids = table_manager.get_table()["uid"].to_list()
+        wanted_uids = random.Random(0).choices(uids, k=LOOKUPS)
+        uid_iter = iter(wanted_uids)
+        results["select_checks_by_uid"] = measure(
+            lambda: table_manager.select_checks_by_uid(next(uid_iter)), LOOKUPS
+        )
+        results["get_checks_by_attribute_across_tables"] = measure(
+            lambda: TableManager(table_dir).get_checks_by_attribute_across_tables(
+                "status", "false", with_report=True
+            )
+        )
+    return [
+        {"operation": operation, "files": size, "rows": matrix.height, **result}
+        for operation, result in results.items()
+    ]
+
+
+def environment() -> Dict:
+    """Describe the version of this tool and the machine the results come from."""
+    try:
+        version = metadata.version("gatortracer")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "gatortracer": version,
+        "commit": commit,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(sizes: List[int]):
+    """Measure every operation at every scale and write the results as json."""
+    results = []
+    for size in sizes:
+        for result in run_scale(size):
+            print(
+                f"{result['operation']:>38} {size:>8} files "
+                f"{result['seconds']:>10.4f}s "
+                f"{result['peak_rss_bytes'] / 1024**2:>8.1f}MB",
+                file=sys.stderr,
+            )
+            results.append(result)
+    json.dump({"environment": environment(), "results": results}, sys.stdout, indent=1)
+    print()
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,178 @@
+"""Seeded generator of GatorGrader-style insight json(s) and fetched trees.
+
+A tree is in the shape JsonFetch fetches, so it is fed straight into TreeDict,
+and the same seed always generates the same corpus.
+"""
+import contextlib
+import io
+import json
+import random
+from typing import Any, Callable, Dict, Optional
+
+import polars as pl
+
+from gatortracer.json_fetch import TreeDict
+
+PATHS = ["fibonacci.py", "reflection.md", "README.md", "tests/test_fibonacci.py"]
+COMMANDS = ["poetry run task lint", "poetry run task test", "poetry run task mypy"]
+FRAGMENTS = ["def ", "append(", "TODO", "Add Your Name Here"]
+OBJECTIVES = ["lint", "test", "documentation", "", None]
+# The options of every check type, in the order GatorGrader writes them
+CHECK_OPTIONS: Dict[str, Callable[[random.Random], Dict]] = {
+    "Command": lambda rng: {"command": rng.choice(COMMANDS)},
+    "ConfirmFileExists": lambda rng: {"path": rng.choice(PATHS)},
+    "CountCommits": lambda rng: {"count": rng.randint(1, 20)},
+    "CountCommandOutput": lambda rng: {
+        "command": rng.choice(COMMANDS),
+        "count": rng.randint(0, 10),
+        "exact": rng.random() > 0.5,
+    },
+    "CountFileWords": lambda rng: {
+        "path": rng.choice(PATHS),
+        "count": rng.randint(50, 500),
+        "exact": False,
+    },
+    "CountMarkdownTags": lambda rng: {
+        "tag": rng.choice(["heading", "code", "link"]),
+        "count": rng.randint(1, 10),
+        "exact": False,
+        "path": "README.md",
+    },
+    "CountSingleLineComments": lambda rng: {
+        "language": "Python",
+        "count": rng.randint(1, 20),
+        "exact": False,
+        "path": rng.choice(PATHS),
+    },
+    "MatchCommandFragment": lambda rng: {
+        "command": rng.choice(COMMANDS),
+        "fragment": rng.choice(FRAGMENTS),
+        "count": rng.randint(0, 3),
+        "exact": rng.random() > 0.5,
+    },
+    "MatchFileFragment": lambda rng: {
+        "fragment": rng.choice(FRAGMENTS),
+        "count": rng.randint(0, 3),
+        "exact": rng.random() > 0.5,
+        "path": rng.choice(PATHS),
+    },
+}
+# How often a check is of every check type
+DEFAULT_CHECK_MIX = {
+    "Command": 3,
+    "ConfirmFileExists": 2,
+    "CountCommits": 1,
+    "CountCommandOutput": 1,
+    "CountFileWords": 2,
+    "CountMarkdownTags": 1,
+    "CountSingleLineComments": 1,
+    "MatchCommandFragment": 1,
+    "MatchFileFragment": 3,
+}
+PASSING_RATE = 0.7
+FILES_PER_REPO = 50
+ORGS = 5
+
+
+def synthetic_check(rng: random.Random, check_type: str) -> Dict:
+    """Generate one check of a check type, with a diagnostic if it fails."""
+    status = rng.random() < PASSING_RATE
+    check: Dict[str, Any] = {
+        "description": f"Synthetic {check_type} check {rng.randint(0, 99)}"
+    }
+    # Commands are the only checks without a check type
+    if check_type != "Command":
+        check["check"] = check_type
+    check["status"] = status
+    check["options"] = CHECK_OPTIONS[check_type](rng)
+    if not status:
+        check["diagnostic"] = f"Found {rng.randint(0, 9)} item(s) while expecting more"
+    objective = rng.choice(OBJECTIVES)
+    if objective is not None:
+        check["objective"] = objective
+    return check
+
+
+def synthetic_insight(
+    rng: random.Random,
+    checks_per_file: int = 10,
+    check_mix: Optional[Dict[str, int]] = None,
+) -> str:
+    """Generate one GatorGrader-style insight json string.
+
+    Args:
+        rng: the random generator
+        checks_per_file: the amount of checks of the insight
+        check_mix: how often a check is of each check type, DEFAULT_CHECK_MIX by default
+    """
+    check_mix = check_mix or DEFAULT_CHECK_MIX
+    check_types = rng.choices(
+        list(check_mix), weights=list(check_mix.values()), k=checks_per_file
+    )
+    checks = [synthetic_check(rng, check_type) for check_type in check_types]
+    insight = {
+        "amount_correct": sum(check["status"] for check in checks),
+        "percentage_score": round(
+            100 * sum(check["status"] for check in checks) / max(len(checks), 1)
+        ),
+        "report_time": f"2023-07-{rng.randint(1, 28):02d} "
+        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        "checks": checks,
+    }
+    return json.dumps(insight)
+
+
+# pylint: disable = too-many-arguments
+def synthetic_tree(
+    repo_amount: int,
+    files_per_repo: int = FILES_PER_REPO,
+    checks_per_file: int = 10,
+    org_amount: int = ORGS,
+    check_mix: Optional[Dict[str, int]] = None,
+    seed: int = 0,
+) -> Dict:
+    """Generate a fetched tree of insight files, repositories spread over organizations.
+
+    Args:
+        repo_amount: the amount of repositories across all the organizations
+        files_per_repo: the amount of insight files of every repository
+        checks_per_file: the amount of checks of every insight file
+        org_amount: the amount of organizations
+        check_mix: how often a check is of each check type, DEFAULT_CHECK_MIX by default
+        seed: the seed of random generator
+    """
+    rng = random.Random(seed)
+    return {
+        "organizations": [
+            {
+                "org-name": f"org-{org_idx}",
+                "repositories": [
+                    {
+                        "repo-name": f"repo-{repo_idx}",
+                        "insights": [
+                            {
+                                "file-name": f"insight-{file_idx}",
+                                "insight": synthetic_insight(
+                                    rng, checks_per_file, check_mix
+                                ),
+                            }
+                            for file_idx in range(files_per_repo)
+                        ],
+                    }
+                    for repo_idx in range(org_idx, repo_amount, org_amount)
+                ],
+            }
+            for org_idx in range(org_amount)
+        ]
+    }
+
+
+def synthetic_matrix(
+    size: int, seed: int = 0, checks_per_file: int = 10
+) -> pl.DataFrame:
+    """Generate a matrix of size insight files as TreeDict flattens a fetched tree."""
+    repo_amount = -(-size // FILES_PER_REPO)
+    tree = synthetic_tree(repo_amount, checks_per_file=checks_per_file, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        columns = TreeDict(tree).to_flatten_columns()
+    return pl.DataFrame(columns).head(size)
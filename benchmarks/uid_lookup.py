@@ -0,0 +1,44 @@
+"""Benchmark looking up the checks of one insight report by uid.
+
+Run with `poetry run python -m benchmarks.uid_lookup 20000`.
+"""
+import contextlib
+import io
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import TableManager
+from gatortracer.table_storage import STORAGES
+
+DEFAULT_SIZE = 20000
+LOOKUPS = 20
+
+
+def run(size: int):
+    """Time uid lookups with and without the uid index for every storage."""
+    matrix = synthetic_matrix(size)
+    print(f"{'format':>8} {'indexed ms':>11} {'scanned ms':>11}")
+    for name in STORAGES:
+        with tempfile.TemporaryDirectory() as table_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                TableManager(table_dir, name).append_table_from_matrix(matrix)
+            uids = (
+                TableManager(table_dir).get_table()["uid"].to_list()[:: size // LOOKUPS]
+            )
+            timings = []
+            for with_index in [True, False]:
+                start = time.perf_counter()
+                for uid in uids:
+                    table_manager = TableManager(table_dir)
+                    if not with_index:
+                        table_manager.uid_index.index_path = table_manager.table_path
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        table_manager.select_checks_by_uid(uid)
+                timings.append((time.perf_counter() - start) / len(uids) * 1000)
+            print(f"{name:>8} {timings[0]:>11.2f} {timings[1]:>11.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
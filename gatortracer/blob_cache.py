@@ -0,0 +1,125 @@
+"""Local cache of the fetched json files."""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+ENCODING = "utf-8"
+# The least recently used files are evicted beyond this size
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+BLOBS_DIR = "blobs"
+LAST_FETCH_NAME = "last_fetch.json"
+
+
+class BlobCache:
+    """Content addressed cache of files, keyed by their git blob sha."""
+
+    def __init__(
+        self, cache_dir: Union[str, Path], size_limit: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        """Initialize BlobCache instance.
+
+        Args:
+            cache_dir: the directory of cache, usually the user cache directory
+            size_limit: the largest amount of bytes of cached files
+        """
+        self.cache_dir = Path(cache_dir)
+        self.blobs_dir = self.cache_dir / BLOBS_DIR
+        self.size_limit = size_limit
+        self.lock = threading.Lock()
+        # Size of all the cached files, computed when the first file is cached
+        self.total_size: Optional[int] = None
+
+    @staticmethod
+    def blob_sha(content: str) -> str:
+        """Compute the git blob sha of a file content, the same as GitHub does."""
+        content_bytes = content.encode(ENCODING)
+        header = f"blob {len(content_bytes)}\0".encode(ENCODING)
+        return hashlib.sha1(header + content_bytes).hexdigest()
+
+    def blob_path(self, sha: str) -> Path:
+        """Get the path of a cached file, spread over directories by the sha prefix."""
+        return self.blobs_dir / sha[:2] / sha
+
+    def get(self, sha: str) -> Optional[str]:
+        """Get the content of a cached file, None if it isn't cached."""
+        path = self.blob_path(sha)
+        try:
+            content = path.read_bytes().decode(ENCODING)
+            # Mark the file as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    def put(self, sha: str, content: str):
+        """Cache the content of a file, evicting the least recently used if full."""
+        path = self.blob_path(sha)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f".{sha}.{threading.get_ident()}.tmp")
+        temporary_path.write_bytes(content.encode(ENCODING))
+        os.replace(temporary_path, path)
+        with self.lock:
+            if self.total_size is None:
+                self.total_size = sum(size for _, size in self.cached_files().values())
+            else:
+                self.total_size += path.stat().st_size
+            if self.total_size > self.size_limit:
+                self.evict()
+
+    def cached_files(self) -> Dict[Path, tuple]:
+        """Get the last used time and size of every cached file."""
+        cached = {}
+        for path in self.blobs_dir.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            stat = path.stat()
+            cached[path] = (stat.st_mtime, stat.st_size)
+        return cached
+
+    def evict(self):
+        """Remove the least recently used files until the cache is within its size."""
+        cached = self.cached_files()
+        self.total_size = sum(size for _, size in cached.values())
+        for path, (_, size) in sorted(cached.items(), key=lambda item: item[1][0]):
+            if self.total_size <= self.size_limit:
+                break
+            path.unlink(missing_ok=True)
+            self.total_size -= size
+
+    @staticmethod
+    def to_blob_shas(files_dict: List[Dict]) -> List[Dict]:
+        """Replace the content of each fetched file with its blob sha."""
+        return [
+            {**file_dict, "insight": BlobCache.blob_sha(file_dict["insight"])}
+            for file_dict in files_dict
+        ]
+
+    def save_last_fetch(self, last_fetch: Dict):
+        """Remember the tree of the last fetch, holding the blob sha of each file."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / LAST_FETCH_NAME).write_text(
+            json.dumps(last_fetch), encoding=ENCODING
+        )
+
+    def load_last_fetch(self) -> Dict:
+        """Rebuild the tree of the last fetch from the cached files, without GitHub."""
+        last_fetch_path = self.cache_dir / LAST_FETCH_NAME
+        if not last_fetch_path.is_file():
+            raise FileNotFoundError(
+                "No fetch is cached, run subcommand `js-fetch` first."
+            )
+        out_dict = json.loads(last_fetch_path.read_text(encoding=ENCODING))
+        for org in out_dict["organizations"]:
+            for repo in org["repositories"]:
+                for insight in repo["insights"]:
+                    content = self.get(insight["insight"])
+                    if content is None:
+                        raise FileNotFoundError(
+                            f"{insight['file-name']} of {repo['repo-name']} was "
+                            "evicted from the cache, run subcommand `js-fetch` again."
+                        )
+                    insight["insight"] = content
+        return out_dict
@@ -1,76 +1,361 @@
 """Generate tables for each type of check plus a main table."""
-# pylint: disable = invalid-name, too-many-locals
+# pylint: disable = invalid-name, too-many-locals, too-many-lines
 import base64
 import hashlib
 import json
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple, Type, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import polars as pl
 import rich
 
+try:
+    # A faster json parser is used if installed, pip install gatortracer[fast]
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+from gatortracer.profiler import PROFILER
+from gatortracer.query import QueryError, QueryFilter
+from gatortracer.table_storage import (
+    CHECK_TABLES_DIR,
+    DEFAULT_STORAGE,
+    MAIN_TABLE_NAME,
+    METADATA_DIR,
+    PARTITION_PREFIX,
+    STORAGES,
+    FrameT,
+    Schema,
+    SchemaRegistry,
+    TableStorage,
+    detect_storage,
+    get_storage,
+)
+
 CHECK_KEY = "check"
 COMMAND_KEY = "command"
 CHECKS_LIST_KEY = "checks"
 UID_VAR = "uid"
-MAIN_TABLE_NAME = "MainTable"
-DTYPE_REF = {"str": pl.Utf8, "int": pl.Int64, "float": pl.Float64}
+CHECK_TYPE_VAR = "check type"
+UID_INDEX_SCHEMA = {
+    UID_VAR: pl.Utf8,
+    "table": pl.Utf8,
+    "file": pl.Utf8,
+    "offset": pl.Int64,
+    "length": pl.Int64,
+}
+STATUS_VAR = "status"
+ORG_VAR = "org-name"
+REPO_VAR = "repo-name"
+REPORT_TIME_VAR = "report_time"
+DAY_VAR = "day"
+FILE_VAR = "file-name"
+VERSION_VAR = "version"
+CONTENT_VAR = "content"
+REPORT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# The stable key of the snapshots of an insight report file
+HISTORY_KEYS = [ORG_VAR, REPO_VAR, FILE_VAR]
+HISTORY_SCHEMA: Schema = {
+    ORG_VAR: pl.Utf8,
+    REPO_VAR: pl.Utf8,
+    FILE_VAR: pl.Utf8,
+    REPORT_TIME_VAR: pl.Datetime("us"),
+    VERSION_VAR: pl.Int64,
+    UID_VAR: pl.Utf8,
+    # The hash of the insight file of a snapshot, null for tables of older versions
+    CONTENT_VAR: pl.Utf8,
+}
+# The keys every summary counts checks by
+SUMMARY_KEYS = {
+    "checks": [CHECK_TYPE_VAR, STATUS_VAR],
+    "repos": [ORG_VAR, REPO_VAR],
+    "days": [DAY_VAR, ORG_VAR, REPO_VAR],
+}
+
+
+class Table:
+    """A table stored with one of the storages, either as one file or as partitions."""
+
+    # pylint: disable = too-many-instance-attributes
+
+    # The columns telling rows apart, all the columns if None
+    unique_keys: Optional[List[str]] = None
+
+    def __init__(
+        self,
+        table_dir: Path,
+        table_name: str,
+        storage: TableStorage = DEFAULT_STORAGE,
+        partitioned: bool = False,
+    ) -> None:
+        """Initialize a Table instance.
+
+        Args:
+            table_dir: the directory where the table resides
+            table_name: the name of table file without extension
+            storage: the format in which the table is stored
+            partitioned: store a new table as a directory of append-only partitions,
+                an existing table keeps its layout
+        """
+        self.storage = storage
+        self.table_path = table_dir / f"{table_name}{storage.suffix}"
+        self.partition_dir = table_dir / table_name
+        self.partitioned = self.partition_dir.is_dir() or (
+            partitioned and not self.table_path.is_file()
+        )
+        self._df: Optional[pl.DataFrame] = None
+        # The partition name ("" for a single file table) and rows of the last write
+        self.last_written: Optional[Tuple[str, pl.DataFrame]] = None
+        # The rows the last update added to the table, none before any update
+        self.last_added = pl.DataFrame()
+        # The declared schema of the table, inferred from the files if None
+        self.schema: Optional[Schema] = None
+
+    @property
+    def df(self) -> pl.DataFrame:
+        """The dataframe of the table, read from the disk on first access."""
+        if self._df is None:
+            if self.partitioned:
+                self._df = self.scan().collect()
+            elif self.table_path.is_file():
+                self._df = self.conform(self.storage.read(self.table_path, self.schema))
+            else:
+                self._df = pl.DataFrame()
+        return self._df
+
+    @df.setter
+    def df(self, df: pl.DataFrame):
+        self._df = df
+
+    def reset(self):
+        """Forget the dataframe read from the disk so that it is read again."""
+        self._df = None
+
+    def exists(self) -> bool:
+        """Check if the table has been written to the disk."""
+        if self.partitioned:
+            return self.partition_dir.is_dir()
+        return self.table_path.is_file()
+
+    def lazy(self) -> pl.LazyFrame:
+        """Start a query on the table, reusing the dataframe if it is already read."""
+        if self._df is not None:
+            return self._df.lazy()
+        return self.scan()
+
+    def partitions(self) -> List[Path]:
+        """List the partition files of the table in the order they were written."""
+        if not self.partition_dir.is_dir():
+            return []
+        return sorted(
+            self.partition_dir.glob(f"{PARTITION_PREFIX}*{self.storage.suffix}")
+        )
+
+    def file_keys(self) -> List[str]:
+        """List the names of partitions, or "" for the file of a single file table."""
+        if self.partitioned:
+            return [partition.stem for partition in self.partitions()]
+        return [""] if self.table_path.is_file() else []
+
+    def file_path(self, file_key: str) -> Path:
+        """Get the path of a partition by its name, or the table file for ""."""
+        if not file_key:
+            return self.table_path
+        return self.partition_dir / f"{file_key}{self.storage.suffix}"
+
+    def scan(self) -> pl.LazyFrame:
+        """Lazily scan the table, across all the partitions if it is partitioned."""
+        if self.partitioned:
+            table_files = self.partitions()
+        else:
+            table_files = [self.table_path] if self.table_path.is_file() else []
+        if not table_files:
+            return pl.LazyFrame()
+        # Files conformed to the declared schema are concatenated without supercasting
+        return pl.concat(
+            [
+                self.conform(self.storage.scan(table_file, self.schema))
+                for table_file in table_files
+            ],
+            how="diagonal" if self.schema is None else "vertical",
+        )
+
+    def read_rows(self, file_key: str, offset: int, length: int) -> pl.DataFrame:
+        """Read a range of rows of a partition, or of the table file for ""."""
+        return self.conform(
+            self.storage.read_rows(
+                self.file_path(file_key), offset, length, self.schema
+            )
+        )
+
+    def conform(self, df: FrameT) -> FrameT:
+        """Cast and order the columns of a dataframe as the declared schema if any."""
+        if self.schema is None:
+            return df
+        return SchemaRegistry.conform(df, self.schema)
+
+    def select_rows_by_uids(self, uids: List[str]) -> pl.DataFrame:
+        """Select the rows of the table whose uid is one of uids with a single join."""
+        lf = self.lazy()
+        if UID_VAR not in lf.columns:
+            return pl.DataFrame()
+        wanted_uids = pl.LazyFrame({UID_VAR: pl.Series(uids, dtype=pl.Utf8)})
+        return lf.join(wanted_uids, on=UID_VAR, how="semi").collect()
+
+    def deduplicate(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Drop duplicated rows of the table."""
+        return df.unique()
+
+    def update(self, new_df: pl.DataFrame, uids: Optional[pl.Series] = None):
+        """Update the dataframe with a new dataframe.
+
+        Args:
+            new_df: the rows to add to the table
+            uids: only add the rows of these reports, e.g. the checks of the reports
+                just added to main table, by default the rows not in the table yet
+                or, for a partitioned table, the rows of the reports not in it yet
+        """
+        if self.partitioned:
+            return self.append_partition(new_df, uids)
+        existing_df = self.conform(self.df)
+        new_df = self.conform(self.storage.as_stored(new_df))
+        if uids is not None:
+            new_df = new_df.filter(pl.col(UID_VAR).is_in(uids))
+        self.last_added = self.select_added_rows(existing_df, new_df)
+        self.df = self.deduplicate(
+            pl.concat(
+                [existing_df, self.last_added],
+                how="diagonal" if self.schema is None else "vertical",
+            )
+        )
+        self.storage.write(self.df, self.table_path)
+        PROFILER.count("rows written", self.df.height)
+        self.last_written = ("", self.df)
+        return self
+
+    def select_added_rows(
+        self, existing_df: pl.DataFrame, new_df: pl.DataFrame
+    ) -> pl.DataFrame:
+        """Select the rows of a new dataframe neither in the table nor repeated."""
+        rows = pl.concat(
+            [existing_df, new_df],
+            how="diagonal" if self.schema is None else "vertical",
+        ).with_row_count()
+        keys = self.unique_keys or [col for col in rows.columns if col != "row_nr"]
+        return (
+            rows.unique(subset=keys, keep="first", maintain_order=True)
+            .filter(pl.col("row_nr") >= existing_df.height)
+            .drop("row_nr")
+        )
+
+    def append_partition(self, new_df: pl.DataFrame, uids: Optional[pl.Series] = None):
+        """Write the rows of a new dataframe to a new partition of the table.
+
+        Only the uid column of the existing partitions is read, the rows of
+        the reports whose uid is already in the table are skipped.
 
+        Args:
+            new_df: the rows to add to the table
+            uids: only write the rows of these reports instead,
+                e.g. the checks of the reports just appended to main table
+        """
+        new_df = self.deduplicate(self.conform(self.storage.as_stored(new_df)))
+        existing_table = self.scan()
+        if uids is not None:
+            new_df = new_df.filter(pl.col(UID_VAR).is_in(uids))
+        elif UID_VAR in existing_table.columns:
+            existing_uids = (
+                existing_table.select(pl.col(UID_VAR).unique()).collect().to_series()
+            )
+            new_df = new_df.filter(~pl.col(UID_VAR).is_in(existing_uids))
+        self.last_added = new_df
+        if new_df.is_empty():
+            self.last_written = None
+            return self
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        partition = self.new_partition_path()
+        self.storage.write(new_df, partition)
+        PROFILER.count("rows written", new_df.height)
+        self.last_written = (partition.stem, new_df)
+        if self._df is not None:
+            self._df = pl.concat([self.conform(self._df), new_df], how="diagonal")
+        return self
+
+    def compact(self):
+        """Merge all the partitions into one partition without duplicated rows."""
+        partitions = self.partitions()
+        if len(partitions) <= 1:
+            return self
+        self.df = self.deduplicate(self.scan().collect())
+        # The merged partition is written before the old ones are removed,
+        # so an interrupted compaction only leaves duplicates behind
+        merged_partition = self.new_partition_path()
+        self.storage.write(self.df, merged_partition)
+        PROFILER.count("rows written", self.df.height)
+        for partition in partitions:
+            partition.unlink()
+        self.last_written = (merged_partition.stem, self.df)
+        return self
 
-# ENHANCEMENT: Make a parent Table for check table and Main table
-class MainTable:
+    def new_partition_path(self) -> Path:
+        """Name a new partition after the time it is written at."""
+        written_at = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        partition_name = f"{PARTITION_PREFIX}{written_at}{self.storage.suffix}"
+        return self.partition_dir / partition_name
+
+
+class MainTable(Table):
     """insight report."""
 
-    def __init__(self, table_dir: Path) -> None:
+    unique_keys = [UID_VAR]
+
+    def __init__(
+        self,
+        table_dir: Path,
+        storage: TableStorage = DEFAULT_STORAGE,
+        partitioned: bool = False,
+    ) -> None:
         """Initialize a MainTable instance with a directory."""
-        self.main_table_path = table_dir / f"{MAIN_TABLE_NAME}.csv"
+        super().__init__(table_dir, MAIN_TABLE_NAME, storage, partitioned)
+        self.main_table_path = self.table_path
         self.table_place_holder = "deleteme"
-        self.df = (
-            pl.read_csv(self.main_table_path)
-            if self.main_table_path.is_file()
-            else pl.DataFrame()
-        )
-
-    def update(self, new_df: pl.DataFrame):
-        """Update the main dataframe with a new dataframe."""
-        # \n blank line breaks csv file, replace it with \t
-        new_df = new_df.with_columns(pl.col(pl.Utf8).str.replace_all("\n", "\t"))
-        self.df = pl.concat([self.df, new_df], how="diagonal").unique(subset=[UID_VAR])
-        self.df.write_csv(self.main_table_path)
-        return self
+
+    def deduplicate(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Drop the reports sharing the same uid."""
+        return df.unique(subset=[UID_VAR])
 
     def get_reports_by_uids(self, uids: List[str]):
         """Return a list of insight rows by uids."""
-        matchings = pl.DataFrame()
-        for uid in uids:
-            matchings = pl.concat([self.df.filter(pl.col(UID_VAR == uid)), matchings])
+        return self.select_rows_by_uids(uids)
 
-        return matchings
 
-
-class CheckTable:
+class CheckTable(Table):
     """Specific check."""
 
-    def __init__(self, table_dir: Path, check_type: str) -> None:
+    def __init__(
+        self,
+        table_dir: Path,
+        check_type: str,
+        storage: TableStorage = DEFAULT_STORAGE,
+        partitioned: bool = False,
+    ) -> None:
         """Initialize CheckTable instance.
-        
+
         Args:
             table_dir: the directory where certain check table resides
             check_type: The name of check file without extension
+            storage: the format in which the check table is stored
+            partitioned: store a new check table as append-only partitions
         """
-        self.check_table_path = (table_dir) / f"{check_type}.csv"
-        self.df = (
-            pl.read_csv(self.check_table_path)
-            if self.check_table_path.is_file()
-            else pl.DataFrame()
-        )
+        super().__init__(table_dir, check_type, storage, partitioned)
+        self.check_table_path = self.table_path
 
-    def update(self, new_df):
-        """Update the main dataframe with a new dataframe."""
-        self.df = pl.concat([self.df, new_df], how="diagonal").unique()
-        self.df.write_csv(self.check_table_path)
-        return self
+    def deduplicate(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Drop duplicated checks and keep the checks of one report in adjacent rows."""
+        return df.unique().sort(UID_VAR)
 
     def select_checks_by_uid(self, uid):
         """Select checks in the check table by uid."""
@@ -79,28 +364,505 @@ class CheckTable:
 
     def get_checks_by_uids(self, uids: List[str]):
         """Return a list of insight rows by uids."""
-        matchings = pl.DataFrame()
-        for uid in uids:
-            matchings = pl.concat([self.df.filter(pl.col(UID_VAR == uid)), matchings])
+        return self.select_rows_by_uids(uids)
+
+
+class UidIndex:
+    """Persistent index from the uid of a report to the rows of its checks.
 
-        return matchings
+    The index stores a row range per run of adjacent checks of a report in every
+    check table file. Checks are appended a report at a time, so a report mostly
+    has one range per file, while the rows of older tables may be in any order.
+    The index is always a memory mapped arrow ipc file sorted by uid,
+    so a lookup is a binary search whatever the format of tables is.
+    """
+
+    storage = STORAGES["ipc"]
+
+    def __init__(self, table_path: Path):
+        """Initialize UidIndex instance.
+
+        Args:
+            table_path: the path where main table reside
+        """
+        self.index_path = table_path / METADATA_DIR / f"uid_index{self.storage.suffix}"
+        self._df: Optional[pl.DataFrame] = None
+
+    @property
+    def df(self) -> pl.DataFrame:
+        """The dataframe of the index, read from the disk on first access."""
+        if self._df is None:
+            self._df = (
+                self.storage.read(self.index_path)
+                if self.exists()
+                else pl.DataFrame(schema=UID_INDEX_SCHEMA)
+            )
+        return self._df
+
+    def clear(self):
+        """Drop all the row ranges of the index."""
+        self._df = pl.DataFrame(schema=UID_INDEX_SCHEMA)
+
+    def exists(self) -> bool:
+        """Check if the index has been written to the disk."""
+        return self.index_path.is_file()
+
+    def record(self, table_name: str, table: Table):
+        """Index the rows of the last write of a check table."""
+        if table.last_written is None:
+            return
+        file_key, written_df = table.last_written
+        row_ranges = (
+            written_df.select(UID_VAR)
+            .with_row_count("offset")
+            .with_columns(
+                (pl.col(UID_VAR) != pl.col(UID_VAR).shift())
+                .fill_null(True)
+                .cumsum()
+                .alias("run")
+            )
+            .groupby("run", maintain_order=True)
+            .agg(
+                pl.col(UID_VAR).first(),
+                pl.col("offset").min(),
+                pl.count().alias("length"),
+            )
+            .select(
+                pl.col(UID_VAR).cast(pl.Utf8),
+                pl.lit(table_name).alias("table"),
+                pl.lit(file_key).alias("file"),
+                pl.col("offset").cast(pl.Int64),
+                pl.col("length").cast(pl.Int64),
+            )
+        )
+        # Drop the ranges of the rewritten file and of the files removed by compaction
+        kept_files = set(table.file_keys()) - {file_key}
+        kept_ranges = self.df.filter(
+            (pl.col("table") != table_name) | pl.col("file").is_in(list(kept_files))
+        )
+        self._df = pl.concat([kept_ranges, row_ranges])
+
+    def save(self):
+        """Write the index next to the tables."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._df = self.df.sort(UID_VAR)
+        self.storage.write(self._df, self.index_path)
+
+    def lookup(self, uid: str) -> pl.DataFrame:
+        """Find the row ranges of the checks of a report."""
+        index_df = self.storage.read(self.index_path)
+        wanted_uid = pl.Series([uid], dtype=pl.Utf8)
+        first = index_df[UID_VAR].search_sorted(wanted_uid, side="left")[0]
+        last = index_df[UID_VAR].search_sorted(wanted_uid, side="right")[0]
+        return index_df.slice(first, last - first)
+
+
+class History:
+    """Persistent index of the snapshots of every insight report file over time.
+
+    A report file is keyed by its organization, repository and file name, and each
+    report of the file stored in main table is a snapshot of it. The index is sorted
+    by the key, the report time and the version, which is the order snapshots were
+    stored in, so the latest snapshots are found without reading main table.
+    A snapshot without report time is taken as older than the ones with it.
+
+    The uid of a report only depends on its file, so a report file fetched again
+    with new content is given a uid of its own version, see version_uids.
+    """
+
+    storage = STORAGES["ipc"]
+
+    def __init__(self, table_path: Path):
+        """Initialize History instance.
+
+        Args:
+            table_path: the path where main table reside
+        """
+        self.index_path = table_path / METADATA_DIR / f"history{self.storage.suffix}"
+        self._df: Optional[pl.DataFrame] = None
+
+    @property
+    def df(self) -> pl.DataFrame:
+        """The dataframe of the index, read from the disk on first access."""
+        if self._df is None:
+            self._df = (
+                SchemaRegistry.conform(
+                    self.storage.read(self.index_path), HISTORY_SCHEMA
+                )
+                if self.exists()
+                else pl.DataFrame(schema=HISTORY_SCHEMA)
+            )
+        return self._df
+
+    def exists(self) -> bool:
+        """Check if the index has been written to the disk."""
+        return self.index_path.is_file()
+
+    def version_uids(
+        self, keys: pl.DataFrame, uids: pl.Series, contents: pl.Series
+    ) -> pl.Series:
+        """Give the reports of files fetched again with new content a uid of their own.
+
+        A report whose uid is already in main table is the latest stored snapshot of
+        its file if the content is the same, and takes its uid so that main table and
+        check tables drop it. Otherwise the report is the next version of its file,
+        whose uid hashes the uid with the amount of snapshots of the file. The content
+        of the snapshots of tables made by older versions is unknown, so their uid is
+        kept and the report is dropped as before.
+
+        Args:
+            keys: the organization, repository and file name of every report
+            uids: the uids of reports
+            contents: the hashes of the insight files of reports
+        """
+        stored_files = (
+            self.df.filter(pl.col(UID_VAR).is_in(uids))
+            .select(HISTORY_KEYS)
+            .unique()
+            .join(self.df, on=HISTORY_KEYS)
+            .groupby(HISTORY_KEYS)
+            .agg(
+                pl.col(CONTENT_VAR).sort_by(VERSION_VAR).last().alias("stored"),
+                pl.col(UID_VAR).sort_by(VERSION_VAR).last().alias("latest"),
+                pl.count().alias("snapshots"),
+            )
+        )
+        if stored_files.is_empty():
+            return uids
+        reports = (
+            keys.select([pl.col(col).cast(pl.Utf8) for col in HISTORY_KEYS])
+            .with_columns(uids.alias(UID_VAR), contents.alias(CONTENT_VAR))
+            .join(stored_files, on=HISTORY_KEYS, how="left")
+        )
+        stored = (
+            pl.col(UID_VAR).is_in(self.df[UID_VAR]) & pl.col("stored").is_not_null()
+        )
+        return reports.select(
+            pl.when(stored & (pl.col("stored") == pl.col(CONTENT_VAR)))
+            .then(pl.col("latest"))
+            .when(stored)
+            .then(
+                pl.concat_str(
+                    [pl.col(UID_VAR), pl.col("snapshots")], separator=" "
+                ).apply(TableManagerHelper.generate_uid, return_dtype=pl.Utf8)
+            )
+            .otherwise(pl.col(UID_VAR))
+            .alias(UID_VAR)
+        ).to_series()
+
+    def record(self, reports: pl.DataFrame, contents: Optional[pl.DataFrame] = None):
+        """Add the new reports of main table as the latest versions of their files.
+
+        Args:
+            reports: the reports added to main table
+            contents: the uid and the hash of the insight file of reports, if known
+        """
+        snapshots = reports.select(
+            [
+                pl.col(col).cast(pl.Utf8)
+                if col in reports.columns
+                else pl.lit(None, pl.Utf8).alias(col)
+                for col in HISTORY_KEYS
+            ]
+            + [
+                History.parse_report_time(reports),
+                (pl.int_range(0, pl.count()) + self.df.height)
+                .cast(pl.Int64)
+                .alias(VERSION_VAR),
+                pl.col(UID_VAR).cast(pl.Utf8),
+            ]
+        )
+        snapshots = (
+            snapshots.join(contents, on=UID_VAR, how="left")
+            if contents is not None
+            else snapshots.with_columns(pl.lit(None, pl.Utf8).alias(CONTENT_VAR))
+        )
+        self._df = pl.concat([self.df, snapshots]).sort(
+            HISTORY_KEYS + [REPORT_TIME_VAR, VERSION_VAR]
+        )
+
+    def rebuild(self, main_table: Table):
+        """Index all the reports of main table from scratch, in their stored order."""
+        self._df = pl.DataFrame(schema=HISTORY_SCHEMA)
+        if main_table.exists():
+            self.record(main_table.df)
+        self.save()
+
+    def save(self):
+        """Write the index next to the tables."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage.write(self.df, self.index_path)
+
+    def latest(self, keys: List[str], as_of: Optional[datetime] = None) -> pl.DataFrame:
+        """Find the latest snapshot of every key, reported no later than as_of if given.
+
+        Args:
+            keys: the columns snapshots are grouped by, e.g. HISTORY_KEYS for every
+                file or the organization and repository for every repository
+            as_of: the time of the snapshots to find
+        """
+        snapshots = self.df.lazy()
+        if as_of is not None:
+            snapshots = snapshots.filter(pl.col(REPORT_TIME_VAR) <= as_of)
+        return (
+            snapshots.groupby(keys, maintain_order=True)
+            .agg(pl.exclude(keys).sort_by([REPORT_TIME_VAR, VERSION_VAR]).last())
+            .select(list(HISTORY_SCHEMA))
+            .collect()
+        )
+
+    @staticmethod
+    def parse_report_time(reports: pl.DataFrame) -> pl.Expr:
+        """Get the report time of reports as datetime, null if it is missing."""
+        if REPORT_TIME_VAR not in reports.columns:
+            return pl.lit(None, pl.Datetime("us")).alias(REPORT_TIME_VAR)
+        if reports[REPORT_TIME_VAR].dtype == pl.Datetime:
+            return pl.col(REPORT_TIME_VAR).cast(pl.Datetime("us"))
+        return (
+            pl.col(REPORT_TIME_VAR)
+            .cast(pl.Utf8)
+            .str.to_datetime(format=REPORT_TIME_FORMAT, strict=False)
+            .cast(pl.Datetime("us"))
+        )
+
+
+class Summaries:
+    """Pass and fail counts of checks by check type, by repository and by day.
+
+    The summaries are small tables kept next to the tables and updated with the counts
+    of every new report, so they answer the usual questions without reading the tables.
+    """
+
+    storage = STORAGES["ipc"]
+
+    def __init__(self, table_path: Path):
+        """Initialize Summaries instance.
+
+        Args:
+            table_path: the path where main table reside
+        """
+        self.summaries_dir = table_path / METADATA_DIR / "summaries"
+
+    def summary_path(self, summary_name: str) -> Path:
+        """Get the path of a summary."""
+        return self.summaries_dir / f"{summary_name}{self.storage.suffix}"
+
+    def exists(self) -> bool:
+        """Check if all the summaries have been written to the disk."""
+        return all(self.summary_path(name).is_file() for name in SUMMARY_KEYS)
+
+    def read(self, summary_name: str) -> pl.DataFrame:
+        """Read a summary."""
+        if summary_name not in SUMMARY_KEYS:
+            raise ValueError(
+                f"No such a summary called {summary_name}, "
+                f"choose from {', '.join(SUMMARY_KEYS)}"
+            )
+        return self.storage.read(self.summary_path(summary_name))
+
+    def update(
+        self,
+        reports: pl.DataFrame,
+        checks: Dict[str, pl.DataFrame],
+        main_table: Table,
+    ):
+        """Add the counts of new reports and new checks to the summaries.
+
+        Args:
+            reports: the rows added to main table
+            checks: the rows added to every check table, also of earlier reports
+            main_table: the table of the reports stored before
+        """
+        statuses = Summaries.concat_statuses(checks)
+        # New checks of earlier reports are counted by their repository and day
+        earlier_uids = (
+            statuses.select(pl.col(UID_VAR).unique())
+            .join(reports.lazy().select(UID_VAR), on=UID_VAR, how="anti")
+            .collect()[UID_VAR]
+        )
+        earlier_reports = (
+            main_table.select_rows_by_uids(earlier_uids.to_list())
+            if earlier_uids.len()
+            else pl.DataFrame(schema={UID_VAR: pl.Utf8})
+        )
+        counts = Summaries.aggregate(reports.lazy(), statuses, earlier_reports.lazy())
+        for summary_name, new_counts in zip(
+            counts, pl.collect_all(list(counts.values()))
+        ):
+            if self.summary_path(summary_name).is_file():
+                new_counts = Summaries.merge(
+                    summary_name, self.read(summary_name), new_counts
+                )
+            self.write(summary_name, new_counts)
+
+    def rebuild(self, tables: Dict[str, Table]):
+        """Count all the reports and checks of tables from scratch."""
+        reports = (
+            tables[MAIN_TABLE_NAME].lazy()
+            if MAIN_TABLE_NAME in tables
+            else pl.LazyFrame(schema={UID_VAR: pl.Utf8})
+        )
+        checks = {
+            table_name: table.lazy()
+            for table_name, table in tables.items()
+            if table_name != MAIN_TABLE_NAME
+        }
+        counts = Summaries.aggregate(reports, Summaries.concat_statuses(checks))
+        for summary_name, summary in zip(counts, pl.collect_all(list(counts.values()))):
+            self.write(summary_name, summary)
+
+    def write(self, summary_name: str, summary: pl.DataFrame):
+        """Write a summary sorted by its keys."""
+        self.summaries_dir.mkdir(parents=True, exist_ok=True)
+        summary = summary.sort(SUMMARY_KEYS[summary_name], nulls_last=True)
+        self.storage.write(summary, self.summary_path(summary_name))
+
+    @staticmethod
+    def concat_statuses(checks: Dict[str, FrameT]) -> pl.LazyFrame:
+        """Get the type, the status and the uid of the checks of every check table."""
+        statuses = [
+            pl.LazyFrame(
+                schema={CHECK_TYPE_VAR: pl.Utf8, STATUS_VAR: pl.Utf8, UID_VAR: pl.Utf8}
+            )
+        ]
+        for table_name, check_df in checks.items():
+            status = (
+                pl.col(STATUS_VAR).cast(pl.Utf8)
+                if STATUS_VAR in check_df.columns
+                else pl.lit(None, pl.Utf8).alias(STATUS_VAR)
+            )
+            statuses.append(
+                check_df.lazy().select(
+                    pl.lit(table_name).alias(CHECK_TYPE_VAR), status, pl.col(UID_VAR)
+                )
+            )
+        return pl.concat(statuses)
+
+    @staticmethod
+    def aggregate(
+        reports: pl.LazyFrame,
+        checks: pl.LazyFrame,
+        earlier_reports: Optional[pl.LazyFrame] = None,
+    ) -> Dict[str, pl.LazyFrame]:
+        """Build the queries counting the reports and checks of every summary.
+
+        Args:
+            reports: the reports to count
+            checks: the checks to count
+            earlier_reports: the reports of checks that are counted without their report
+        """
+        report_keys = [
+            Summaries.select_keys(reports).with_columns(pl.lit(1).alias("reports"))
+        ]
+        if earlier_reports is not None:
+            report_keys.append(
+                Summaries.select_keys(earlier_reports).with_columns(
+                    pl.lit(0).alias("reports")
+                )
+            )
+        status_counts = [
+            pl.count().alias("checks"),
+            (pl.col(STATUS_VAR) == "true").sum().alias("passed"),
+            (pl.col(STATUS_VAR) == "false").sum().alias("failed"),
+        ]
+        # Count the checks of every report first to join on uid only,
+        # as the keys of a summary may be null
+        checks_per_report = checks.groupby(UID_VAR).agg(status_counts)
+        reports_with_counts = pl.concat(report_keys).join(
+            checks_per_report, on=UID_VAR, how="left"
+        )
+        counts = {
+            "checks": checks.groupby(SUMMARY_KEYS["checks"]).agg(
+                pl.count().alias("checks")
+            )
+        }
+        for summary_name in ["repos", "days"]:
+            counts[summary_name] = reports_with_counts.groupby(
+                SUMMARY_KEYS[summary_name]
+            ).agg(
+                *[
+                    pl.col(col).sum()
+                    for col in ["reports", "checks", "passed", "failed"]
+                ],
+            )
+        return {
+            summary_name: summary.select(
+                pl.col(SUMMARY_KEYS[summary_name]),
+                pl.exclude(SUMMARY_KEYS[summary_name]).fill_null(0).cast(pl.Int64),
+            )
+            for summary_name, summary in counts.items()
+        }
+
+    @staticmethod
+    def select_keys(reports: pl.LazyFrame) -> pl.LazyFrame:
+        """Get the uid and the keys of summaries of reports, null if missing."""
+        return reports.select(
+            pl.col(UID_VAR),
+            *[
+                pl.col(col).cast(pl.Utf8)
+                if col in reports.columns
+                else pl.lit(None, pl.Utf8).alias(col)
+                for col in [ORG_VAR, REPO_VAR]
+            ],
+            # The day of report, e.g. 2023-07-07 of 2023-07-07 14:44:16
+            pl.col(REPORT_TIME_VAR).cast(pl.Utf8).str.slice(0, 10).alias(DAY_VAR)
+            if REPORT_TIME_VAR in reports.columns
+            else pl.lit(None, pl.Utf8).alias(DAY_VAR),
+        )
+
+    @staticmethod
+    def merge(
+        summary_name: str, summary: pl.DataFrame, new_counts: pl.DataFrame
+    ) -> pl.DataFrame:
+        """Add new counts to a summary."""
+        keys = SUMMARY_KEYS[summary_name]
+        return (
+            pl.concat([summary, new_counts])
+            .groupby(keys, maintain_order=True)
+            .agg(pl.exclude(keys).sum())
+        )
 
 
 class TableManager:
     """Table Manager associate Table classes."""
 
+    # pylint: disable = too-many-instance-attributes
+
     # pylint: disable = invalid-name
-    def __init__(self, table_path: str) -> None:
+    def __init__(
+        self,
+        table_path: str,
+        storage: str = "",
+        partitioned: bool = False,
+        workers: int = 1,
+    ) -> None:
         """Initialize Table Manager instance.
 
         Args:
             table_path: the path where main table reside
+            storage: the format of tables (csv, parquet or ipc),
+                detected from the existing tables and csv for new tables by default
+            partitioned: store new tables as directories of append-only partitions
+            workers: the amount of processes parsing the insights of a matrix
         """
         self.table_path = Path(table_path)
-        self.checks_dir = self.table_path / Path("CheckTables")
-        self.tables: Union[
-            MainTable, CheckTable
-        ] = TableManagerHelper.load_existing_tables(self.table_path)
+        self.partitioned = partitioned
+        self.workers = workers
+        self.checks_dir = self.table_path / Path(CHECK_TABLES_DIR)
+        self.storage = (
+            get_storage(storage)
+            if storage
+            else detect_storage(self.table_path) or DEFAULT_STORAGE
+        )
+        self.tables: Dict[str, Table] = TableManagerHelper.load_existing_tables(
+            self.table_path, self.storage
+        )
+        self.schemas = SchemaRegistry(self.table_path)
+        for table_name, table in self.tables.items():
+            table.schema = self.schemas.get(table_name)
+        self.uid_index = UidIndex(self.table_path)
+        self.summaries = Summaries(self.table_path)
+        self.history = History(self.table_path)
 
     def initialize_table_path(self):
         """Initialize directory in the file system."""
@@ -109,81 +871,213 @@ class TableManager:
         else:
             self.checks_dir.mkdir(parents=True)
 
-    def append_table_from_matrix(self, observations_w_header: pl.DataFrame):
-        """Append items into the target tables from a matrix where insights are not parsed yet."""
+    def append_table_from_matrix(
+        self,
+        observations_w_header: pl.DataFrame,
+        uid_padding: Optional[Set[str]] = None,
+    ):
+        """Append items into the target tables from a matrix of unparsed insights.
+
+        Args:
+            observations_w_header: the matrix of fetched insights
+            uid_padding: the columns added by the earlier matrices of the same fetch,
+                updated in place, so that a fetch stored in batches gets the same uids
+        """
         print("🚀 Adding new matrix to tables....")
         self.initialize_table_path()
-        row_amount = observations_w_header.height
         # Fetch all the insights and drop them from dataframe
         insights = observations_w_header["insight"]
         observations_without_insight = observations_w_header.drop(["insight"])
-        # iterate over each insight row as a single observation
-        for row_idx in range(row_amount):
-            # Fetch all the variables of one row without insight
-            # exclude index in row when generating uid as index misleads
-            row_variables = (
-                observations_without_insight.drop([""]).row(row_idx)
-                if "" in observations_without_insight.columns
-                else observations_without_insight.row(row_idx)
-            )
-            # Generate an unique string based on the information of one row
-            # To generate an uid
-            row_unique_string = " ".join(str(item) for item in row_variables)
-            uid = TableManagerHelper.generate_uid(row_unique_string)
-
-            # Store the uid in the main table
-            observations_without_insight = TableManagerHelper.update_value_in_df(
-                observations_without_insight, UID_VAR, row_idx, type(uid), uid
-            )
-
-            insight_dict = json.loads(insights[row_idx])
-            insight_metadata, insight_checks = TableManagerHelper.triage_checks(
-                insight_dict
-            )
-
-            # embed the insight metadata to the main dataframe
-            for insight_info, inf_value in insight_metadata.items():
-                observations_without_insight = TableManagerHelper.update_value_in_df(
-                    observations_without_insight,
-                    insight_info,
-                    row_idx,
-                    type(inf_value),
-                    inf_value,
-                )
-            # Append the check dicts of insight to name-based check tables
-            for check_type in insight_checks:
-                ct = CheckTable(self.checks_dir, check_type)
-                # Record CheckTable instance
-                self.tables[check_type] = ct
-                for one_check in insight_checks[check_type]:
-                    # replace all the line breaks
-                    for k in one_check:
-                        one_check[k] = (
-                            one_check[k].replace("\n", "\t")
-                            if isinstance(one_check[k], str)
-                            else one_check[k]
-                        )
+        # Parse all the insights in one batch, split over the workers
+        # Checks are grouped by check type in memory
+        # so that every check table is deduplicated and written only once
+        with PROFILER.stage("ingest.parse"):
+            insights_metadata, checks_by_type = TableManagerHelper.triage_matrix(
+                insights, self.workers
+            )
+        # Generate the uids of all the rows at once and store them in the main table
+        with PROFILER.stage("ingest.uids"):
+            uids = TableManagerHelper.generate_uids(
+                observations_without_insight, insights_metadata, uid_padding
+            )
+        mt = MainTable(self.table_path, self.storage, self.partitioned)
+        self.tables[MAIN_TABLE_NAME] = mt
+        # Tables written before summaries existed are summarized after the update
+        summarized = self.summaries.exists() or not mt.exists()
+        # A file fetched again with new content is stored as a new snapshot
+        with PROFILER.stage("ingest.history"):
+            self.initialize_history()
+            content_hashes = insights.apply(
+                TableManagerHelper.generate_uid, return_dtype=pl.Utf8
+            )
+            uids = self.history.version_uids(
+                observations_without_insight, uids, content_hashes
+            )
+            contents = pl.DataFrame(
+                {UID_VAR: uids, CONTENT_VAR: content_hashes}
+            ).unique(subset=[UID_VAR], keep="first", maintain_order=True)
+        observations_without_insight = observations_without_insight.with_columns(
+            uids.alias(UID_VAR)
+        )
+        # embed the insight metadata to the main dataframe as whole columns
+        observations_without_insight = TableManagerHelper.encode_nested(
+            TableManagerHelper.embed_metadata(
+                observations_without_insight, insights_metadata
+            )
+        )
+
+        # Declare the new columns of every check type before any table is written,
+        # so a table never has undeclared columns
+        check_dfs: Dict[str, pl.DataFrame] = {}
+        for check_type, check_df in checks_by_type.items():
+            ct = CheckTable(self.checks_dir, check_type, self.storage, self.partitioned)
+            # Record CheckTable instance
+            self.tables[check_type] = ct
+            # Replace the row of insight of every check with the uid of insight
+            check_dfs[check_type] = TableManagerHelper.encode_nested(
+                check_df.with_columns(uids.take(check_df[UID_VAR]).alias(UID_VAR))
+            )
+            self.declare_schema(check_type, check_dfs[check_type])
+        self.declare_schema(MAIN_TABLE_NAME, observations_without_insight)
+        self.schemas.save()
 
-                    # Add insight uid to the check
-                    one_check[UID_VAR] = uid
-                    ct.update(pl.DataFrame(one_check))
+        # Main table is written first, so checks are never stored without their report
         rich.print("MainTable: \n")
         print(observations_without_insight)
-        mt = MainTable(self.table_path)
-        self.tables[MAIN_TABLE_NAME] = mt
-        mt.update(observations_without_insight)
+        with PROFILER.stage(f"ingest.{MAIN_TABLE_NAME}"):
+            mt.update(observations_without_insight)
+        # Tables written before the uid index existed are indexed in full first,
+        # or the index would only know the check tables of this matrix
+        if not self.uid_index.exists():
+            with PROFILER.stage("ingest.uid_index"):
+                self.rebuild_uid_index()
+        # Checks are only added for the reports added to main table, whatever the
+        # layout, so a report and its checks always come from the same fetch
+        added_uids = mt.last_added[UID_VAR]
+        # Update each check table once
+        for check_type, check_df in check_dfs.items():
+            check_table = self.tables[check_type]
+            with PROFILER.stage(f"ingest.{check_type}"):
+                check_table.update(check_df, added_uids)
+                self.uid_index.record(check_type, check_table)
+        with PROFILER.stage("ingest.uid_index"):
+            self.uid_index.save()
+        with PROFILER.stage("ingest.summaries"):
+            if summarized:
+                # Only the rows added to every table are counted
+                self.summaries.update(
+                    mt.last_added,
+                    {
+                        check_type: self.tables[check_type].last_added
+                        for check_type in check_dfs
+                    },
+                    mt,
+                )
+            else:
+                self.summaries.rebuild(self.tables)
+        with PROFILER.stage("ingest.history"):
+            self.history.record(mt.last_added, contents)
+            self.history.save()
         rich.print(
             f"""[green] successfully updated or generated all the tables under path: {self.table_path}."""
         )
 
+    @PROFILER.timed("query.summary")
+    def get_summary(self, summary_name: str, where: str = "") -> pl.DataFrame:
+        """Get the counts of a summary, optionally filtered by an expression.
+
+        Args:
+            summary_name: the summary to get, one of checks, repos and days
+            where: a filter expression, e.g. repo-name ~ "fib.*"
+        """
+        # Tables written before summaries existed are summarized first
+        if not self.summaries.exists():
+            self.summaries.rebuild(self.tables)
+        summary = self.summaries.read(summary_name)
+        if where:
+            summary = summary.filter(QueryFilter(where).to_expr(summary.schema))
+        return summary
+
+    @PROFILER.timed("query.history")
+    def get_snapshots(
+        self, as_of: str = "", per_repo: bool = False, where: str = ""
+    ) -> pl.DataFrame:
+        """Get the reports of the latest snapshot of every report file or repository.
+
+        Args:
+            as_of: only the snapshots reported by this time, e.g. 2023-07-08 12:00:00
+            per_repo: get the latest snapshot of every repository instead of every file
+            where: a filter expression of the reports, e.g. repo-name ~ "fib.*"
+        """
+        self.initialize_history()
+        keys = [ORG_VAR, REPO_VAR] if per_repo else HISTORY_KEYS
+        query_filter = QueryFilter(where) if where else None
+        snapshots = self.history.latest(
+            keys, datetime.fromisoformat(as_of) if as_of else None
+        )
+        return self.read_snapshots(snapshots, query_filter)
+
+    @PROFILER.timed("query.history")
+    def get_history(self, where: str = "") -> pl.DataFrame:
+        """Get the reports of every snapshot, ordered by repository and report time.
+
+        Args:
+            where: a filter expression of the reports, e.g. repo-name ~ "fib.*"
+        """
+        self.initialize_history()
+        query_filter = QueryFilter(where) if where else None
+        snapshots = self.history.df.sort(
+            [ORG_VAR, REPO_VAR, REPORT_TIME_VAR, VERSION_VAR]
+        )
+        return self.read_snapshots(snapshots, query_filter)
+
+    def initialize_history(self):
+        """Index the snapshots of tables written before the history existed."""
+        if not self.history.exists():
+            self.history.rebuild(self.tables[MAIN_TABLE_NAME])
+
+    def read_snapshots(
+        self, snapshots: pl.DataFrame, query_filter: Optional[QueryFilter]
+    ) -> pl.DataFrame:
+        """Read the reports of snapshots from main table in the order of snapshots."""
+        # A filter of the keys only is applied to the index before main table is read
+        if query_filter is not None and query_filter.columns <= set(HISTORY_KEYS):
+            snapshots = snapshots.filter(query_filter.to_expr(snapshots.schema))
+            query_filter = None
+        mt = self.tables[MAIN_TABLE_NAME]
+        reports = mt.select_rows_by_uids(snapshots[UID_VAR].to_list())
+        if "" in reports.columns:
+            reports = reports.drop("")
+        reports = (
+            snapshots.select(UID_VAR)
+            .with_row_count("snapshot")
+            .join(reports, on=UID_VAR, how="inner")
+            .sort("snapshot")
+            .select(reports.columns)
+        )
+        if query_filter is not None:
+            reports = reports.filter(query_filter.to_expr(reports.schema))
+        return reports
+
+    def declare_schema(self, table_name: str, new_df: pl.DataFrame):
+        """Evolve the declared schema of a table with the rows about to be added."""
+        table = self.tables[table_name]
+        # Tables written before schemas were declared are declared as they are first
+        if self.schemas.get(table_name) is None and table.exists():
+            self.schemas.evolve(table_name, table.scan().schema)
+        table.schema = self.schemas.evolve(table_name, SchemaRegistry.observe(new_df))
+
+    @PROFILER.timed("query.select_checks_by_uid")
     def select_checks_by_uid(self, uid: str, save_csv: str = "") -> pl.DataFrame:
         """Select all the checks sharing the same uid."""
-        found_checks_df = pl.DataFrame()
-        for check_table in self.checks_dir.iterdir():
-            if check_table.is_file() and check_table.suffix == ".csv":
-                # check_table.stem is the file name without extension
-                ct = CheckTable(self.checks_dir, check_table.stem)
-                check_df = ct.select_checks_by_uid(uid)
+        found_checks_df = self.select_indexed_checks_by_uid(uid)
+        if found_checks_df is None:
+            # Scan every check table without the index
+            found_checks_df = pl.DataFrame()
+            for table_name, ct in self.tables.items():
+                if table_name == MAIN_TABLE_NAME:
+                    continue
+                check_df = ct.lazy().filter(pl.col(UID_VAR) == uid).collect()
                 found_checks_df = pl.concat(
                     [found_checks_df, check_df], how="diagonal"
                 ).unique()
@@ -193,10 +1087,72 @@ class TableManager:
             rich.print(f"[green] csv file has been saved in {save_csv}")
         return found_checks_df
 
+    def select_indexed_checks_by_uid(self, uid: str) -> Optional[pl.DataFrame]:
+        """Read only the rows of the checks of a report with the uid index.
+
+        Return None when there is no index or the index is outdated.
+        """
+        if not self.uid_index.exists():
+            return None
+        row_ranges = self.uid_index.lookup(uid)
+        check_dfs = []
+        for table_name, file_key, offset, length in row_ranges.select(
+            "table", "file", "offset", "length"
+        ).iter_rows():
+            if table_name not in self.tables:
+                return None
+            check_df = self.tables[table_name].read_rows(file_key, offset, length)
+            # Tables changed without updating the index
+            if check_df.height != length or (check_df[UID_VAR] != uid).any():
+                rich.print("[yellow] uid index is outdated, run `gatortracer reindex`")
+                return None
+            check_dfs.append(check_df)
+        if not check_dfs:
+            return pl.DataFrame()
+        return pl.concat(check_dfs, how="diagonal").unique()
+
+    def rebuild_uid_index(self):
+        """Index the rows of every check table file from scratch without rewriting."""
+        self.uid_index.clear()
+        for table_name, ct in self.tables.items():
+            if table_name == MAIN_TABLE_NAME:
+                continue
+            for file_key in ct.file_keys():
+                # Only the uid column is read
+                uids = (
+                    ct.storage.scan(ct.file_path(file_key), ct.schema)
+                    .select(pl.col(UID_VAR).cast(pl.Utf8))
+                    .collect()
+                )
+                ct.last_written = (file_key, uids)
+                self.uid_index.record(table_name, ct)
+            ct.last_written = None
+        self.uid_index.save()
+
+    @PROFILER.timed("query.select_checks")
     def get_checks_by_attribute_one_table(
         self, attribute: str, attribute_value, with_report=False, table="MainTable"
     ):
         """Get matching checks in a specific table."""
+        query = self.query_checks_by_attribute(attribute, attribute_value, table)
+        if query is None:
+            return pl.DataFrame()
+        matching_rows = query.collect()
+
+        # Concatenate the row of insight report with check rows
+        if with_report:
+            return TableManagerHelper.join_reports(
+                matching_rows, self.tables[MAIN_TABLE_NAME].lazy()
+            )
+        return matching_rows
+
+    def query_checks_by_attribute(
+        self, attribute: str, attribute_value, table="MainTable"
+    ) -> Optional[pl.LazyFrame]:
+        """Build the query of matching checks in a specific table without running it.
+
+        Return None if the table doesn't have the attribute.
+        """
         # Convert string to bool
         if attribute_value in ["True", "true"]:
             attribute_value = True
@@ -205,100 +1161,185 @@ class TableManager:
 
         if not isinstance(attribute, str):
             raise TypeError("Column name only accepts string type")
-        if table == MAIN_TABLE_NAME:
-            mt = self.tables[table]
-            df: pl.DataFrame = mt.df
-        else:
-            check_csv = self.checks_dir / f"{table}.csv"
-            # Check not found
-            if not check_csv.is_file():
-                raise ValueError(f"No such a check table called {table}")
-            ct = self.tables[table]
-            df: pl.DataFrame = ct.df
+        # Check not found
+        if table != MAIN_TABLE_NAME and table not in self.tables:
+            raise ValueError(f"No such a check table called {table}")
+        # Only the schema of the table is read until the query is collected
+        lf: pl.LazyFrame = self.tables[table].lazy()
 
         # Skip if column name not found to escape ColumnNotFoundError
-        if attribute not in df.columns:
-            return pl.DataFrame()
+        if attribute not in lf.columns:
+            return None
 
         # If column value is a string and the string is not purely numeric
         if isinstance(attribute_value, str) and not attribute_value.isnumeric():
             # Then match with regex
-            matching_rows = df.filter(pl.col(attribute).str.contains(attribute_value))
+            return lf.filter(pl.col(attribute).str.contains(attribute_value))
 
         # If column value is a numeric in string type
-        elif isinstance(attribute_value, str) and attribute_value.isnumeric():
+        if isinstance(attribute_value, str) and attribute_value.isnumeric():
             # Then Try best to convert data type to float
             attribute_value = float(attribute_value)
             # If the column is in the integer pattern e.x.: 5.00
             # Then convert it to integer
             if attribute_value.is_integer():
                 attribute_value = int(attribute_value)
-            matching_rows = df.filter(pl.col(attribute) == attribute_value)
-        else:
-            matching_rows = df.filter(pl.col(attribute) == attribute_value)
-
-        # Concatenate the row of insight report with check rows
-        if with_report:
-            # Use uid to find all the report rows in main table
-            main_table: pl.DataFrame = self.tables[MAIN_TABLE_NAME].df
-
-            # Drop the index column if exists one
-            main_table = main_table.drop("") if "" in main_table.columns else main_table
-            uids = matching_rows[UID_VAR].to_list()
-            reports = pl.DataFrame()
-            # Find the matching rows associated with uid
-            for uid in uids:
-                row_matching_uid = main_table.filter(pl.col(UID_VAR) == uid)
-                # Matching df should be one row, as uid is unique each row
-                if row_matching_uid.height != 1:
-                    raise ValueError(
-                        "more than one reports share the same unique identifier!"
-                    )
-
-                # record all the reports
-                # uid exists both main table and check table, drop one to avoid conflict
-                reports = pl.concat(
-                    [reports, row_matching_uid.drop(UID_VAR)], how="vertical"
-                )
-
-            # uid column exists both dataframes
-            matching_rows_w_reports = pl.concat(
-                [matching_rows, reports], how="horizontal"
-            )
-            return matching_rows_w_reports
-        return matching_rows
+        return lf.filter(pl.col(attribute) == attribute_value)
 
+    @PROFILER.timed("query.select_checks")
     def get_checks_by_attribute_across_tables(
         self, attribute: str, attribute_value, with_report=False
     ):
         """Get matching checks across tables.
 
+        The tables are queried in parallel and the matching checks concatenated once.
+
         Args:
             attribute: the attribute name. e.g.: status
             attribute_value: the selected attribute value associated with attribute. e.g.: True
             with_report: glue checks with its insight report file information
         """
-        check_type_col_name = "check type"
-        check_df = pl.DataFrame(
-            {
-                check_type_col_name: pl.Series([], dtype=pl.Utf8),
-            }
-        )
+        queries: Dict[str, pl.LazyFrame] = {}
         for table_name in self.tables:
-            checks_in_one_table = self.get_checks_by_attribute_one_table(
-                attribute, attribute_value, with_report=with_report, table=table_name
+            query = self.query_checks_by_attribute(
+                attribute, attribute_value, table=table_name
             )
+            if query is not None:
+                queries[table_name] = query
+        # Reports are read once for all the tables
+        main_table = (
+            self.tables[MAIN_TABLE_NAME].df.lazy()
+            if with_report and queries
+            else pl.LazyFrame()
+        )
+
+        check_dfs = [pl.DataFrame({CHECK_TYPE_VAR: pl.Series([], dtype=pl.Utf8)})]
+        for table_name, checks_in_one_table in zip(
+            queries, pl.collect_all(list(queries.values()))
+        ):
             # ignore empty dataframe
             if checks_in_one_table.is_empty():
                 continue
+            if with_report:
+                checks_in_one_table = TableManagerHelper.join_reports(
+                    checks_in_one_table, main_table
+                )
             # Tag check type to the df generated from on table
-            checks_in_one_table = checks_in_one_table.with_columns(
-                pl.lit(table_name).alias(check_type_col_name).cast(pl.Utf8)
+            check_dfs.append(
+                checks_in_one_table.with_columns(
+                    pl.lit(table_name).alias(CHECK_TYPE_VAR).cast(pl.Utf8)
+                )
             )
-
-            check_df = pl.concat([check_df, checks_in_one_table], how="diagonal")
         # all the matching checks across tables
-        return check_df
+        return pl.concat(check_dfs, how="diagonal")
+
+    @PROFILER.timed("query.select_checks")
+    def select_checks(
+        self,
+        where: str,
+        with_report: bool = False,
+        table_names: Optional[List[str]] = None,
+    ) -> pl.DataFrame:
+        """Select the checks matching a filter expression across check tables.
+
+        The filter may refer to the columns of reports, e.g. repo-name. The columns
+        a check table lacks are null in it, and a check table is skipped without
+        reading its data if no check can match the filter without those columns.
+        The other tables are queried in parallel. A check joined with its report must
+        have exactly one report in main table, as in join_reports.
+
+        Args:
+            where: the filter expression, e.g. status == false and repo-name ~ "fib.*"
+            with_report: glue checks with its insight report file information
+            table_names: the check tables to select checks from, all by default
+        """
+        query_filter = QueryFilter(where)
+        main_table = (
+            self.tables[MAIN_TABLE_NAME].lazy()
+            if MAIN_TABLE_NAME in self.tables
+            else pl.LazyFrame({UID_VAR: pl.Series([], dtype=pl.Utf8)})
+        )
+        # Drop the index column if exists one
+        if "" in main_table.columns:
+            main_table = main_table.drop("")
+        report_columns = set(main_table.columns)
+
+        queries = []
+        # Whether the checks of every query are joined with their reports
+        joined = []
+        known_columns = set(report_columns)
+        for table_name in table_names or self.tables:
+            if table_name == MAIN_TABLE_NAME:
+                continue
+            if table_name not in self.tables:
+                raise ValueError(f"No such a check table called {table_name}")
+            # Only the schema of the table is read until the queries are collected
+            lf = self.tables[table_name].lazy()
+            check_columns = lf.columns
+            known_columns.update(check_columns)
+            if not query_filter.can_match(set(check_columns) | report_columns):
+                continue
+            # Reports are joined before filtering if the filter refers to their columns
+            joined.append(
+                with_report
+                or bool((query_filter.columns - set(check_columns)) & report_columns)
+            )
+            if joined[-1]:
+                lf = lf.join(main_table, on=UID_VAR, how="left")
+            lf = lf.filter(query_filter.to_expr(lf.schema, missing_as_null=True))
+            if not with_report:
+                lf = lf.select(check_columns)
+            # Tag check type to the rows of every table
+            queries.append(
+                lf.select(pl.lit(table_name, pl.Utf8).alias(CHECK_TYPE_VAR), pl.all())
+            )
+
+        unknown_columns = query_filter.columns - known_columns
+        if unknown_columns:
+            raise QueryError(
+                f"Invalid filter {where!r}, no table has a column called "
+                f"{', '.join(sorted(unknown_columns))}"
+            )
+        check_dfs = pl.collect_all(queries)
+        # The selected checks must have exactly one report each, as in join_reports
+        joined_uids = [
+            df[UID_VAR] for df, is_joined in zip(check_dfs, joined) if is_joined
+        ]
+        if joined_uids:
+            TableManagerHelper.select_reports(pl.concat(joined_uids), main_table)
+        check_dfs = [df for df in check_dfs if not df.is_empty()]
+        if not check_dfs:
+            return pl.DataFrame({CHECK_TYPE_VAR: pl.Series([], dtype=pl.Utf8)})
+        return pl.concat(check_dfs, how="diagonal")
+
+    @PROFILER.timed("query.sql")
+    def sql(self, query: str) -> pl.DataFrame:
+        """Run a SQL query over the tables, where every table is named as it is stored.
+
+        The tables are scanned lazily, so only the columns and rows the query needs
+        are read, e.g. SELECT "repo-name", COUNT(*) AS failed FROM Command
+        JOIN MainTable ON Command.uid = MainTable.uid WHERE status = false
+        GROUP BY "repo-name"
+
+        Args:
+            query: the SQL query, column names with dashes or spaces are double quoted
+        """
+        context = pl.SQLContext(
+            {table_name: table.lazy() for table_name, table in self.tables.items()}
+        )
+        return context.execute(query).collect()
+
+    def compact(self):
+        """Merge the partitions of every partitioned table and drop duplicated rows."""
+        for table_name, table in self.tables.items():
+            partition_amount = len(table.partitions())
+            if partition_amount > 1:
+                table.compact()
+                print(f"Compacted {partition_amount} partitions of {table_name}")
+                if table_name != MAIN_TABLE_NAME:
+                    self.uid_index.record(table_name, table)
+        if self.uid_index.exists():
+            self.uid_index.save()
 
     def get_table(self, table_name=MAIN_TABLE_NAME):
         """Get a table dataframe."""
@@ -323,31 +1364,287 @@ class TableManagerHelper:
         return short_id
 
     @staticmethod
-    def load_existing_tables(path: Path) -> dict[str, MainTable]:
-        """Load tables to a dictionary of dataframe from a directory and its sub-directories."""
-        table_dir = {}
-        # Create a Path object for the directory
-
-        # Get a list of all files in the directory and its subdirectories
-        files_and_dirs = list(path.glob("**/*"))
-        # Filter out directories from the list
-        # Get table files
-        table_paths = [
-            file for file in files_and_dirs if file.is_file() and file.suffix == ".csv"
+    def generate_uids(
+        observations: pl.DataFrame,
+        insights_metadata: List[Dict],
+        added_columns: Optional[Set[str]] = None,
+    ) -> pl.Series:
+        """Generate the uids of all the rows of a matrix in one expression.
+
+        Uids used to be generated row by row while the uid column and the metadata
+        columns were added to the matrix, so every row after the first one also
+        hashed a "None" for each column added by the rows before it.
+        That padding is reproduced here to keep the existing uids valid.
+
+        Args:
+            observations: the matrix without insight column
+            insights_metadata: the file level information of insight of every row
+            added_columns: the columns added by the rows of earlier matrices,
+                updated in place to carry the padding over to the next matrix
+        """
+        # exclude index in row when generating uid as index misleads
+        uid_columns = [col for col in observations.columns if col != ""]
+        added_columns = set() if added_columns is None else added_columns
+        paddings = []
+        for metadata in insights_metadata:
+            paddings.append(" None" * len(added_columns))
+            # The uid column is added by the first row
+            added_columns.add(UID_VAR)
+            added_columns.update(metadata)
+            added_columns.difference_update(observations.columns)
+
+        # Match str() of python for the values of non-string columns
+        stringified_columns = [
+            pl.col(col).cast(pl.Utf8)
+            if observations[col].dtype in pl.INTEGER_DTYPES | {pl.Utf8}
+            else pl.col(col).apply(str, return_dtype=pl.Utf8)
+            for col in uid_columns
         ]
-        # Convert Path objects to string paths
-        table_dir_file_pairs = [(file.parent, file.stem) for file in table_paths]
-
-        for dir_file_pair in table_dir_file_pairs:
-            dir_path = dir_file_pair[0]
-            file_name = dir_file_pair[1]
-            if file_name == MAIN_TABLE_NAME:
-                table_dir[file_name] = MainTable(dir_path)
-            else:
-                table_dir[file_name] = CheckTable(dir_path, file_name)
+        row_unique_strings = pl.concat_str(
+            [
+                pl.concat_str(
+                    [col.fill_null("None") for col in stringified_columns],
+                    separator=" ",
+                ),
+                pl.Series(paddings, dtype=pl.Utf8),
+            ]
+        )
+        return observations.select(
+            row_unique_strings.apply(
+                TableManagerHelper.generate_uid, return_dtype=pl.Utf8
+            )
+        ).to_series()
 
+    @staticmethod
+    def embed_metadata(
+        observations: pl.DataFrame, insights_metadata: List[Dict]
+    ) -> pl.DataFrame:
+        """Add the file level information of insights to a matrix as whole columns."""
+        metadata_df = pl.from_dicts(insights_metadata, infer_schema_length=None)
+        if metadata_df.width == 0:
+            return observations
+        # Metadata overrides the column of the same name in the matrix
+        return observations.with_columns(
+            [
+                pl.coalesce(metadata_df[col], pl.col(col)).alias(col)
+                if col in observations.columns
+                else metadata_df[col]
+                for col in metadata_df.columns
+            ]
+        )
+
+    @staticmethod
+    def encode_nested(df: pl.DataFrame) -> pl.DataFrame:
+        """Encode the list and struct columns of a dataframe as json text.
+
+        Nested values can't be stored in csv files nor hashed to drop duplicated rows,
+        so they are stored as text in every table format.
+        """
+        nested_columns = [
+            col for col, dtype in df.schema.items() if dtype in (pl.List, pl.Struct)
+        ]
+        return df.with_columns(
+            [
+                pl.Series(
+                    col,
+                    [
+                        None if is_null else json.dumps(value)
+                        for value, is_null in zip(
+                            df[col].to_list(), df[col].is_null().to_list()
+                        )
+                    ],
+                    dtype=pl.Utf8,
+                )
+                for col in nested_columns
+            ]
+        )
+
+    @staticmethod
+    def join_reports(checks: pl.DataFrame, main_table: pl.LazyFrame) -> pl.DataFrame:
+        """Glue every check with the row of its insight report by joining on uid.
+
+        Args:
+            checks: the checks to glue reports to
+            main_table: the query of main table
+        """
+        # Drop the index column if exists one
+        if "" in main_table.columns:
+            main_table = main_table.drop("")
+        reports = TableManagerHelper.select_reports(checks[UID_VAR], main_table)
+        # uid column exists both dataframes, the joined one only keeps the check's uid
+        return checks.join(reports, on=UID_VAR, how="left")
+
+    @staticmethod
+    def select_reports(uids: pl.Series, main_table: pl.LazyFrame) -> pl.DataFrame:
+        """Read the insight reports of the uids of checks, one report per uid.
+
+        Args:
+            uids: the uids of the checks
+            main_table: the query of main table
+        """
+        # Only the reports of the checks are read from the main table
+        check_uids = pl.LazyFrame({UID_VAR: uids.unique().cast(pl.Utf8)})
+        reports = main_table.join(check_uids, on=UID_VAR, how="semi").collect()
+
+        # Matching reports should be one row per uid, as uid is unique each row
+        if reports[UID_VAR].is_duplicated().any():
+            raise ValueError("more than one reports share the same unique identifier!")
+        if reports.height != uids.n_unique():
+            raise ValueError("some checks don't have an insight report in main table!")
+        return reports
+
+    @staticmethod
+    def load_existing_tables(
+        path: Path, storage: TableStorage = DEFAULT_STORAGE
+    ) -> Dict[str, Table]:
+        """Open the main table and the check tables under a directory.
+
+        Tables are only opened here, a table is read when a query touches it.
+        """
+        table_dir: Dict[str, Table] = {}
+        main_table = MainTable(path, storage)
+        if main_table.exists():
+            table_dir[MAIN_TABLE_NAME] = main_table
+
+        checks_dir = path / CHECK_TABLES_DIR
+        if not checks_dir.is_dir():
+            return table_dir
+        for check_table in sorted(checks_dir.iterdir()):
+            if check_table.name.startswith("."):
+                continue
+            # A check table is either a file or a directory of partitions
+            if check_table.is_dir() or check_table.suffix == storage.suffix:
+                # check_table.stem is the file name without extension
+                table_dir[check_table.stem] = CheckTable(
+                    checks_dir, check_table.stem, storage
+                )
         return table_dir
 
+    @staticmethod
+    def triage_matrix(
+        insights: pl.Series, workers: int = 1
+    ) -> Tuple[List[Dict], Dict[str, pl.DataFrame]]:
+        """Parse a column of insights into metadata and a dataframe per check type.
+
+        The column is split into contiguous shards parsed by a pool of processes,
+        and the dataframes of shards are concatenated in order, so the result
+        is the same as parsing the whole column in this process.
+        The uid of a check holds the row of its insight until uids are generated.
+
+        Args:
+            insights: the column of insights of a matrix
+            workers: the amount of processes, the column is parsed here if it is 1
+        """
+        shard_size = max(-(-len(insights) // workers), 1)
+        first_rows = list(range(0, len(insights), shard_size))
+        if len(first_rows) <= 1:
+            return TableManagerHelper.triage_shard(insights.to_list(), 0)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(
+                executor.map(
+                    TableManagerHelper.triage_shard,
+                    [insights.slice(row, shard_size).to_list() for row in first_rows],
+                    first_rows,
+                )
+            )
+
+        insights_metadata = [
+            metadata for shard_metadata, _ in shards for metadata in shard_metadata
+        ]
+        shard_dfs: Dict[str, List[pl.DataFrame]] = defaultdict(list)
+        for _, checks_by_type in shards:
+            for check_type, check_df in checks_by_type.items():
+                shard_dfs[check_type].append(check_df)
+        checks_by_type = {}
+        for check_type, check_dfs in shard_dfs.items():
+            merged_df = TableManagerHelper.concat_shards(check_dfs)
+            # The shards of a check type are typed too differently to be reconciled
+            if merged_df is None:
+                return TableManagerHelper.triage_shard(insights.to_list(), 0)
+            checks_by_type[check_type] = merged_df
+        return insights_metadata, checks_by_type
+
+    @staticmethod
+    def triage_shard(
+        insights: List[str], first_row: int
+    ) -> Tuple[List[Dict], Dict[str, pl.DataFrame]]:
+        """Parse a shard of insights into their metadata and a dataframe per check type.
+
+        Args:
+            insights: the insights of the shard
+            first_row: the row of the first insight of the shard in the matrix
+        """
+        triaged_insights = TableManagerHelper.triage_insights(insights)
+        checks_by_type: Dict[str, List[Dict]] = defaultdict(list)
+        for row, (_, insight_checks) in enumerate(triaged_insights, start=first_row):
+            # Collect the check dicts of insight for name-based check tables
+            for check_type in insight_checks:
+                for one_check in insight_checks[check_type]:
+                    # Add the row of insight to the check, in place of its uid
+                    one_check[UID_VAR] = row
+                    checks_by_type[check_type].append(one_check)
+        return [metadata for metadata, _ in triaged_insights], {
+            check_type: TableManagerHelper.checks_to_df(checks)
+            for check_type, checks in checks_by_type.items()
+        }
+
+    @staticmethod
+    def concat_shards(check_dfs: List[pl.DataFrame]) -> Optional[pl.DataFrame]:
+        """Concatenate the dataframes of a check type inferred from different shards.
+
+        A column is typed the way it is when all the checks are inferred together:
+        a column of nulls takes the type of the other shards, and integers and floats
+        become floats. Return None if the shards are typed any other way.
+        """
+        observed: Dict[str, Set[pl.PolarsDataType]] = {}
+        first_dtypes: Dict[str, pl.PolarsDataType] = {}
+        for check_df in check_dfs:
+            for col, dtype in check_df.schema.items():
+                first_dtypes.setdefault(col, dtype)
+                observed.setdefault(col, set())
+                if check_df[col].null_count() < check_df.height:
+                    observed[col].add(dtype)
+        schema = {}
+        for col, dtypes in observed.items():
+            if dtypes == {pl.Int64, pl.Float64}:
+                dtypes = {pl.Float64}
+            if len(dtypes) > 1:
+                return None
+            schema[col] = dtypes.pop() if dtypes else first_dtypes[col]
+        return pl.concat(
+            [
+                check_df.with_columns(
+                    [pl.col(col).cast(schema[col]) for col in check_df.columns]
+                )
+                for check_df in check_dfs
+            ],
+            how="diagonal",
+        )
+
+    @staticmethod
+    def triage_insights(
+        insights: Iterable[str],
+    ) -> List[Tuple[Dict, Dict[str, List[Dict]]]]:
+        """Parse and triage a whole column of insights at once."""
+        return [
+            TableManagerHelper.triage_checks(TableManagerHelper.parse_insight(insight))
+            for insight in insights
+        ]
+
+    @staticmethod
+    def parse_insight(insight: str) -> Dict:
+        """Parse an insight with orjson if it is installed, otherwise with json.
+
+        An insight orjson refuses, e.g. one with NaN, is parsed with json as well.
+        """
+        if orjson is not None:
+            # pylint: disable = no-member
+            try:
+                return orjson.loads(insight)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(insight)
+
     @staticmethod
     def triage_checks(insight: Dict):
         """Categorize file level information and checks associate with check type."""
@@ -355,12 +1652,12 @@ class TableManagerHelper:
         def flatten_check(dic):
             """Recursively fetch key none_dict pairs to an one-dimension dictionary."""
             flattened_pairs = {}
-            for arg in dic:
-                if isinstance(dic[arg], Dict):
-                    sub_pairs = flatten_check(dic[arg])
-                    flattened_pairs.update(sub_pairs)
+            for arg, value in dic.items():
+                # isinstance of typing.Dict is several times slower than of dict
+                if isinstance(value, dict):
+                    flattened_pairs.update(flatten_check(value))
                 else:
-                    flattened_pairs[arg] = dic[arg]
+                    flattened_pairs[arg] = value
 
             return flattened_pairs
 
@@ -391,19 +1688,13 @@ class TableManagerHelper:
         return file_level_inf, checks_dict
 
     @staticmethod
-    def update_value_in_df(
-        df: pl.DataFrame, column_name, row_idx, input_date_type: Type, new_value
-    ) -> pl.DataFrame:
-        """Update value in a df. If the column doesn't exist, automatically generate one."""
-        # Find related polars data type from input_data_type
-        pl_dtype = DTYPE_REF[input_date_type.__name__]
-        # If no such an column exists in df, then generate a null column with this column
-        if column_name not in df.columns:
-            df = df.with_columns(pl.lit(None).alias(column_name).cast(pl_dtype))
-
-        # Update the value of column in a specific row
-        df[row_idx, column_name] = new_value
-        return df
+    def checks_to_df(checks: List[Dict]) -> pl.DataFrame:
+        """Build a single dataframe from a list of flattened check dictionaries.
+
+        Checks of the same type may not share exactly the same keys,
+        so the schema is inferred from all the checks and missing keys become null.
+        """
+        return pl.from_dicts(checks, infer_schema_length=None)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,28 @@
-"""Official CLI."""
+"""Official CLI.
+
+Every command imports the modules it needs when it runs, so that simple commands
+and shell completion don't wait for polars, pyarrow or PyGithub to be imported.
+"""
 # pylint: disable = too-many-arguments
 # pylint: disable = invalid-name
+# pylint: disable = import-outside-toplevel
 import json
 from pathlib import Path
+from typing import Set
 
-import polars as pl
 import typer
-from pprintjson import pprintjson
 
-from gatortracer.check_tables import TableManager
-from gatortracer.config_console import *
-from gatortracer.json_fetch import JsonFetch
+from gatortracer.blob_cache import DEFAULT_CACHE_SIZE
+from gatortracer.config_console import ConfigJson, ConfigPath, Token
+from gatortracer.constants import (
+    FETCH_STRATEGIES,
+    METADATA_DIR,
+    SUMMARY_NAMES,
+    TABLE_FORMATS,
+)
+from gatortracer.profiler import PROFILER
+
+FETCH_MANIFEST_NAME = "fetch_manifest.json"
 
 cli = typer.Typer()
 EXCLUDED_JSON, INCLUDED_JSON = "exclude.json", "include.json"
@@ -27,6 +39,7 @@ def saved_token(
     ),
 ):
     """CVUD (create, verify, update, delete) with saved token."""
+    ConfigPath().initialize_config_path()
     gh_token = Token()
 
     if remove:
@@ -48,7 +61,9 @@ def saved_token(
 @cli.command()
 def config(
     display_all: bool = typer.Option(
-        False, "--display-all", help="Display both exclude and include config json file."
+        False,
+        "--display-all",
+        help="Display both exclude and include config json file.",
     ),
     display_in: bool = typer.Option(
         False, "--display-in", help="Display the include config json file."
@@ -77,6 +92,9 @@ def config(
     ),
 ):
     """CRUD (create, read, update, delete) configuration files (not including saved-token)."""
+    from pprintjson import pprintjson
+
+    ConfigPath().initialize_config_path()
     in_config = ConfigJson(INCLUDED_JSON)
     ex_config = ConfigJson(EXCLUDED_JSON)
     if display_all:
@@ -147,8 +165,79 @@ def js_fetch(
     store_path: str = typer.Option(
         ".", "--store-path", "-s", help="The path where the output files will inhabit."
     ),
+    table_format: str = typer.Option(
+        "",
+        "--format",
+        help=f"""The format of tables: {', '.join(TABLE_FORMATS)}.
+        Detected from the existing tables and csv for new tables by default.""",
+    ),
+    partitioned: bool = typer.Option(
+        False,
+        "--partitioned",
+        help="Store new tables as append-only partitions, one per fetch run.",
+    ),
+    concurrency: int = typer.Option(
+        1,
+        "--concurrency",
+        "-c",
+        min=1,
+        help="The amount of repositories whose json(s) are fetched at the same time.",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="Only fetch the json(s) added or changed "
+        "since the last incremental fetch.",
+    ),
+    cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Keep the fetched json(s) in the user cache directory and reuse them.",
+    ),
+    cache_size: int = typer.Option(
+        DEFAULT_CACHE_SIZE // 1024**2,
+        "--cache-size",
+        min=1,
+        help="The largest size of cache in MB, "
+        "the least recently used json(s) are evicted beyond it.",
+    ),
+    strategy: str = typer.Option(
+        "contents",
+        "--strategy",
+        help=f"How to list the json(s) of a repository: {', '.join(FETCH_STRATEGIES)}. "
+        "tree lists the whole branch with one request "
+        "and finds json(s) in nested directories too.",
+    ),
+    batch_size: int = typer.Option(
+        0,
+        "--batch-size",
+        min=0,
+        help="Store the fetched json(s) every time this many are fetched, "
+        "0 to store them all at the end. "
+        "Best with --partitioned, as every batch rewrites the tables otherwise.",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        min=1,
+        help="The amount of processes parsing the fetched json(s).",
+    ),
+    api_url: str = typer.Option(
+        "",
+        "--api-url",
+        help="The url of the GitHub api, "
+        "e.g. of GitHub Enterprise or a local stand-in server. "
+        "api.github.com by default.",
+    ),
 ):
     """Fetch desired json files in GitHub associate with the flags and user configuration files."""
+    import polars as pl
+
+    from gatortracer.blob_cache import BlobCache
+    from gatortracer.check_tables import TableManager
+    from gatortracer.json_fetch import FetchManifest, JsonFetch
+
+    ConfigPath().initialize_config_path()
     token_value = ""
     while token not in "sStT":
         token = input("please select S (saved token) or T (temporary token): ")
@@ -178,13 +267,79 @@ def js_fetch(
         included_dict["repository"],
     )
     ex_in = (included_org, included_repo, excluded_org, excluded_repo)
-    json_fetch_handler = JsonFetch(token=token_value, instructions=ex_in)
-    insight_tree = json_fetch_handler.get_insight_jsons(
-        directory=directory, branch=branch, file_regex=file_re
+    manifest = (
+        FetchManifest(Path(store_path) / METADATA_DIR / FETCH_MANIFEST_NAME)
+        if incremental
+        else None
     )
-    insight_matrix = insight_tree.to_flatten_matrix()
-    df = pl.DataFrame(insight_matrix[1:], schema=insight_matrix[0])
-    table_manager = TableManager(store_path)
+    json_fetch_handler = JsonFetch(
+        token=token_value,
+        instructions=ex_in,
+        concurrency=concurrency,
+        manifest=manifest,
+        cache=BlobCache(ConfigPath().cache_dir, cache_size * 1024**2)
+        if cache
+        else None,
+        strategy=strategy,
+        base_url=api_url,
+    )
+    table_manager = TableManager(store_path, table_format, partitioned, workers)
+    # The padding of uids is carried over the batches of this fetch
+    uid_padding: Set[str] = set()
+    stored_files = 0
+    for (
+        insight_tree,
+        repo_full_names,
+        file_amount,
+    ) in json_fetch_handler.iter_insight_batches(
+        directory=directory, branch=branch, file_regex=file_re, batch_size=batch_size
+    ):
+        if file_amount:
+            df = pl.DataFrame(insight_tree.to_flatten_columns())
+            table_manager.append_table_from_matrix(df, uid_padding)
+            stored_files += file_amount
+        # Only remember the fetched files once they are stored in the tables
+        if manifest is not None:
+            manifest.save(repo_full_names)
+    if not stored_files:
+        if manifest is None:
+            raise ValueError("No insight files are found.")
+        print("No json file was added or changed since the last fetch.")
+
+
+@cli.command()
+def rebuild(
+    store_path: str = typer.Option(
+        ".", "--store-path", "-s", help="The path where the output files will inhabit."
+    ),
+    table_format: str = typer.Option(
+        "",
+        "--format",
+        help=f"""The format of tables: {', '.join(TABLE_FORMATS)}.
+        Detected from the existing tables and csv for new tables by default.""",
+    ),
+    partitioned: bool = typer.Option(
+        False,
+        "--partitioned",
+        help="Store new tables as append-only partitions, one per run.",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        min=1,
+        help="The amount of processes parsing the cached json(s).",
+    ),
+):
+    """Build tables from the cached json files of the last fetch, without GitHub."""
+    import polars as pl
+
+    from gatortracer.blob_cache import BlobCache
+    from gatortracer.check_tables import TableManager
+    from gatortracer.json_fetch import TreeDict
+
+    insight_tree = TreeDict(BlobCache(ConfigPath().cache_dir).load_last_fetch())
+    df = pl.DataFrame(insight_tree.to_flatten_columns())
+    table_manager = TableManager(store_path, table_format, partitioned, workers)
     table_manager.append_table_from_matrix(df)
 
 
@@ -194,10 +349,17 @@ def select_checks(
         ..., "--main-path", "-p", help="The directory where main table inhabit"
     ),
     attribute_name: str = typer.Option(
-        ..., "--attribute", "-a", help="the attribute check selection is subject to"
+        "", "--attribute", "-a", help="the attribute check selection is subject to"
     ),
     attribute_value: str = typer.Option(
-        ..., "--value", "-v", help="the value associate with the attribute"
+        "", "--value", "-v", help="the value associate with the attribute"
+    ),
+    where: str = typer.Option(
+        "",
+        "--where",
+        "-w",
+        help="""a filter expression instead of attribute and value,
+        e.g. 'status == false and repo-name ~ "fib.*"'""",
     ),
     save_file: str = typer.Option(
         "",
@@ -222,10 +384,24 @@ def select_checks(
     ),
 ):
     """Select checks."""
+    import polars as pl
+
+    from gatortracer.check_tables import TableManager
+    from gatortracer.query import QueryError
+
     table_manager = TableManager(main_table_dir)
     df = pl.DataFrame()
+    if where:
+        try:
+            df = table_manager.select_checks(
+                where, with_report, None if table_name == "." else [table_name]
+            )
+        except QueryError as error:
+            raise typer.BadParameter(str(error), param_hint="--where") from error
+    elif not attribute_name or not attribute_value:
+        raise typer.BadParameter("Either --where or --attribute and --value is needed")
     # table name argument is set as default
-    if table_name == ".":
+    elif table_name == ".":
         # Then find checks across all the tables
         df = table_manager.get_checks_by_attribute_across_tables(
             attribute_name, attribute_value, with_report
@@ -242,11 +418,202 @@ def select_checks(
     return df
 
 
+@cli.command()
+def summary(
+    main_table_dir: str = typer.Option(
+        ..., "--main-path", "-p", help="The directory where main table inhabit"
+    ),
+    summary_name: str = typer.Option(
+        "checks",
+        "--by",
+        "-b",
+        help=f"""What the checks are counted by: {', '.join(SUMMARY_NAMES)}.""",
+    ),
+    where: str = typer.Option(
+        "",
+        "--where",
+        "-w",
+        help="""a filter expression, e.g. 'repo-name ~ "fib.*"'""",
+    ),
+    rebuild_summaries: bool = typer.Option(
+        False,
+        "--rebuild",
+        help="Count all the checks of tables again before showing the summary.",
+    ),
+    save_file: str = typer.Option(
+        "",
+        "--save-file",
+        "-s",
+        help="if specified, then save output as csv in the path you choose",
+    ),
+):
+    """Show pass and fail counts of checks without reading the tables."""
+    from gatortracer.check_tables import TableManager
+    from gatortracer.query import QueryError
+
+    if summary_name not in SUMMARY_NAMES:
+        raise typer.BadParameter(f"--by accepts one of {', '.join(SUMMARY_NAMES)}")
+    table_manager = TableManager(main_table_dir)
+    if rebuild_summaries:
+        table_manager.summaries.rebuild(table_manager.tables)
+    try:
+        df = table_manager.get_summary(summary_name, where)
+    except QueryError as error:
+        raise typer.BadParameter(str(error), param_hint="--where") from error
+    print(df)
+    if save_file:
+        df.write_csv(save_file)
+    return df
+
+
+@cli.command()
+def sql(
+    query: str = typer.Argument(
+        ..., help="The SQL query, tables are named MainTable and after check types."
+    ),
+    main_table_dir: str = typer.Option(
+        ..., "--main-path", "-p", help="The directory where main table inhabit"
+    ),
+    save_file: str = typer.Option(
+        "",
+        "--save-file",
+        "-s",
+        help="if specified, then save output as csv in the path you choose",
+    ),
+):
+    """Run a SQL query over the tables, e.g. to join checks with reports on uid."""
+    from gatortracer.check_tables import TableManager
+
+    table_manager = TableManager(main_table_dir)
+    df = table_manager.sql(query)
+    print(df)
+    if save_file:
+        df.write_csv(save_file)
+    return df
+
+
+@cli.command()
+def history(
+    main_table_dir: str = typer.Option(
+        ..., "--main-path", "-p", help="The directory where main table inhabit"
+    ),
+    latest: bool = typer.Option(
+        False,
+        "--latest",
+        "-l",
+        help="Only show the latest snapshot of every report file.",
+    ),
+    as_of: str = typer.Option(
+        "",
+        "--as-of",
+        help="Only show the latest snapshots reported by a time, e.g. 2023-07-08.",
+    ),
+    per_repo: bool = typer.Option(
+        False,
+        "--per-repo",
+        help="Show the latest snapshot of every repository instead of every file.",
+    ),
+    where: str = typer.Option(
+        "",
+        "--where",
+        "-w",
+        help="""a filter expression, e.g. 'repo-name ~ "fib.*"'""",
+    ),
+    save_file: str = typer.Option(
+        "",
+        "--save-file",
+        "-s",
+        help="if specified, then save output as csv in the path you choose",
+    ),
+):
+    """Show the snapshots of insight reports over time."""
+    from gatortracer.check_tables import TableManager
+    from gatortracer.query import QueryError
+
+    table_manager = TableManager(main_table_dir)
+    try:
+        if latest or as_of or per_repo:
+            df = table_manager.get_snapshots(as_of, per_repo, where)
+        else:
+            df = table_manager.get_history(where)
+    except QueryError as error:
+        raise typer.BadParameter(str(error), param_hint="--where") from error
+    print(df)
+    if save_file:
+        df.write_csv(save_file)
+    return df
+
+
+@cli.command()
+def convert(
+    source_dir: str = typer.Option(
+        ..., "--source", help="The directory where the tables to convert inhabit."
+    ),
+    target_dir: str = typer.Option(
+        ..., "--target", help="The directory where the converted tables will inhabit."
+    ),
+    table_format: str = typer.Option(
+        ...,
+        "--format",
+        help=f"The format to convert the tables to: {', '.join(TABLE_FORMATS)}.",
+    ),
+):
+    """Convert tables to another format, e.g. csv to parquet or parquet back to csv."""
+    from gatortracer.table_storage import convert_table_dir, get_storage
+
+    converted = convert_table_dir(
+        Path(source_dir), Path(target_dir), get_storage(table_format)
+    )
+    print(f"{converted} tables have been converted to {table_format} in {target_dir}")
+
+
+@cli.command()
+def compact(
+    main_table_dir: str = typer.Option(
+        ..., "--main-path", "-p", help="The directory where main table inhabit"
+    ),
+):
+    """Merge the partitions of partitioned tables and drop duplicated rows."""
+    from gatortracer.check_tables import TableManager
+
+    table_manager = TableManager(main_table_dir)
+    table_manager.compact()
+
+
+@cli.command()
+def reindex(
+    main_table_dir: str = typer.Option(
+        ..., "--main-path", "-p", help="The directory where main table inhabit"
+    ),
+):
+    """Rebuild the uid index of check tables, e.g. for tables made by older versions."""
+    from gatortracer.check_tables import TableManager
+
+    table_manager = TableManager(main_table_dir)
+    table_manager.rebuild_uid_index()
+    print(f"uid index has been rebuilt in {table_manager.uid_index.index_path}")
+
+
 @cli.callback()
-def initialize_app():
+def initialize_app(
+    ctx: typer.Context,
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Time the stages of the command and print a summary of them on stderr.",
+    ),
+    profile_trace: str = typer.Option(
+        "",
+        "--profile-trace",
+        help="Write the timed stages of the command as a json trace to this path, "
+        "e.g. for Perfetto.",
+    ),
+):
     """User who access to this app."""
-    cfg_path = ConfigPath()
-    cfg_path.initialize_config_path()
+    if profile or profile_trace:
+        PROFILER.enable()
+        # Reported once the command is done, even if it failed
+        ctx.call_on_close(lambda: PROFILER.finish(profile, profile_trace))
 
 
 if __name__ == "__main__":
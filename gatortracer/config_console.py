@@ -5,7 +5,7 @@ import os
 from pathlib import Path
 from typing import Dict, List
 
-from platformdirs import user_config_dir
+from platformdirs import user_cache_dir, user_config_dir
 
 ENCODING = "utf-8"
 
@@ -151,6 +151,8 @@ class ConfigPath:
         self.app_name = "GatorTracer"
         # author_app equals to app_name if not specified
         self.config_dir = user_config_dir(self.app_name)
+        # fetched files are cached apart from the configuration
+        self.cache_dir = user_cache_dir(self.app_name)
         # key -> dirs, value -> list of config files
         # file -> string, folder -> sub_dict
         self.config_files_tree: Dict[List[str], str] = {
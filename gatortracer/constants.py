@@ -0,0 +1,10 @@
+"""Names the commands are declared with, importable without polars or PyGithub."""
+
+# contents -> list the directory, tree -> list the whole branch with one recursive call
+FETCH_STRATEGIES = ["contents", "tree"]
+# The names of the storage formats of tables, in table_storage.STORAGES
+TABLE_FORMATS = ["csv", "parquet", "ipc"]
+# The summaries of checks, in check_tables.SUMMARY_KEYS
+SUMMARY_NAMES = ["checks", "repos", "days"]
+# Indexes and other bookkeeping of the tables live in this hidden directory
+METADATA_DIR = ".gatortracer"
@@ -1,10 +1,181 @@
 """Fetch jsons from GitHub."""
 import base64
-import copy
+import json
 import re
-from typing import Dict, List, Pattern, Tuple
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
-from github import Github, Organization, Repository, UnknownObjectException
+from github import (
+    Github,
+    GitRef,
+    Organization,
+    Repository,
+    UnknownObjectException,
+)
+from github.Consts import DEFAULT_BASE_URL
+
+from gatortracer.blob_cache import BlobCache
+from gatortracer.constants import FETCH_STRATEGIES
+from gatortracer.profiler import PROFILER
+
+# Repositories fetched ahead of the one being stored, per worker thread
+FETCH_AHEAD = 2
+# Requests kept in reserve for the rest of the run when the rate limit is almost used up
+RATE_LIMIT_RESERVE = 50
+# Objects per page of listings, the default of GitHub api
+PER_PAGE = 30
+
+
+class RateLimitGuard:
+    """Pause all the requests until GitHub resets the rate limit once almost used up."""
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(self, reserve: int = RATE_LIMIT_RESERVE) -> None:
+        """Initialize RateLimitGuard instance.
+
+        Args:
+            reserve: the amount of remaining requests to pause at
+        """
+        self.reserve = reserve
+        self.lock = threading.Lock()
+
+    def wait(self, api: Github):
+        """Block until the client is allowed to send more requests."""
+        # Other threads wait here as well while the rate limit resets
+        with self.lock:
+            remaining, _ = api.rate_limiting
+            if remaining > self.reserve:
+                return
+            pause = max(api.rate_limiting_resettime - time.time(), 0) + 1
+            print(f"⏳ Rate limit is almost used up, waiting {pause:.0f} seconds")
+            time.sleep(pause)
+
+
+class FetchManifest:
+    """Record of the last fetch of every repository, to only fetch what changed."""
+
+    def __init__(self, manifest_path: Path) -> None:
+        """Initialize FetchManifest instance.
+
+        Args:
+            manifest_path: the json file of manifest, next to the fetched tables
+        """
+        self.manifest_path = manifest_path
+        manifest = (
+            json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest_path.is_file()
+            else {}
+        )
+        self.scope: Dict = manifest.get("scope", {})
+        # key -> full name of repository, value -> record of its last fetch
+        self.repositories: Dict[str, Dict] = manifest.get("repositories", {})
+        # Records of this fetch, kept apart until the files are stored
+        self.pending: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def use_scope(
+        self, directory: str, branch: str, file_regex: str, api_url: str = ""
+    ):
+        """Forget the records made for another directory, branch, file names or host.
+
+        Args:
+            directory: the directory of the fetched files
+            branch: the branch of the fetched files
+            file_regex: the names of the fetched files
+            api_url: the url of the GitHub api the files are fetched from,
+                api.github.com by default
+        """
+        scope = {
+            "directory": directory,
+            "branch": branch,
+            "file": file_regex,
+            # Records of another host hold its urls, which can't be requested here
+            "api": (api_url or DEFAULT_BASE_URL).rstrip("/"),
+        }
+        if scope != self.scope:
+            self.scope = scope
+            self.repositories = {}
+
+    def pushed_since(self, full_name: str, pushed_at: str) -> bool:
+        """Check if a repository might have been pushed since the last fetch."""
+        record = self.repositories.get(full_name)
+        return record is None or record.get("pushed-at") != pushed_at
+
+    def branch_moved(
+        self, api: Github, repo_obj: Repository.Repository, full_name: str
+    ) -> bool:
+        """Check if the head of branch moved since the last fetch.
+
+        A recorded branch head is checked with a conditional request,
+        which doesn't count against the rate limit when nothing changed.
+        """
+        record = self.repositories.get(full_name, {})
+        PROFILER.count("api requests")
+        try:
+            if "ref" in record:
+                ref = api.create_from_raw_data(
+                    GitRef.GitRef, record["ref"]["data"], record["ref"]["headers"]
+                )
+                # 304 Not Modified
+                if not ref.update():
+                    return False
+            else:
+                ref = repo_obj.get_git_ref(f"heads/{self.scope['branch']}")
+        except UnknownObjectException:
+            return True
+        self.record(
+            full_name,
+            head=ref.object.sha,
+            ref={
+                "data": ref.raw_data,
+                "headers": {
+                    header: value
+                    for header, value in ref.raw_headers.items()
+                    if header in ["etag", "last-modified"]
+                },
+            },
+        )
+        return record.get("head") != ref.object.sha
+
+    def fetched_files(self, full_name: str) -> Dict[str, str]:
+        """Get the blob sha of every file fetched from a repository last time."""
+        return self.repositories.get(full_name, {}).get("files", {})
+
+    def matching_files(self, full_name: str) -> Dict[str, str]:
+        """Get the blob sha of every file of a repository as of this fetch.
+
+        The files of a repository that wasn't listed again are the ones of last time.
+        """
+        with self.lock:
+            pending = self.pending.get(full_name, {})
+        return pending["files"] if "files" in pending else self.fetched_files(full_name)
+
+    def record(self, full_name: str, **fields):
+        """Update the pending record of a repository."""
+        with self.lock:
+            self.pending.setdefault(full_name, {}).update(fields)
+
+    def save(self, full_names: Optional[List[str]] = None):
+        """Write the manifest, only after the fetched files have been stored.
+
+        Args:
+            full_names: the repositories whose files have been stored, all by default
+        """
+        with self.lock:
+            for full_name in list(self.pending) if full_names is None else full_names:
+                if full_name in self.pending:
+                    self.repositories.setdefault(full_name, {}).update(
+                        self.pending.pop(full_name)
+                    )
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {"scope": self.scope, "repositories": self.repositories}
+        self.manifest_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
 
 
 class JsonFetch:
@@ -12,25 +183,154 @@ class JsonFetch:
 
     # pylint: disable=too-many-instance-attributes
     # pylint: disable=attribute-defined-outside-init
-    def __init__(self, token: str, instructions: Tuple) -> None:
-        self.authenticated_api = Github(token)
+    # pylint: disable = too-many-arguments
+    def __init__(
+        self,
+        token: str,
+        instructions: Tuple,
+        concurrency: int = 1,
+        manifest: Optional[FetchManifest] = None,
+        cache: Optional[BlobCache] = None,
+        strategy: str = "contents",
+        base_url: str = "",
+    ) -> None:
+        """Initialize JsonFetch instance.
+
+        Args:
+            token: the GitHub token
+            instructions: included orgs and repos, then excluded orgs and repos
+            concurrency: the amount of repositories whose files are fetched at once
+            manifest: if given, only fetch the files added or changed since last time
+            cache: if given, files found in it are neither downloaded nor decoded again
+            strategy: how to list the files of a repository, one of FETCH_STRATEGIES
+            base_url: the url of the GitHub api, e.g. of GitHub Enterprise or a local
+                stand-in, api.github.com by default
+        """
+        if strategy not in FETCH_STRATEGIES:
+            raise ValueError(
+                f"Unknown fetch strategy {strategy}, "
+                f"choose one of {', '.join(FETCH_STRATEGIES)}"
+            )
+        self.token = token
+        self.base_url = base_url
+        self.authenticated_api = self.create_api()
         (
             self.included_orgs,
             self.included_repos,
             self.excluded_orgs,
             self.excluded_repos,
         ) = instructions
+        self.concurrency = concurrency
+        self.manifest = manifest
+        self.cache = cache
+        self.strategy = strategy
+        self.rate_limit_guard = RateLimitGuard()
+        # A GitHub client can't be shared by threads, every worker thread creates one
+        self.thread_local = threading.local()
+        self.thread_local.api = self.authenticated_api
         self.out_dict = {"organizations": []}
 
-    def get_insight_jsons(self, directory: str, branch: str, file_regex: Pattern[str]):
+    def create_api(self) -> Github:
+        """Create a GitHub client authenticated with the token."""
+        if self.base_url:
+            return Github(self.token, base_url=self.base_url, per_page=PER_PAGE)
+        return Github(self.token, per_page=PER_PAGE)
+
+    def thread_api(self) -> Github:
+        """Get the GitHub client of the current worker thread."""
+        if not hasattr(self.thread_local, "api"):
+            self.thread_local.api = self.create_api()
+        return self.thread_local.api
+
+    def get_insight_jsons(self, directory: str, branch: str, file_regex: str):
         """Find all the matching repos and orgs."""
+        # All the repositories are fetched into one batch
+        insight_tree, _, _ = next(
+            self.iter_insight_batches(directory, branch, file_regex)
+        )
+        return insight_tree
+
+    def iter_insight_batches(
+        self,
+        directory: str,
+        branch: str,
+        file_regex: str,
+        batch_size: int = 0,
+    ) -> Iterator[Tuple["TreeDict", List[str], int]]:
+        """Fetch the matching json files and yield them in batches of repositories.
+
+        A batch is yielded once it holds batch_size json files, so that it can be
+        stored while the rest are fetched. All the repositories are one batch if
+        batch_size is 0.
+
+        Yields:
+            the nested dictionary of batch, the full names of its repositories
+            and the amount of json files in it
+        """
         self.directory, self.branch, self.file_regex = directory, branch, file_regex
-        self.find_matching_orgs()
-        return TreeDict(self.out_dict)
+        if self.manifest is not None:
+            self.manifest.use_scope(directory, branch, file_regex, self.base_url)
+        # The last fetch is remembered with the blob sha in place of each file,
+        # including the unchanged files an incremental fetch skips
+        last_fetch: Dict[str, List] = {"organizations": []}
+        repo_full_names, file_amount = [], 0
+        for org_login, repo, files_dict in self.iter_repo_insights():
+            batch_orgs = self.out_dict["organizations"]
+            if not batch_orgs or batch_orgs[-1]["org-name"] != org_login:
+                batch_orgs.append({"org-name": org_login, "repositories": []})
+                last_fetch["organizations"].append(
+                    {"org-name": org_login, "repositories": []}
+                )
+            batch_orgs[-1]["repositories"].append(
+                {"repo-name": repo.name, "insights": files_dict}
+            )
+            if self.cache is not None:
+                last_fetch["organizations"][-1]["repositories"].append(
+                    {
+                        "repo-name": repo.name,
+                        "insights": BlobCache.to_blob_shas(files_dict)
+                        if self.manifest is None
+                        else [
+                            {
+                                "file-name": ".".join(file_path.split(".")[:-1]),
+                                "insight": sha,
+                            }
+                            for file_path, sha in self.manifest.matching_files(
+                                repo.full_name
+                            ).items()
+                        ],
+                    }
+                )
+            repo_full_names.append(repo.full_name)
+            file_amount += len(files_dict)
+            if batch_size and file_amount >= batch_size:
+                yield TreeDict(self.out_dict), repo_full_names, file_amount
+                self.out_dict = {"organizations": []}
+                repo_full_names, file_amount = [], 0
+        if self.cache is not None:
+            self.cache.save_last_fetch(last_fetch)
+        if repo_full_names or not batch_size:
+            yield TreeDict(self.out_dict), repo_full_names, file_amount
+
+    def iter_repo_insights(
+        self,
+    ) -> Iterator[Tuple[str, Repository.Repository, List[Dict]]]:
+        """Yield every repository with its organization and its matching files.
 
-    def find_matching_orgs(self):
-        """Find all the matching organizations based on the inclusion/exclusion instruction
-        and call finding_matching_repos."""
+        The repositories are yielded in order.
+        """
+        with PROFILER.stage("fetch.orgs"):
+            org_objs = self.find_matching_orgs()
+        for org in org_objs:
+            with PROFILER.stage("fetch.repos"):
+                repo_objs = self.find_matching_repos(org)
+            for repo, files_dict in zip(
+                repo_objs, self.fetch_files_of_repos(repo_objs)
+            ):
+                yield org.login, repo, files_dict
+
+    def find_matching_orgs(self) -> List[Organization.Organization]:
+        """Find all the matching organizations based on the inclusion/exclusion."""
         # Combine a list of regular expressions with OR gate
         # If actual expression matches with any of expected regular expressions, check should pass
         included_combined = "(" + ")|(".join(self.included_orgs) + ")"
@@ -38,32 +338,30 @@ class JsonFetch:
 
         # If included orgs are specified, then only fetch the orgs matching with included orgs
         # Otherwise fetch all the orgs not matching with the excluded orgs
+        org_objs = []
+        listed = 0
         if self.included_orgs:
             print(f"Finding included organizations matching with {included_combined}")
             # use organization login other than name (i.e. use the url org name)
             # students have to be at least member in the organization
             for org in self.authenticated_api.get_user().get_orgs():
+                listed += 1
                 if org.login and re.match(included_combined, org.login):
-                    self.out_dict["organizations"].append(
-                        {
-                            "org-name": org.login,
-                            "repositories": self.find_matching_repos(org),
-                        }
-                    )
+                    org_objs.append(org)
         else:
             print(f"Finding excluded organizations matching with {included_combined}")
             for org in self.authenticated_api.get_user().get_orgs():
+                listed += 1
                 if org.login and not re.match(excluded_combined, org.login):
-                    self.out_dict["organizations"].append(
-                        {
-                            "org-name": org.login,
-                            "repositories": self.find_matching_repos(org),
-                        }
-                    )
+                    org_objs.append(org)
+        self.count_listing_requests(listed)
+        return org_objs
 
-    def find_matching_repos(self, org_obj: Organization.Organization) -> List[Dict]:
+    def find_matching_repos(
+        self, org_obj: Organization.Organization
+    ) -> List[Repository.Repository]:
         """Find all the matching repositories in a organization
-        based on the inclusion/exclusion instruction and put them into dictionary."""
+        based on the inclusion/exclusion instruction."""
         # Combine a list of regular expressions with OR gate
         # If actual expression matches with any of expected regular expressions, check should pass
         included_combined = "(" + ")|(".join(self.included_repos) + ")"
@@ -71,54 +369,197 @@ class JsonFetch:
 
         # If included repos are specified, then only fetch the repos matching with included repos
         # Otherwise fetch all the repos not matching with the excluded repos
-        matching_repos = []
+        repo_objs = []
+        listed = 0
         if self.included_repos:
             print(f"Finding included repositories matching with {included_combined}")
 
             for repo in org_obj.get_repos():
+                listed += 1
                 if re.match(included_combined, repo.name):
-                    matching_repos.append(
-                        {
-                            "repo-name": repo.name,
-                            "insights": self.find_matching_files(repo),
-                        }
-                    )
+                    repo_objs.append(repo)
 
         else:
             print(f"Finding excluded repositories matching with {included_combined}")
             for repo in org_obj.get_repos():
+                listed += 1
                 if not re.match(excluded_combined, repo.name):
-                    matching_repos.append(
-                        {
-                            "repo-name": repo.name,
-                            "insights": self.find_matching_files(repo),
-                        }
-                    )
-        return matching_repos
+                    repo_objs.append(repo)
+        self.count_listing_requests(listed)
+        return repo_objs
 
-    def find_matching_files(self, repo_obj: Repository.Repository) -> List[Dict]:
-        """Fetch all the immediate json files in a directory."""
-        # pylint: disable = invalid-name
+    def count_listing_requests(self, listed: int):
+        """Count the requests of a listing, one per page of listed objects."""
+        PROFILER.count("api requests", max(-(-listed // PER_PAGE), 1))
+
+    def fetch_files_of_repos(
+        self, repo_objs: List[Repository.Repository]
+    ) -> Iterator[List[Dict]]:
+        """Fetch the matching files of repositories, concurrently if concurrency > 1.
+
+        The files are yielded in the same order as the repositories. Only a few
+        repositories are fetched ahead of the one being yielded, to bound the memory.
+        """
+        for repo, files_dict in zip(repo_objs, self.iter_pushed_repo_files(repo_objs)):
+            if files_dict is None:
+                print(f"{repo.name} (unchanged)")
+                yield []
+                continue
+            print(repo.name)
+            if self.manifest is not None:
+                self.manifest.record(
+                    repo.full_name, **{"pushed-at": str(repo.pushed_at)}
+                )
+            yield files_dict
+
+    def iter_pushed_repo_files(
+        self, repo_objs: List[Repository.Repository]
+    ) -> Iterator[Optional[List[Dict]]]:
+        """Yield the matching files of every repository.
+
+        None is yielded for a repository not pushed since the last fetch.
+        """
+        # Repositories not pushed since the last fetch are skipped without any request
+        pushed = [
+            self.manifest is None
+            or self.manifest.pushed_since(repo.full_name, str(repo.pushed_at))
+            for repo in repo_objs
+        ]
+        if self.concurrency <= 1:
+            for repo, repo_pushed in zip(repo_objs, pushed):
+                yield self.find_matching_files(
+                    repo, repo.full_name
+                ) if repo_pushed else None
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            fetching: Deque = deque()
+            for repo, repo_pushed in zip(repo_objs, pushed):
+                fetching.append(
+                    pool.submit(self.fetch_repo_files, repo.full_name)
+                    if repo_pushed
+                    else None
+                )
+                if len(fetching) > FETCH_AHEAD * self.concurrency:
+                    future = fetching.popleft()
+                    yield future.result() if future is not None else None
+            while fetching:
+                future = fetching.popleft()
+                yield future.result() if future is not None else None
+
+    def fetch_repo_files(self, repo_full_name: str) -> List[Dict]:
+        """Fetch the matching files of a repository with the client of this thread."""
+        # A lazy repository doesn't cost a request
+        repo_obj = self.thread_api().get_repo(repo_full_name, lazy=True)
+        return self.find_matching_files(repo_obj, repo_full_name)
+
+    # pylint: disable = too-many-locals
+    def find_matching_files(
+        self, repo_obj: Repository.Repository, repo_full_name: str = ""
+    ) -> List[Dict]:
+        """Fetch all the json files in a directory.
+
+        With a manifest, only the files added or changed since last fetch are returned.
+        """
         files_dict = []
-        print(repo_obj.name)
+        repo_full_name = repo_full_name or repo_obj.full_name
+        self.rate_limit_guard.wait(self.thread_api())
+        if self.manifest is not None:
+            with PROFILER.stage("fetch.ref"):
+                branch_moved = self.manifest.branch_moved(
+                    self.thread_api(), repo_obj, repo_full_name
+                )
+            if not branch_moved:
+                return files_dict
         try:
-            contents = repo_obj.get_contents(self.directory, ref=self.branch)
+            with PROFILER.stage("fetch.list"):
+                if self.strategy == "tree":
+                    listed_files = self.list_tree_files(repo_obj)
+                else:
+                    listed_files = self.list_directory_files(repo_obj)
         except UnknownObjectException:
             return files_dict
-        for f in contents:
-            if (
-                f.type == "file"
-                and f.name.endswith(".json")
-                and re.match(self.file_regex, f.name)
-            ):
-                decoded_content = base64.b64decode(f.content).decode("utf-8")
-                # get file name without extension
-                f_pure_name = ".".join(f.name.split(".")[:-1])
+        fetched_files = (
+            self.manifest.fetched_files(repo_full_name) if self.manifest else {}
+        )
+        matching_files = {}
+        for file_path, sha, get_content in listed_files:
+            file_name = file_path.split("/")[-1]
+            if file_name.endswith(".json") and re.match(self.file_regex, file_name):
+                matching_files[file_path] = sha
+                # Skip the file fetched last time if its blob is the same
+                if fetched_files.get(file_path) == sha:
+                    continue
+                decoded_content = self.cache.get(sha) if self.cache else None
+                if decoded_content is None:
+                    with PROFILER.stage("fetch.content"):
+                        content = get_content()
+                    with PROFILER.stage("decode"):
+                        content_bytes = base64.b64decode(content)
+                        decoded_content = content_bytes.decode("utf-8")
+                    PROFILER.count("api requests")
+                    PROFILER.count("bytes fetched", len(content_bytes))
+                    if self.cache is not None:
+                        self.cache.put(sha, decoded_content)
+                else:
+                    PROFILER.count("cache hits")
+                # get file path without extension
+                f_pure_name = ".".join(file_path.split(".")[:-1])
                 files_dict.append(
                     {"file-name": f_pure_name, "insight": decoded_content}
                 )
+        if self.manifest is not None:
+            self.manifest.record(repo_full_name, files=matching_files)
         return files_dict
 
+    def list_directory_files(
+        self, repo_obj: Repository.Repository
+    ) -> List[Tuple[str, str, Callable[[], str]]]:
+        """List the immediate files of the directory with the contents api.
+
+        Every file is listed with its sha and a function getting its base64 content,
+        which costs a request per file.
+        """
+        contents = repo_obj.get_contents(self.directory, ref=self.branch)
+        PROFILER.count("api requests")
+        # pylint: disable = invalid-name
+        return [
+            (f.name, f.sha, partial(getattr, f, "content"))
+            for f in contents
+            if f.type == "file"
+        ]
+
+    def list_tree_files(
+        self, repo_obj: Repository.Repository
+    ) -> List[Tuple[str, str, Callable[[], str]]]:
+        """List the files under the directory, nested ones included, with one tree call.
+
+        Every file is listed with its path relative to the directory, its sha
+        and a function getting its base64 content by its blob.
+        """
+        tree = repo_obj.get_git_tree(self.branch, recursive=True)
+        PROFILER.count("api requests")
+        # GitHub cuts the listing of huge trees, the contents api lists them instead
+        if tree.raw_data.get("truncated"):
+            print(f"Tree of {repo_obj.full_name} is truncated, listing the directory")
+            return self.list_directory_files(repo_obj)
+        prefix = self.directory.strip("/")
+        prefix = f"{prefix}/" if prefix not in ["", "."] else ""
+        return [
+            (
+                element.path[len(prefix) :],
+                element.sha,
+                partial(JsonFetch.blob_content, repo_obj, element.sha),
+            )
+            for element in tree.tree
+            if element.type == "blob" and element.path.startswith(prefix)
+        ]
+
+    @staticmethod
+    def blob_content(repo_obj: Repository.Repository, sha: str) -> str:
+        """Get the base64 content of a blob of a repository."""
+        return repo_obj.get_git_blob(sha).content
+
 
 class TreeDict:
     """A nested dictionary."""
@@ -131,53 +572,63 @@ class TreeDict:
         """return the nested_dictionary"""
         return str(self.__nested_dict)
 
-    def to_flatten_matrix(self) -> List[List]:
-        """Flatten the nested dictionary based on the leaf and put into matrix."""
-        print("🚀 Converting nested dictionary to a flat matrix.")
+    def flatten(self) -> Tuple[List[str], List[Tuple]]:
+        """Flatten the nested dictionary based on the leaf into a title and rows.
+
+        Every dictionary is visited once in depth-first order. The non-iterable
+        values of a dictionary are appended to the tuple of values inherited from
+        its parent, which its sub-dictionaries share instead of copying it.
+        """
+        # Ordered set of column names
+        title: Dict[str, None] = {}
         rows = []
-        title = []
-
-        def flatten(root_dict, values):
-            """Recursively find the non-iterable and put into matrix.
-
-            Args:
-                root_dict: dictionary
-                values: a list of recorded non-iterable values inherited from parent dictionary
-            """
-            # The keys whose value is a list of dictionary
-            keys_to_list = []
-            found_list = False
-            for k in root_dict:
-                if isinstance(root_dict[k], (str, int)):
-                    values.append(root_dict[k])
-                    if k not in title:
-                        title.append(k)
-                elif isinstance(root_dict[k], list) and all(
-                    isinstance(sub, dict) for sub in root_dict[k]
-                ):
-                    keys_to_list.append(k)
-                    found_list = True
+        # Sub-dictionaries are pushed in reverse to visit them in order
+        stack: List[Tuple[Dict, Tuple]] = [(self.__nested_dict, ())]
+        while stack:
+            root_dict, inherited_values = stack.pop()
+            leaf_values: List[Any] = []
+            # The lists of dictionary, the value of some keys
+            sub_dict_lists = []
+            for k, v in root_dict.items():
+                if isinstance(v, (str, int)):
+                    leaf_values.append(v)
+                    title.setdefault(k)
+                elif isinstance(v, list) and all(isinstance(sub, dict) for sub in v):
+                    sub_dict_lists.append(v)
                 else:
                     pass  # currently assume there is no other types
+            values = inherited_values + tuple(leaf_values)
             # Base case: there is no more sub-dictionary
-            if not found_list:
-                # Python pass argument by reference.
-                # Call with descend of dictionary will change values of variable
-                # Then next run of recursive function will have different content in the variable
-                # So deepcopy to avoid the rewriting from this feature
-                value = copy.deepcopy(values)
-                # Put all the non-iterable values (e.g.: int, str) into the rows
-                rows.append(value)
-            # General case: call flatten function recursively with sub-dictionary as root
+            if not sub_dict_lists:
+                rows.append(values)
+            # General case: visit the sub-dictionaries with the values as prefix
             else:
-                for k in keys_to_list:
-                    for sub_d in root_dict[k]:
-                        value = copy.deepcopy(values)
-                        flatten(sub_d, value)
+                for sub_dicts in reversed(sub_dict_lists):
+                    for sub_d in reversed(sub_dicts):
+                        stack.append((sub_d, values))
+        return list(title), rows
 
-        flatten(self.__nested_dict, [])
+    def to_flatten_matrix(self) -> List[List]:
+        """Flatten the nested dictionary based on the leaf and put into matrix."""
+        print("🚀 Converting nested dictionary to a flat matrix.")
+        title, rows = self.flatten()
         if len(rows) <= 0:
             raise ValueError("No insight files are found.")
-        matrix_with_title = [title] + rows
+        matrix_with_title = [title] + [list(row) for row in rows]
         print("⭐ flat matrix was built successfully")
         return matrix_with_title
+
+    def to_flatten_columns(self) -> Dict[str, List]:
+        """Flatten the nested dictionary based on the leaf into values per column."""
+        print("🚀 Converting nested dictionary to flat columns.")
+        with PROFILER.stage("flatten"):
+            title, rows = self.flatten()
+            if len(rows) <= 0:
+                raise ValueError("No insight files are found.")
+            if any(len(row) != len(title) for row in rows):
+                raise ValueError(
+                    "Leaves of the nested dictionary don't share the same keys."
+                )
+            columns = dict(zip(title, (list(column) for column in zip(*rows))))
+        print("⭐ flat columns were built successfully")
+        return columns
@@ -0,0 +1,198 @@
+"""Time the stages of a command and count what they did, e.g. the requests to GitHub."""
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, TypeVar
+
+try:
+    # Peak memory is only known on Unix
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+FuncT = TypeVar("FuncT", bound=Callable)
+
+
+class Profiler:
+    """Stage timers and counters, doing nothing until enabled.
+
+    Stages run by several threads at once, like fetching the files of repositories,
+    add up their time, so it may exceed the wall time of command.
+    """
+
+    def __init__(self) -> None:
+        """Initialize Profiler instance."""
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all the timed stages and counters."""
+        self.started = time.perf_counter()
+        # Stage name -> amount of runs and seconds
+        self.stages: Dict[str, List] = {}
+        self.counters: Dict[str, int] = {}
+        # Every run of a stage with the thread it ran in, for the json trace
+        self.spans: List[Dict] = []
+
+    def enable(self):
+        """Start timing stages and counting from now."""
+        self.enabled = True
+        self.reset()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time every run of the stage in a with statement.
+
+        E.g. `with PROFILER.stage("fetch.content"):` times fetching a file.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                runs = self.stages.setdefault(name, [0, 0.0])
+                runs[0] += 1
+                runs[1] += elapsed
+                self.spans.append(
+                    {
+                        "name": name,
+                        "start": start - self.started,
+                        "seconds": elapsed,
+                        "thread": threading.current_thread().name,
+                    }
+                )
+
+    def timed(self, name: str) -> Callable[[FuncT], FuncT]:
+        """Time every call of a function as a stage."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name: str, amount: int = 1):
+        """Add an amount to a counter, e.g. of requests or written rows."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @staticmethod
+    def peak_rss() -> Dict[str, int]:
+        """Get the peak resident memory of this process and its children in bytes."""
+        if resource is None:
+            return {}
+        # Linux reports kilobytes and macOS bytes
+        unit = 1 if sys.platform == "darwin" else 1024
+        return {
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            "peak_child_rss_bytes": resource.getrusage(
+                resource.RUSAGE_CHILDREN
+            ).ru_maxrss
+            * unit,
+        }
+
+    def report(self) -> Dict:
+        """Summarize the wall time, the stages, the counters and the peak memory."""
+        with self.lock:
+            return {
+                "wall_seconds": time.perf_counter() - self.started,
+                "stages": {
+                    name: {"runs": runs, "seconds": seconds}
+                    for name, (runs, seconds) in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                **Profiler.peak_rss(),
+            }
+
+    def print_summary(self):
+        """Print the summary as a table on stderr, apart from the output of command."""
+        # pylint: disable = import-outside-toplevel
+        from rich.console import Console
+        from rich.table import Table
+
+        report = self.report()
+        table = Table(title=f"Profile: {report['wall_seconds']:.3f}s wall time")
+        table.add_column("stage or counter")
+        table.add_column("runs", justify="right")
+        table.add_column("seconds", justify="right")
+        table.add_column("share", justify="right")
+        for name, stage in report["stages"].items():
+            table.add_row(
+                name,
+                str(stage["runs"]),
+                f"{stage['seconds']:.3f}",
+                f"{stage['seconds'] / max(report['wall_seconds'], 1e-9):.0%}",
+            )
+        table.add_section()
+        for name, amount in report["counters"].items():
+            table.add_row(name, f"{amount:,}", "", "")
+        for name in ["peak_rss_bytes", "peak_child_rss_bytes"]:
+            if report.get(name):
+                table.add_row(
+                    name.replace("_bytes", ""),
+                    f"{report[name] / 1024**2:.1f} MB",
+                    "",
+                    "",
+                )
+        Console(stderr=True).print(table)
+
+    def write_trace(self, trace_path: str):
+        """Write the summary and every run of stage as a json trace.
+
+        The runs are trace events of the Chrome trace format, so the trace
+        opens in chrome://tracing or Perfetto as a timeline per thread.
+        """
+        with self.lock:
+            threads = {span["thread"] for span in self.spans}
+            thread_ids = {thread: idx for idx, thread in enumerate(sorted(threads))}
+            events = [
+                {
+                    "name": span["name"],
+                    "cat": span["name"].split(".")[0],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["seconds"] * 1e6,
+                    "pid": 0,
+                    "tid": thread_ids[span["thread"]],
+                }
+                for span in self.spans
+            ]
+        events.extend(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 0,
+                "tid": tid,
+                "args": {"name": thread},
+            }
+            for thread, tid in thread_ids.items()
+        )
+        trace = {"traceEvents": events, "summary": self.report()}
+        Path(trace_path).write_text(json.dumps(trace), encoding="utf-8")
+
+    def finish(self, summary: bool = True, trace_path: str = ""):
+        """Print the summary and write the json trace if asked."""
+        if summary:
+            self.print_summary()
+        if trace_path:
+            self.write_trace(trace_path)
+            print(f"Profile trace has been written to {trace_path}", file=sys.stderr)
+
+
+# The profiler of this process, shared by all the modules
+PROFILER = Profiler()
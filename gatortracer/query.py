@@ -0,0 +1,292 @@
+"""Filter expressions to select checks with.
+
+E.g. `status == false and repo-name ~ "fib.*"`.
+"""
+import json
+import re
+from typing import Any, FrozenSet, List, Mapping, NoReturn, Optional, Set, Tuple
+
+import polars as pl
+
+# Every token, either a string, a number, an operator, a parenthesis or a word
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<number>-?\d+(?:\.\d+)?(?![\w.-]))
+    |(?P<operator>==|!=|<=|>=|<|>|~)
+    |(?P<paren>[()])
+    |(?P<column>`[^`]+`)
+    |(?P<word>[A-Za-z_][\w.-]*)
+    )""",
+    re.VERBOSE,
+)
+KEYWORDS = {"and", "or", "not"}
+LITERALS = {"true": True, "false": False, "null": None}
+# A parsed expression: ("and" | "or", left, right), ("not", node)
+# or ("condition", column, operator, value)
+Node = Tuple
+# The truth values a condition may take, None is null
+Truths = FrozenSet[Optional[bool]]
+ANY_TRUTH: Truths = frozenset([True, False, None])
+
+
+class QueryError(ValueError):
+    """A filter expression that can't be parsed or compared with the columns."""
+
+
+class QueryFilter:
+    """A filter expression compiled to a polars expression.
+
+    A condition compares a column with a value: ==, !=, <, <=, > and >= compare,
+    ~ matches a regular expression. Values are strings in quotes, numbers,
+    true, false or null. Conditions are combined with and, or, not and parentheses.
+    Column names may contain dashes and dots, other names are quoted in backticks.
+
+    A column missing in a table is null in it, so a condition on it is null
+    and the expression is true or false as in SQL, e.g. path ~ "README" or
+    command ~ "mypy" matches the checks having either column.
+    """
+
+    def __init__(self, expression: str) -> None:
+        """Parse a filter expression.
+
+        Args:
+            expression: the filter expression,
+                e.g. status == false and repo-name ~ "fib.*"
+        """
+        self.expression = expression
+        self.tokens = QueryFilter.tokenize(expression)
+        self.position = 0
+        # The columns the expression refers to
+        self.columns: Set[str] = set()
+        self.tree = self.parse_or()
+        if self.position < len(self.tokens):
+            self.fail("unexpected")
+
+    @staticmethod
+    def tokenize(expression: str) -> List[Tuple[str, str, int]]:
+        """Split an expression into tokens of kind, text and position."""
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = TOKEN_PATTERN.match(expression, position)
+            if match is None or match.lastgroup is None:
+                raise QueryError(
+                    f"Invalid filter {expression!r} at position {position}"
+                )
+            tokens.append((match.lastgroup, match.group(match.lastgroup), position))
+            position = match.end()
+        return tokens
+
+    def peek(self) -> Tuple[str, str, int]:
+        """Get the next token without consuming it, empty at the end."""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("", "", len(self.expression))
+
+    def take(self) -> Tuple[str, str, int]:
+        """Consume the next token."""
+        token = self.peek()
+        if not token[0]:
+            self.fail("incomplete")
+        self.position += 1
+        return token
+
+    def fail(self, problem: str) -> NoReturn:
+        """Report where the expression can't be parsed."""
+        _, text, position = self.peek()
+        raise QueryError(
+            f"Invalid filter {self.expression!r}, "
+            f"{problem} {text!r} at position {position}"
+        )
+
+    def parse_or(self) -> Node:
+        """Parse conditions combined with or."""
+        node = self.parse_and()
+        while self.peek()[1] == "or":
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Node:
+        """Parse conditions combined with and."""
+        node = self.parse_not()
+        while self.peek()[1] == "and":
+            self.take()
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self) -> Node:
+        """Parse a condition negated by not."""
+        if self.peek()[1] == "not":
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_condition()
+
+    def parse_condition(self) -> Node:
+        """Parse a condition in parentheses or a comparison of a column with a value."""
+        if self.peek()[1] == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek()[1] != ")":
+                self.fail("expected ) instead of")
+            self.take()
+            return node
+
+        kind, column, _ = self.peek()
+        if kind == "column":
+            column = column[1:-1]
+        elif kind != "word" or column in KEYWORDS or column.lower() in LITERALS:
+            self.fail("expected a column instead of")
+        self.take()
+        self.columns.add(column)
+
+        if self.peek()[0] != "operator":
+            self.fail("expected an operator instead of")
+        operator = self.take()[1]
+        value = self.parse_value()
+        return ("condition", column, operator, value)
+
+    def parse_value(self) -> Any:
+        """Parse a string, a number, true, false or null."""
+        kind, text, _ = self.peek()
+        if kind == "string":
+            value: Any = json.loads(text) if text[0] == '"' else text[1:-1]
+        elif kind == "number":
+            value = float(text) if "." in text else int(text)
+        elif kind == "word" and text.lower() in LITERALS:
+            value = LITERALS[text.lower()]
+        else:
+            self.fail("expected a value instead of")
+        self.take()
+        return value
+
+    def to_expr(
+        self,
+        schema: Optional[Mapping[str, pl.PolarsDataType]] = None,
+        missing_as_null: bool = False,
+    ) -> pl.Expr:
+        """Compile the expression to a polars expression of a frame.
+
+        Args:
+            schema: the schema of the frame to filter, the values are compared with
+                its columns as they are if None
+            missing_as_null: take the columns missing in schema as null
+                instead of failing, e.g. for a check table lacking a column
+        """
+        if schema is not None and not missing_as_null:
+            missing = sorted(self.columns - set(schema))
+            if missing:
+                raise QueryError(
+                    f"Invalid filter {self.expression!r}, no column called "
+                    f"{', '.join(missing)}, choose from {', '.join(schema)}"
+                )
+        return self.compile(self.tree, schema)
+
+    def compile(
+        self, node: Node, schema: Optional[Mapping[str, pl.PolarsDataType]]
+    ) -> pl.Expr:
+        """Compile a parsed expression, checking its values against the schema."""
+        if node[0] == "and":
+            return self.compile(node[1], schema) & self.compile(node[2], schema)
+        if node[0] == "or":
+            return self.compile(node[1], schema) | self.compile(node[2], schema)
+        if node[0] == "not":
+            return ~self.compile(node[1], schema)
+        _, column, operator, value = node
+        if schema is None:
+            return QueryFilter.compare(pl.col(column), operator, value)
+        if column not in schema:
+            return QueryFilter.compare(pl.lit(None), operator, value)
+        dtype = schema[column]
+        column_expr = self.coerce_column(column, dtype, operator, value)
+        # true and false are compared with the text of text columns, e.g. of summaries
+        if isinstance(value, bool) and dtype == pl.Utf8:
+            value = json.dumps(value)
+        return QueryFilter.compare(column_expr, operator, value)
+
+    def coerce_column(
+        self, column: str, dtype: pl.PolarsDataType, operator: str, value: Any
+    ) -> pl.Expr:
+        """Get a column in the type to compare the value in, failing if none fits."""
+        if operator == "~" or value is None or dtype == pl.Null:
+            return pl.col(column)
+        if isinstance(value, bool):
+            fits = dtype in (pl.Boolean, pl.Utf8) and operator in ["==", "!="]
+        elif isinstance(value, (int, float)):
+            fits = dtype in pl.NUMERIC_DTYPES
+        else:
+            fits = dtype in (pl.Utf8, pl.Categorical) or dtype in pl.TEMPORAL_DTYPES
+        if not fits:
+            raise QueryError(
+                f"Invalid filter {self.expression!r}, {column} holds {dtype} values, "
+                f"which can't be compared with {operator} {json.dumps(value)}"
+            )
+        # Times are compared with strings like 2023-07-08 12:00:00 as text
+        if dtype in pl.TEMPORAL_DTYPES:
+            return pl.col(column).cast(pl.Utf8)
+        return pl.col(column)
+
+    def can_match(self, columns: Set[str]) -> bool:
+        """Check if rows with the columns may match, the others being null."""
+        return True in self.truths(self.tree, columns)
+
+    def truths(self, node: Node, columns: Set[str]) -> Truths:
+        """Find the truth values a parsed expression may take in rows with columns."""
+        if node[0] == "not":
+            return frozenset(
+                None if truth is None else not truth
+                for truth in self.truths(node[1], columns)
+            )
+        if node[0] in ["and", "or"]:
+            combine = (
+                QueryFilter.kleene_and if node[0] == "and" else QueryFilter.kleene_or
+            )
+            return frozenset(
+                combine(left, right)
+                for left in self.truths(node[1], columns)
+                for right in self.truths(node[2], columns)
+            )
+        _, column, operator, value = node
+        if column in columns:
+            return ANY_TRUTH
+        # A missing column is null
+        if value is None and operator in ["==", "!="]:
+            return frozenset([operator == "=="])
+        return frozenset([None])
+
+    @staticmethod
+    def kleene_and(left: Optional[bool], right: Optional[bool]) -> Optional[bool]:
+        """Combine truth values with and, false beats null."""
+        if left is False or right is False:
+            return False
+        if left is None or right is None:
+            return None
+        return True
+
+    @staticmethod
+    def kleene_or(left: Optional[bool], right: Optional[bool]) -> Optional[bool]:
+        """Combine truth values with or, true beats null."""
+        if left is True or right is True:
+            return True
+        if left is None or right is None:
+            return None
+        return False
+
+    @staticmethod
+    def compare(column: pl.Expr, operator: str, value: Any) -> pl.Expr:
+        """Compare a column with a value."""
+        if operator == "~":
+            return column.cast(pl.Utf8).str.contains(str(value))
+        if value is None and operator in ["==", "!="]:
+            return column.is_null() if operator == "==" else column.is_not_null()
+        comparisons = {
+            "==": column == value,
+            "!=": column != value,
+            "<": column < value,
+            "<=": column <= value,
+            ">": column > value,
+            ">=": column >= value,
+        }
+        return comparisons[operator]
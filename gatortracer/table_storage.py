@@ -0,0 +1,337 @@
+"""Storage formats of the tables on the disk."""
+# pylint: disable = unused-argument
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, TypeVar
+
+import polars as pl
+import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+from gatortracer.constants import METADATA_DIR
+
+MAIN_TABLE_NAME = "MainTable"
+CHECK_TABLES_DIR = "CheckTables"
+PARTITION_PREFIX = "part-"
+# Small row groups let a range of rows be read without reading the whole file
+PARQUET_ROW_GROUP_SIZE = 16384
+# Column name -> polars data type
+Schema = Dict[str, pl.PolarsDataType]
+FrameT = TypeVar("FrameT", pl.DataFrame, pl.LazyFrame)
+
+
+class TableStorage:
+    """A file format that a table can be read from and written to."""
+
+    name = ""
+    suffix = ""
+
+    def read(self, path: Path, schema: Optional[Schema] = None) -> pl.DataFrame:
+        """Read a table file into a dataframe.
+
+        Formats without schemas of their own read the columns with the given types.
+        """
+        raise NotImplementedError
+
+    def scan(self, path: Path, schema: Optional[Schema] = None) -> pl.LazyFrame:
+        """Lazily scan a table file."""
+        raise NotImplementedError
+
+    def read_rows(
+        self, path: Path, offset: int, length: int, schema: Optional[Schema] = None
+    ) -> pl.DataFrame:
+        """Read a range of rows of a table file."""
+        return self.scan(path, schema).slice(offset, length).collect()
+
+    def as_stored(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Change the values of a dataframe as the format stores them.
+
+        New rows are compared with the stored ones as they will be read back.
+        """
+        return df
+
+    def write(self, df: pl.DataFrame, path: Path):
+        """Write a dataframe into a table file.
+
+        The dataframe is written to a temporary file that then replaces the table,
+        so readers never see a half written table and memory mapped tables stay valid.
+        """
+        temporary_path = path.with_name(f".{path.name}.tmp")
+        self.write_file(df, temporary_path)
+        os.replace(temporary_path, path)
+
+    def write_file(self, df: pl.DataFrame, path: Path):
+        """Write a dataframe into a file of the storage format."""
+        raise NotImplementedError
+
+
+class CsvStorage(TableStorage):
+    """Comma separated values, readable by spreadsheets."""
+
+    name = "csv"
+    suffix = ".csv"
+
+    def read(self, path: Path, schema: Optional[Schema] = None) -> pl.DataFrame:
+        """Read a csv file, inferring the types of the columns missing in the schema."""
+        return pl.read_csv(path, dtypes=self.csv_dtypes(schema))
+
+    def scan(self, path: Path, schema: Optional[Schema] = None) -> pl.LazyFrame:
+        """Lazily scan a csv file."""
+        return pl.scan_csv(path, dtypes=self.csv_dtypes(schema))
+
+    def read_rows(
+        self, path: Path, offset: int, length: int, schema: Optional[Schema] = None
+    ) -> pl.DataFrame:
+        """Parse only a range of rows of a csv file."""
+        return pl.read_csv(
+            path,
+            skip_rows_after_header=offset,
+            n_rows=length,
+            dtypes=self.csv_dtypes(schema),
+        )
+
+    @staticmethod
+    def csv_dtypes(schema: Optional[Schema]) -> Optional[Schema]:
+        """Get the data types to parse a csv file with, null ones can't be parsed."""
+        if schema is None:
+            return None
+        return {col: dtype for col, dtype in schema.items() if dtype != pl.Null}
+
+    def as_stored(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Replace the line breaks of text with tabs, they would break the csv file."""
+        return df.with_columns(pl.col(pl.Utf8).str.replace_all("\n", "\t"))
+
+    def write_file(self, df: pl.DataFrame, path: Path):
+        """Write a csv file."""
+        self.as_stored(df).write_csv(path)
+
+
+class ParquetStorage(TableStorage):
+    """Compressed columnar file carrying the schema of the table."""
+
+    name = "parquet"
+    suffix = ".parquet"
+
+    def read(self, path: Path, schema: Optional[Schema] = None) -> pl.DataFrame:
+        """Read a parquet file with the schema stored in it."""
+        return pl.read_parquet(path)
+
+    def scan(self, path: Path, schema: Optional[Schema] = None) -> pl.LazyFrame:
+        """Lazily scan a parquet file."""
+        return pl.scan_parquet(path)
+
+    def read_rows(
+        self, path: Path, offset: int, length: int, schema: Optional[Schema] = None
+    ) -> pl.DataFrame:
+        """Read only the row groups of a parquet file holding a range of rows."""
+        parquet_file = pq.ParquetFile(path)
+        row_groups: List[int] = []
+        first_row = group_start = 0
+        for group_idx in range(parquet_file.num_row_groups):
+            group_end = (
+                group_start + parquet_file.metadata.row_group(group_idx).num_rows
+            )
+            if group_end > offset and group_start < offset + length:
+                if not row_groups:
+                    first_row = group_start
+                row_groups.append(group_idx)
+            group_start = group_end
+        rows = pl.DataFrame(parquet_file.read_row_groups(row_groups))
+        return rows.slice(offset - first_row, length)
+
+    def write_file(self, df: pl.DataFrame, path: Path):
+        """Write a parquet file."""
+        df.write_parquet(path, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+
+class IpcStorage(TableStorage):
+    """Uncompressed Arrow IPC file carrying the table schema, the fastest to reopen."""
+
+    name = "ipc"
+    suffix = ".arrow"
+
+    def read(self, path: Path, schema: Optional[Schema] = None) -> pl.DataFrame:
+        """Memory map an arrow ipc file with the schema stored in it."""
+        return pl.read_ipc(path, memory_map=True)
+
+    def scan(self, path: Path, schema: Optional[Schema] = None) -> pl.LazyFrame:
+        """Lazily scan an arrow ipc file."""
+        return pl.scan_ipc(path, memory_map=True)
+
+    def read_rows(
+        self, path: Path, offset: int, length: int, schema: Optional[Schema] = None
+    ) -> pl.DataFrame:
+        """Slice a range of rows out of a memory mapped arrow ipc file."""
+        return self.read(path).slice(offset, length)
+
+    def write_file(self, df: pl.DataFrame, path: Path):
+        """Write an arrow ipc file."""
+        df.write_ipc(path)
+
+
+STORAGES: Dict[str, TableStorage] = {
+    storage.name: storage for storage in [CsvStorage(), ParquetStorage(), IpcStorage()]
+}
+DEFAULT_STORAGE = STORAGES[CsvStorage.name]
+
+
+def get_storage(name: str) -> TableStorage:
+    """Get a storage by its name."""
+    if name not in STORAGES:
+        raise ValueError(
+            f"Unknown table format {name}, choose one of {', '.join(STORAGES)}"
+        )
+    return STORAGES[name]
+
+
+class SchemaRegistry:
+    """Declared schema of every table, derived from the observed rows.
+
+    A new column is declared with the data type it is observed with, and the data type
+    of a column observed with another type is widened so that both types fit in it.
+    The schemas are stored as json next to the tables, whatever the format of tables is.
+    """
+
+    def __init__(self, table_path: Path):
+        """Initialize SchemaRegistry instance.
+
+        Args:
+            table_path: the path where main table reside
+        """
+        self.registry_path = table_path / METADATA_DIR / "schemas.json"
+        self.schemas: Dict[str, Schema] = {}
+        if self.registry_path.is_file():
+            registry = json.loads(self.registry_path.read_text(encoding="utf-8"))
+            self.schemas = {
+                table_name: {
+                    col: SchemaRegistry.parse_dtype(dtype_name)
+                    for col, dtype_name in schema.items()
+                }
+                for table_name, schema in registry.items()
+            }
+
+    def get(self, table_name: str) -> Optional[Schema]:
+        """Get the declared schema of a table, None if it isn't declared yet."""
+        return self.schemas.get(table_name)
+
+    def evolve(
+        self, table_name: str, observed: Mapping[str, pl.PolarsDataType]
+    ) -> Schema:
+        """Declare the new columns of a table and widen the changed ones."""
+        schema = dict(self.schemas.get(table_name, {}))
+        for col, dtype in observed.items():
+            schema[col] = (
+                SchemaRegistry.widen(schema[col], dtype) if col in schema else dtype
+            )
+        self.schemas[table_name] = schema
+        return schema
+
+    def save(self):
+        """Write the schemas next to the tables."""
+        self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+        registry = {
+            table_name: {col: str(dtype) for col, dtype in schema.items()}
+            for table_name, schema in self.schemas.items()
+        }
+        self.registry_path.write_text(json.dumps(registry, indent=1), encoding="utf-8")
+
+    @staticmethod
+    def observe(df: pl.DataFrame) -> Schema:
+        """Get the schema of a dataframe, taking a column of nulls as unknown type."""
+        return {
+            col: pl.Null if df[col].null_count() == df.height else dtype
+            for col, dtype in df.schema.items()
+        }
+
+    @staticmethod
+    def widen(declared: pl.PolarsDataType, observed: pl.PolarsDataType):
+        """Get the narrowest data type that fits both data types."""
+        if observed in (declared, pl.Null):
+            return declared
+        if declared == pl.Null:
+            return observed
+        if declared in pl.NUMERIC_DTYPES and observed in pl.NUMERIC_DTYPES:
+            return pl.Float64
+        return pl.Utf8
+
+    @staticmethod
+    def conform(df: FrameT, schema: Schema) -> FrameT:
+        """Cast and order the columns of a dataframe as a schema, missing ones null."""
+        # Columns of unknown type are stored as text until values are observed
+        schema = {
+            col: pl.Utf8 if dtype == pl.Null else dtype for col, dtype in schema.items()
+        }
+        # A frame without columns has no rows either
+        if not df.columns:
+            return type(df)(schema=schema)
+        missing_columns = [
+            pl.lit(None, dtype).alias(col)
+            for col, dtype in schema.items()
+            if col not in df.columns
+        ]
+        return df.with_columns(missing_columns).select(
+            [pl.col(col).cast(dtype) for col, dtype in schema.items()]
+        )
+
+    @staticmethod
+    def parse_dtype(dtype_name: str) -> pl.PolarsDataType:
+        """Parse the name of a data type, e.g. Int64 or List(Utf8)."""
+        if dtype_name.startswith("List(") and dtype_name.endswith(")"):
+            return pl.List(SchemaRegistry.parse_dtype(dtype_name[len("List(") : -1]))
+        return getattr(pl, dtype_name)
+
+
+def detect_storage(table_dir: Path) -> Optional[TableStorage]:
+    """Detect the storage of the tables under a directory, None if there is no table."""
+    checks_dir = table_dir / CHECK_TABLES_DIR
+    for storage in STORAGES.values():
+        if (table_dir / f"{MAIN_TABLE_NAME}{storage.suffix}").is_file():
+            return storage
+        # Partitions of the main table or tables in the check tables directory
+        for table_files_dir in [table_dir / MAIN_TABLE_NAME, checks_dir]:
+            if table_files_dir.is_dir() and any(
+                table_files_dir.glob(f"**/*{storage.suffix}")
+            ):
+                return storage
+    return None
+
+
+def convert_table_dir(source_dir: Path, target_dir: Path, target: TableStorage):
+    """Convert all the tables under a directory to another storage in a new directory.
+
+    Args:
+        source_dir: the directory where the main table and CheckTables reside
+        target_dir: the directory where the converted tables will inhabit
+        target: the storage of the converted tables
+    """
+    source_dir, target_dir = Path(source_dir), Path(target_dir)
+    if source_dir.resolve() == target_dir.resolve():
+        raise ValueError("Tables can't be converted in place, choose another directory")
+    source = detect_storage(source_dir)
+    if source is None:
+        raise FileNotFoundError(f"No tables are found under {source_dir}")
+    schemas = SchemaRegistry(source_dir)
+    converted = 0
+    metadata_dir = source_dir / METADATA_DIR
+    if metadata_dir.is_dir():
+        shutil.copytree(metadata_dir, target_dir / METADATA_DIR, dirs_exist_ok=True)
+    for table_file in source_dir.glob(f"**/*{source.suffix}"):
+        if metadata_dir in table_file.parents:
+            continue
+        target_file = (target_dir / table_file.relative_to(source_dir)).with_suffix(
+            target.suffix
+        )
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        # Read the table as declared rather than inferring the types of csv columns
+        schema = schemas.get(
+            table_file.parent.name
+            if table_file.name.startswith(PARTITION_PREFIX)
+            else table_file.stem
+        )
+        df = source.read(table_file, schema)
+        if schema is not None:
+            df = SchemaRegistry.conform(df, schema)
+        target.write(df, target_file)
+        converted += 1
+    return converted
@@ -0,0 +1,38 @@
+"""Fixtures shared by the tests."""
+# pylint: disable = redefined-outer-name
+import shutil
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from benchmarks.fake_github import FakeGitHub, write_fixtures
+from benchmarks.synthetic import synthetic_tree
+
+EXAMPLE_TABLES = Path(__file__).parent.parent / "examples" / "tables"
+
+
+@pytest.fixture
+def example_tables(tmp_path: Path) -> Path:
+    """Copy the example tables, which were written before any index existed."""
+    table_dir = tmp_path / "tables"
+    shutil.copytree(EXAMPLE_TABLES, table_dir)
+    return table_dir
+
+
+@pytest.fixture
+def fixture_dir(tmp_path: Path) -> Path:
+    """Write the insight files of six repositories in two organizations."""
+    fixtures = tmp_path / "fixtures"
+    write_fixtures(
+        str(fixtures),
+        synthetic_tree(6, files_per_repo=5, checks_per_file=4, org_amount=2),
+    )
+    return fixtures
+
+
+@pytest.fixture
+def fake_github(fixture_dir: Path) -> Iterator[FakeGitHub]:
+    """Serve the fixtures from a local stand-in of the GitHub api."""
+    with FakeGitHub(str(fixture_dir)) as server:
+        yield server
@@ -0,0 +1,211 @@
+"""Test fetching insight files from the local stand-in of the GitHub api."""
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+from typer.testing import CliRunner, Result
+
+from benchmarks.fake_github import FakeGitHub
+from gatortracer import cli, config_console
+from gatortracer.blob_cache import BlobCache
+from gatortracer.check_tables import TableManager
+from gatortracer.config_console import ConfigPath
+from gatortracer.json_fetch import FetchManifest, JsonFetch, TreeDict
+
+# Every organization and repository
+INSTRUCTIONS: Tuple[List[str], ...] = ([".*"], [".*"], [], [])
+
+
+def fetch_files(
+    server: FakeGitHub, manifest: Optional[FetchManifest] = None, **kwargs
+) -> Dict[str, str]:
+    """Fetch all the insight files, by repository and file name."""
+    json_fetch = JsonFetch(
+        "fake-token", INSTRUCTIONS, manifest=manifest, base_url=server.url, **kwargs
+    )
+    files = {}
+    for tree, repo_full_names, file_amount in json_fetch.iter_insight_batches(
+        "insight", "insight", "."
+    ):
+        columns = tree.to_flatten_columns() if file_amount else {}
+        for repo, file_name, insight in zip(
+            columns.get("repo-name", []),
+            columns.get("file-name", []),
+            columns.get("insight", []),
+        ):
+            files[f"{repo}/{file_name}"] = insight
+        if manifest is not None:
+            manifest.save(repo_full_names)
+    return files
+
+
+def fixture_files(fixture_dir: Path) -> Dict[str, str]:
+    """Read the insight files served by the stand-in, by repository and file name."""
+    return {
+        f"{json_path.parent.parent.parent.name}/{json_path.stem}": json_path.read_text(
+            encoding="utf-8"
+        )
+        for json_path in fixture_dir.rglob("*.json")
+    }
+
+
+def change_file(fixture_dir: Path) -> str:
+    """Change a fixture file, getting its repository and file name."""
+    changed_path = sorted(fixture_dir.rglob("*.json"))[7]
+    insight = json.loads(changed_path.read_text(encoding="utf-8"))
+    insight["amount_correct"] += 1
+    changed_path.write_text(json.dumps(insight), encoding="utf-8")
+    # Pushed a minute later, push times are in seconds
+    pushed_at = changed_path.stat().st_mtime + 60
+    os.utime(changed_path, (pushed_at, pushed_at))
+    return f"{changed_path.parent.parent.parent.name}/{changed_path.stem}"
+
+
+@pytest.mark.parametrize("strategy", ["contents", "tree"])
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_fetch_every_file(
+    fake_github: FakeGitHub, fixture_dir: Path, strategy: str, concurrency: int
+):
+    """Every strategy and concurrency fetches the same files as served."""
+    files = fetch_files(fake_github, strategy=strategy, concurrency=concurrency)
+    assert files == fixture_files(fixture_dir)
+
+
+def test_tree_fetch_finds_nested_files(fake_github: FakeGitHub, fixture_dir: Path):
+    """The tree strategy also fetches the files in sub-directories of the directory."""
+    repo_dir = sorted(fixture_dir.glob("*/*"))[0]
+    nested_path = repo_dir / "insight" / "insight" / "week-2" / "nested.json"
+    nested_path.parent.mkdir()
+    nested_path.write_text(json.dumps({"amount_correct": 1}), encoding="utf-8")
+    nested_key = f"{repo_dir.name}/week-2/nested"
+    files = fetch_files(fake_github, strategy="tree")
+    assert files[nested_key] == nested_path.read_text(encoding="utf-8")
+    assert len(files) == 31
+    # One listing per repository, whatever the amount of files
+    assert fake_github.requests["tree"] == 6
+    assert fake_github.requests["contents"] == 0
+    assert nested_key not in fetch_files(fake_github, strategy="contents")
+
+
+def test_truncated_tree_lists_directory(fixture_dir: Path):
+    """A tree cut by GitHub is listed with the contents api instead."""
+    with FakeGitHub(str(fixture_dir), tree_limit=1) as server:
+        assert fetch_files(server, strategy="tree") == fixture_files(fixture_dir)
+        assert server.requests["blob"] == 0
+
+
+def test_cached_fetch_downloads_no_file(fake_github: FakeGitHub, tmp_path: Path):
+    """The files in the cache are only listed on the next fetch."""
+    cache = BlobCache(tmp_path / "cache")
+    files = fetch_files(fake_github, cache=cache, strategy="tree")
+    fake_github.reset()
+    assert fetch_files(fake_github, cache=cache, strategy="tree") == files
+    assert fake_github.requests["blob"] == 0
+    assert fake_github.requests["tree"] == 6
+
+
+def test_incremental_fetch_of_changed_file(
+    fake_github: FakeGitHub, fixture_dir: Path, tmp_path: Path
+):
+    """Only the files changed since the last incremental fetch are fetched."""
+    manifest_path = tmp_path / "manifest.json"
+    assert len(fetch_files(fake_github, FetchManifest(manifest_path))) == 30
+    changed_key = change_file(fixture_dir)
+    assert fetch_files(fake_github, FetchManifest(manifest_path)) == {
+        changed_key: fixture_files(fixture_dir)[changed_key]
+    }
+    assert not fetch_files(fake_github, FetchManifest(manifest_path))
+
+
+@pytest.fixture
+def user_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Keep the configuration and cache of commands in a temporary directory."""
+    monkeypatch.setattr(
+        config_console, "user_config_dir", lambda _: str(tmp_path / "config")
+    )
+    monkeypatch.setattr(
+        config_console, "user_cache_dir", lambda _: str(tmp_path / "cache")
+    )
+    ConfigPath().initialize_config_path()
+    include_path = tmp_path / "config" / "fetch_scope" / "include.json"
+    include_path.write_text(
+        json.dumps({"organization": [".*"], "repository": [".*"]}), encoding="utf-8"
+    )
+
+
+def js_fetch(server: FakeGitHub, table_dir: Path) -> Result:
+    """Run the js-fetch command incrementally against the stand-in."""
+    args = ["js-fetch", "-t", "t", "-d", "insight", "-s", str(table_dir)]
+    args += ["--api-url", server.url, "--incremental", "--concurrency", "4"]
+    return CliRunner().invoke(cli.cli, args, input="fake-token\n")
+
+
+def test_incremental_fetch_remembers_every_file(
+    fake_github: FakeGitHub, fixture_dir: Path, tmp_path: Path
+):
+    """The last fetch holds the unchanged files an incremental fetch skips."""
+    cache = BlobCache(tmp_path / "cache")
+    manifest_path = tmp_path / "manifest.json"
+    fetch_files(fake_github, FetchManifest(manifest_path), cache=cache)
+    changed_key = change_file(fixture_dir)
+    assert list(
+        fetch_files(fake_github, FetchManifest(manifest_path), cache=cache)
+    ) == [changed_key]
+    with contextlib.redirect_stdout(io.StringIO()):
+        columns = TreeDict(cache.load_last_fetch()).to_flatten_columns()
+    last_fetch = {
+        f"{repo}/{file_name}": insight
+        for repo, file_name, insight in zip(
+            columns["repo-name"], columns["file-name"], columns["insight"]
+        )
+    }
+    assert last_fetch == fixture_files(fixture_dir)
+
+
+@pytest.mark.usefixtures("user_dirs")
+def test_js_fetch_command(fake_github: FakeGitHub, tmp_path: Path):
+    """The command stores the fetched files, then nothing new incrementally."""
+    table_dir = tmp_path / "tables"
+    result = js_fetch(fake_github, table_dir)
+    assert result.exit_code == 0, result.output
+    table_manager = TableManager(str(table_dir))
+    assert table_manager.tables["MainTable"].df.height == 30
+    assert not table_manager.select_checks("status == true").is_empty()
+    result = js_fetch(fake_github, table_dir)
+    assert result.exit_code == 0, result.output
+    assert "No json file was added or changed" in result.output
+
+
+@pytest.mark.usefixtures("user_dirs")
+def test_rebuild_after_incremental_fetch(
+    fake_github: FakeGitHub, fixture_dir: Path, tmp_path: Path
+):
+    """The tables are rebuilt offline with all the files, not only the changed ones."""
+    table_dir, rebuilt_dir = tmp_path / "tables", tmp_path / "rebuilt"
+    assert js_fetch(fake_github, table_dir).exit_code == 0
+    change_file(fixture_dir)
+    assert js_fetch(fake_github, table_dir).exit_code == 0
+    result = CliRunner().invoke(cli.cli, ["rebuild", "-s", str(rebuilt_dir)])
+    assert result.exit_code == 0, result.output
+    rebuilt = TableManager(str(rebuilt_dir)).tables["MainTable"].df
+    assert rebuilt.height == 30
+    assert sorted(rebuilt["amount_correct"]) == sorted(
+        json.loads(insight)["amount_correct"]
+        for insight in fixture_files(fixture_dir).values()
+    )
+
+
+def test_incremental_fetch_from_another_host(fixture_dir: Path, tmp_path: Path):
+    """The manifest of another GitHub host is forgotten rather than requested."""
+    manifest_path = tmp_path / "manifest.json"
+    with FakeGitHub(str(fixture_dir)) as first_host:
+        assert len(fetch_files(first_host, FetchManifest(manifest_path))) == 30
+    with FakeGitHub(str(fixture_dir)) as second_host:
+        assert second_host.url != first_host.url
+        assert len(fetch_files(second_host, FetchManifest(manifest_path))) == 30
+        # Nothing changed on the second host since
+        assert not fetch_files(second_host, FetchManifest(manifest_path))
@@ -0,0 +1,162 @@
+"""Test the history of the snapshots of insight report files."""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+import polars as pl
+import pytest
+
+from gatortracer.check_tables import (
+    HISTORY_KEYS,
+    History,
+    TableManager,
+    TableManagerHelper,
+)
+
+# Organization, repository, file, report time and amount of correct checks
+Report = Tuple[str, str, str, str, int]
+
+FIRST_FETCH: List[Report] = [
+    ("org-a", "fib", "insight-1", "2023-07-01 10:00:00", 1),
+    ("org-a", "hello", "insight-1", "2023-07-02 09:00:00", 0),
+]
+SECOND_FETCH: List[Report] = [
+    ("org-a", "fib", "insight-2", "2023-07-05 10:00:00", 3),
+    ("org-a", "hello", "insight-2", "2023-07-06 09:00:00", 4),
+]
+THIRD_FETCH: List[Report] = [
+    ("org-a", "fib", "insight-3", "2023-07-09 10:00:00", 5),
+]
+
+
+def report_matrix(reports: List[Report]) -> pl.DataFrame:
+    """Build the matrix of insight files with a check each."""
+    return pl.DataFrame(
+        {
+            "org-name": [report[0] for report in reports],
+            "repo-name": [report[1] for report in reports],
+            "file-name": [report[2] for report in reports],
+            "insight": [
+                json.dumps(
+                    {
+                        "amount_correct": amount_correct,
+                        "report_time": report_time,
+                        "checks": [
+                            {
+                                "check": "CountCommits",
+                                "status": True,
+                                "options": {"count": amount_correct},
+                            }
+                        ],
+                    }
+                )
+                for *_, report_time, amount_correct in reports
+            ],
+        }
+    )
+
+
+def fetch_all(table_dir: Path) -> TableManager:
+    """Append the reports of every fetch, one fetch at a time."""
+    for reports in [FIRST_FETCH, SECOND_FETCH, THIRD_FETCH]:
+        TableManager(str(table_dir)).append_table_from_matrix(report_matrix(reports))
+    return TableManager(str(table_dir))
+
+
+def report_keys(df: pl.DataFrame) -> List[Tuple[str, str, int]]:
+    """Get the repository, file and amount of correct checks of reports in order."""
+    return list(zip(df["repo-name"], df["file-name"], df["amount_correct"]))
+
+
+def test_history_keeps_every_snapshot_in_order(tmp_path: Path):
+    """Every snapshot is kept, ordered by repository and report time."""
+    table_manager = fetch_all(tmp_path)
+    assert report_keys(table_manager.get_history()) == [
+        ("fib", "insight-1", 1),
+        ("fib", "insight-2", 3),
+        ("fib", "insight-3", 5),
+        ("hello", "insight-1", 0),
+        ("hello", "insight-2", 4),
+    ]
+    assert report_keys(table_manager.get_history('repo-name == "hello"')) == [
+        ("hello", "insight-1", 0),
+        ("hello", "insight-2", 4),
+    ]
+
+
+def test_latest_snapshots(tmp_path: Path):
+    """The latest snapshot of every repository, as of a time and filtered."""
+    table_manager = fetch_all(tmp_path)
+    assert table_manager.get_snapshots().height == 5
+    assert sorted(report_keys(table_manager.get_snapshots(per_repo=True))) == [
+        ("fib", "insight-3", 5),
+        ("hello", "insight-2", 4),
+    ]
+    assert sorted(
+        report_keys(
+            table_manager.get_snapshots(as_of="2023-07-05 12:00:00", per_repo=True)
+        )
+    ) == [("fib", "insight-2", 3), ("hello", "insight-1", 0)]
+    assert sorted(
+        report_keys(table_manager.get_snapshots(as_of="2023-07-05 12:00:00"))
+    ) == [("fib", "insight-1", 1), ("fib", "insight-2", 3), ("hello", "insight-1", 0)]
+    assert report_keys(
+        table_manager.get_snapshots(per_repo=True, where="amount_correct > 4")
+    ) == [("fib", "insight-3", 5)]
+
+
+def test_latest_version_of_report_file(tmp_path: Path):
+    """The latest version wins a tie of report times, no report time is the oldest."""
+    history = History(tmp_path)
+    for version, report_time in enumerate(
+        ["2023-07-01 10:00:00", None, "2023-07-01 10:00:00", "2023-06-01 10:00:00"]
+    ):
+        history.record(
+            pl.DataFrame(
+                {
+                    "org-name": ["org-a"],
+                    "repo-name": ["fib"],
+                    "file-name": ["insight-1"],
+                    "uid": [f"uid-{version}"],
+                    "report_time": pl.Series([report_time], dtype=pl.Utf8),
+                }
+            )
+        )
+    latest = history.latest(HISTORY_KEYS)
+    assert latest["uid"].to_list() == ["uid-2"]
+    as_of = history.latest(HISTORY_KEYS, datetime(2023, 6, 15))
+    assert as_of["uid"].to_list() == ["uid-3"]
+
+
+def test_history_of_tables_written_before_it(tmp_path: Path):
+    """The history is rebuilt from main table if it was never written."""
+    expected = fetch_all(tmp_path).get_history()
+    for history_file in tmp_path.rglob("history.*"):
+        history_file.unlink()
+    assert TableManager(str(tmp_path)).get_history().frame_equal(expected)
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_refetched_file_with_new_content(tmp_path: Path, partitioned: bool):
+    """A file fetched again with new content is its latest snapshot with its checks."""
+    first = ("org-a", "fib", "insight-1", "2023-07-01 10:00:00", 1)
+    changed = ("org-a", "fib", "insight-1", "2023-07-05 10:00:00", 5)
+    latest = ("org-a", "fib", "insight-1", "2023-07-09 10:00:00", 3)
+    for reports in [[first], [changed], [changed], [latest]]:
+        TableManager(str(tmp_path), partitioned=partitioned).append_table_from_matrix(
+            report_matrix(reports)
+        )
+    table_manager = TableManager(str(tmp_path))
+    history = table_manager.get_history()
+    # The same content fetched again isn't another snapshot
+    assert history["amount_correct"].to_list() == [1, 5, 3]
+    assert history["uid"].n_unique() == 3
+    assert history["uid"][0] == TableManagerHelper.generate_uid("org-a fib insight-1")
+    snapshots = table_manager.get_snapshots()
+    assert snapshots.select("amount_correct", "report_time").rows() == [
+        (3, "2023-07-09 10:00:00")
+    ]
+    checks = table_manager.select_checks_by_uid(snapshots["uid"][0])
+    assert checks["count"].to_list() == [3]
+    assert table_manager.tables["CountCommits"].df.height == 3
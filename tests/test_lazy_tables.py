@@ -0,0 +1,61 @@
+"""Test that tables are only read by the queries touching them."""
+# pylint: disable = redefined-outer-name
+from collections import Counter
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from gatortracer.check_tables import TableManager
+from gatortracer.table_storage import CsvStorage
+
+
+@pytest.fixture
+def opened_tables(monkeypatch: pytest.MonkeyPatch) -> Counter:
+    """Count the csv files read or scanned, by table name."""
+    opened: Counter = Counter()
+    read, scan = CsvStorage.read, CsvStorage.scan
+
+    def counted_read(storage, path: Path, schema=None):
+        opened[path.stem] += 1
+        return read(storage, path, schema)
+
+    def counted_scan(storage, path: Path, schema=None):
+        opened[path.stem] += 1
+        return scan(storage, path, schema)
+
+    monkeypatch.setattr(CsvStorage, "read", counted_read)
+    monkeypatch.setattr(CsvStorage, "scan", counted_scan)
+    return opened
+
+
+def test_tables_opened_without_reading(example_tables: Path, opened_tables: Counter):
+    """Opening the tables lists them without reading any of them."""
+    table_manager = TableManager(str(example_tables))
+    assert len(table_manager.tables) == 11
+    assert not opened_tables
+
+
+@pytest.mark.parametrize(
+    "with_report, opened", [(False, {"Command"}), (True, {"Command", "MainTable"})]
+)
+def test_query_reads_its_tables(
+    example_tables: Path, opened_tables: Counter, with_report: bool, opened
+):
+    """A query on one check table only reads that table, and main table for reports."""
+    table_manager = TableManager(str(example_tables))
+    checks = table_manager.get_checks_by_attribute_one_table(
+        "status", False, with_report, "Command"
+    )
+    assert set(opened_tables) == opened
+    command = pl.read_csv(example_tables / "CheckTables" / "Command.csv")
+    assert checks.height == command.filter(~pl.col("status")).height
+    assert ("repo-name" in checks.columns) == with_report
+
+
+def test_select_checks_reads_its_tables(example_tables: Path, opened_tables: Counter):
+    """Selecting the checks of one table reads it and the columns of main table."""
+    table_manager = TableManager(str(example_tables))
+    checks = table_manager.select_checks("status == false", table_names=["Command"])
+    assert set(opened_tables) == {"Command", "MainTable"}
+    assert checks.height > 0
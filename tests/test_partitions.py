@@ -0,0 +1,91 @@
+"""Test the tables stored as partitions."""
+import json
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from gatortracer.check_tables import TableManager
+
+
+def insight_matrix(checks) -> pl.DataFrame:
+    """Build a matrix of the same insight file fetched with other checks."""
+    return pl.DataFrame(
+        {
+            "org-name": ["org"],
+            "repo-name": ["repo"],
+            "file-name": ["insight.json"],
+            "insight": [json.dumps({"checks": checks})],
+        }
+    )
+
+
+def test_refetched_report_file(tmp_path: Path):
+    """A file fetched again is only appended with its checks if its content changed."""
+    first = insight_matrix([{"check": "CountCommits", "status": True}])
+    second = insight_matrix(
+        [
+            {"check": "CountCommits", "status": False},
+            {"check": "ConfirmFileExists", "status": True},
+        ]
+    )
+    for matrix in [first, first, second, second]:
+        TableManager(str(tmp_path), partitioned=True).append_table_from_matrix(matrix)
+    table_manager = TableManager(str(tmp_path))
+    first_uid, second_uid = table_manager.tables["MainTable"].df["uid"]
+    count_commits = table_manager.tables["CountCommits"].df
+    assert count_commits.rows() == [(True, first_uid), (False, second_uid)]
+    assert table_manager.tables["ConfirmFileExists"].df["uid"].to_list() == [second_uid]
+
+
+def test_partitions_hold_rows_of_every_append(tmp_path: Path):
+    """Every append writes one partition per table, read back as one table."""
+    for file_name in ["a.json", "b.json"]:
+        TableManager(str(tmp_path), partitioned=True).append_table_from_matrix(
+            insight_matrix([{"check": "CountCommits", "status": True}]).with_columns(
+                pl.lit(file_name).alias("file-name")
+            )
+        )
+    table_manager = TableManager(str(tmp_path))
+    count_commits = table_manager.tables["CountCommits"]
+    assert len(count_commits.partitions()) == 2
+    assert count_commits.df.height == 2
+    assert set(count_commits.df["uid"]) == set(
+        table_manager.tables["MainTable"].df["uid"]
+    )
+
+
+@pytest.mark.parametrize("forget_history", [False, True])
+def test_layouts_store_the_same_rows(tmp_path: Path, forget_history: bool):
+    """Single file and partitioned tables keep the same reports and checks."""
+    matrices = [
+        insight_matrix([{"check": "CountCommits", "status": True}]),
+        insight_matrix([{"check": "CountCommits", "status": True}]),
+        insight_matrix(
+            [
+                {"check": "CountCommits", "status": False},
+                {"check": "ConfirmFileExists", "status": True},
+            ]
+        ),
+        insight_matrix([{"check": "CountCommits", "status": True}]).with_columns(
+            pl.lit("other.json").alias("file-name")
+        ),
+    ]
+    layouts = {}
+    for partitioned in [False, True]:
+        table_dir = tmp_path / str(partitioned)
+        for matrix in matrices:
+            TableManager(
+                str(table_dir), partitioned=partitioned
+            ).append_table_from_matrix(matrix)
+            # Snapshots of tables made before the history existed have no content
+            if forget_history:
+                for history_file in table_dir.rglob("history.*"):
+                    history_file.unlink()
+        # A single file table is kept empty where no partition is written
+        layouts[partitioned] = {
+            table_name: table.df.sort(table.df.columns).rows()
+            for table_name, table in TableManager(str(table_dir)).tables.items()
+            if table.df.height
+        }
+    assert layouts[False] == layouts[True]
@@ -0,0 +1,160 @@
+"""Test the filter expressions."""
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from gatortracer.check_tables import TableManager
+from gatortracer.query import QueryError, QueryFilter
+
+CHECKS = pl.DataFrame(
+    {
+        "status": [True, False, False, None],
+        "count": [1, 2, 3, 4],
+        "repo-name": ["fibonacci", "fib-2", "hello", "fibonacci"],
+        "check type": ["a", "b", "c", "d"],
+    }
+)
+
+
+def matching_counts(expression: str, df: pl.DataFrame = CHECKS):
+    """Filter a frame with an expression and get the counts of matching rows."""
+    return df.filter(QueryFilter(expression).to_expr(df.schema))["count"].to_list()
+
+
+@pytest.mark.parametrize(
+    "expression, counts",
+    [
+        ("status == false", [2, 3]),
+        ("status != false", [1]),
+        ("status == null", [4]),
+        ("count >= 2 and count < 4", [2, 3]),
+        ("count == 1 or count == 4", [1, 4]),
+        ("not count > 1", [1]),
+        ('repo-name ~ "^fib"', [1, 2, 4]),
+        ('status == false and (repo-name ~ "fib" or count == 3)', [2, 3]),
+        ('not (repo-name == "hello") and count > 1', [2, 4]),
+        ("`check type` == 'b'", [2]),
+        ("count == 2.0", [2]),
+        ("count > -1 and status == TRUE or count == 4", [1, 4]),
+    ],
+)
+def test_filter(expression: str, counts):
+    """Conditions are compared and combined with and, or, not and parentheses."""
+    assert matching_counts(expression) == counts
+
+
+def test_and_binds_tighter_than_or():
+    """A or B and C is A or (B and C)."""
+    assert matching_counts("count == 1 or count == 2 and status == true") == [1]
+
+
+def test_columns():
+    """The columns of an expression are collected while parsing."""
+    query_filter = QueryFilter('status == false and (path ~ "a" or `check type` == 1)')
+    assert query_filter.columns == {"status", "path", "check type"}
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["", "status ==", "status == false and", "(status == false", "== 3", "a = 3"],
+)
+def test_invalid_expression(expression: str):
+    """Expressions that can't be parsed are refused."""
+    with pytest.raises(QueryError):
+        QueryFilter(expression)
+
+
+@pytest.mark.parametrize(
+    "expression", ['count == "3"', "status == 1", "repo-name > 3", "status < true"]
+)
+def test_value_of_another_type(expression: str):
+    """A value of another type than its column is refused before querying."""
+    with pytest.raises(QueryError, match="can't be compared"):
+        matching_counts(expression)
+
+
+def test_text_columns_compared_with_true_and_false():
+    """true and false match their text in text columns, as in summaries."""
+    summary = pl.DataFrame({"status": ["true", "false"], "count": [1, 2]})
+    assert matching_counts("status == false", summary) == [2]
+
+
+def test_missing_column():
+    """A column the frame lacks is refused, unless it is taken as null."""
+    query_filter = QueryFilter("path == null or count == 1")
+    with pytest.raises(QueryError, match="no column called path"):
+        query_filter.to_expr(CHECKS.schema)
+    expr = query_filter.to_expr(CHECKS.schema, missing_as_null=True)
+    assert CHECKS.filter(expr)["count"].to_list() == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize(
+    "expression, columns, can_match",
+    [
+        ("status == false", {"status"}, True),
+        ("status == false and path ~ 'a'", {"status"}, False),
+        ("status == false and (path ~ 'a' or command ~ 'b')", {"status", "path"}, True),
+        ("path ~ 'a' or command ~ 'b'", {"status"}, False),
+        ("path == null", {"status"}, True),
+        ("path != null", {"status"}, False),
+        ("not path ~ 'a'", {"status"}, False),
+        ("not (path ~ 'a' and status == false)", {"status"}, True),
+    ],
+)
+def test_can_match(expression: str, columns, can_match: bool):
+    """Rows can only match if the expression isn't false or null without the columns."""
+    assert QueryFilter(expression).can_match(columns) == can_match
+
+
+def test_or_across_check_tables(example_tables: Path):
+    """An or of columns of different check tables selects the checks of both."""
+    table_manager = TableManager(str(example_tables))
+    selected = table_manager.select_checks(
+        'status == false and (path ~ "writing" or command ~ "mypy")'
+    )
+    expected = pl.concat(
+        [
+            table_manager.select_checks('status == false and path ~ "writing"'),
+            table_manager.select_checks('status == false and command ~ "mypy"'),
+        ],
+        how="diagonal",
+    )
+    assert selected.height == expected.height > 0
+    assert set(selected["check type"]) == set(expected["check type"])
+    assert len(set(selected["check type"])) > 1
+
+
+def test_select_checks_refuses_unknown_columns(example_tables: Path):
+    """A column no table has is refused instead of matching nothing."""
+    with pytest.raises(QueryError, match="no table has a column called nosuch"):
+        TableManager(str(example_tables)).select_checks("nosuch == 1")
+
+
+@pytest.mark.parametrize(
+    "where, with_report",
+    [("status == false", True), ('status == false and repo-name ~ "."', False)],
+)
+def test_select_checks_refuses_duplicated_reports(
+    example_tables: Path, where: str, with_report: bool
+):
+    """Checks aren't multiplied by reports sharing their uid."""
+    main_table_path = example_tables / "MainTable.csv"
+    rows = main_table_path.read_text(encoding="utf-8").splitlines()
+    main_table_path.write_text("\n".join(rows + rows[1:]) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="share the same unique identifier"):
+        TableManager(str(example_tables)).select_checks(where, with_report)
+
+
+def test_select_checks_refuses_checks_without_report(example_tables: Path):
+    """Checks without report aren't glued with null reports."""
+    command_path = example_tables / "CheckTables" / "Command.csv"
+    header = command_path.read_text(encoding="utf-8").splitlines()[0]
+    orphan = {"status": "false", "uid": "orphan"}
+    with command_path.open("a", encoding="utf-8") as command_file:
+        command_file.write(",".join(orphan.get(col, "") for col in header.split(",")))
+        command_file.write("\n")
+    table_manager = TableManager(str(example_tables))
+    assert "orphan" in table_manager.select_checks("status == false")["uid"]
+    with pytest.raises(ValueError, match="don't have an insight report"):
+        table_manager.select_checks("status == false", with_report=True)
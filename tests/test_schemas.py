@@ -0,0 +1,102 @@
+"""Test the declared schemas of tables."""
+import json
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from gatortracer.check_tables import SchemaRegistry, TableManager
+from gatortracer.constants import TABLE_FORMATS
+from gatortracer.table_storage import convert_table_dir, get_storage
+
+
+def insight_matrix(file_name: str, **insight) -> pl.DataFrame:
+    """Build a matrix of one insight file."""
+    return pl.DataFrame(
+        {
+            "org-name": ["org"],
+            "repo-name": ["repo"],
+            "file-name": [file_name],
+            "insight": [json.dumps(insight)],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "declared, observed, widened",
+    [
+        (pl.Int64, pl.Int64, pl.Int64),
+        (pl.Int64, pl.Null, pl.Int64),
+        (pl.Null, pl.Boolean, pl.Boolean),
+        (pl.Int64, pl.Float64, pl.Float64),
+        (pl.Int64, pl.Utf8, pl.Utf8),
+        (pl.Boolean, pl.Int64, pl.Utf8),
+    ],
+)
+def test_widen(declared, observed, widened):
+    """A data type is widened to the narrowest one fitting both."""
+    assert SchemaRegistry.widen(declared, observed) == widened
+
+
+def test_evolve_declares_new_columns_and_widens(tmp_path: Path):
+    """The schemas keep the declared columns, add new ones and are saved."""
+    registry = SchemaRegistry(tmp_path)
+    registry.evolve("Command", {"status": pl.Boolean, "count": pl.Int64})
+    registry.evolve("Command", {"count": pl.Float64, "command": pl.Utf8})
+    registry.save()
+    assert SchemaRegistry(tmp_path).get("Command") == {
+        "status": pl.Boolean,
+        "count": pl.Float64,
+        "command": pl.Utf8,
+    }
+
+
+def test_column_widened_across_appends(tmp_path: Path):
+    """A column stored as integers is read as text once text is stored in it."""
+    check = {"check": "CountCommits", "status": True, "count": 3}
+    TableManager(str(tmp_path)).append_table_from_matrix(
+        insight_matrix("a.json", checks=[check])
+    )
+    TableManager(str(tmp_path)).append_table_from_matrix(
+        insight_matrix("b.json", checks=[{**check, "count": "many"}])
+    )
+    count_commits = TableManager(str(tmp_path)).tables["CountCommits"].df
+    assert count_commits.schema["count"] == pl.Utf8
+    assert sorted(count_commits["count"].to_list()) == ["3", "many"]
+
+
+@pytest.mark.parametrize("table_format", TABLE_FORMATS)
+def test_nested_values_stored_as_json(tmp_path: Path, table_format: str):
+    """Lists and objects are stored as json text, also in csv tables."""
+    matrix = insight_matrix(
+        "a.json",
+        tags=["a", "b"],
+        author={"name": "x"},
+        checks=[{"check": "ConfirmFileExists", "status": True, "paths": ["x"]}],
+    )
+    for _ in range(2):
+        TableManager(str(tmp_path), table_format).append_table_from_matrix(matrix)
+    table_manager = TableManager(str(tmp_path))
+    reports = table_manager.tables["MainTable"].df
+    assert reports.select("tags", "author").rows() == [('["a", "b"]', '{"name": "x"}')]
+    checks = table_manager.tables["ConfirmFileExists"].df
+    assert checks["paths"].to_list() == ['["x"]']
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+@pytest.mark.parametrize("table_format", ["parquet", "ipc"])
+def test_convert_csv_tables_as_declared(
+    tmp_path: Path, table_format: str, partitioned: bool
+):
+    """Text looking like numbers stays text once csv tables are converted."""
+    csv_dir, converted_dir = tmp_path / "csv", tmp_path / "converted"
+    check = {"check": "ConfirmFileExists", "status": True, "file": "007"}
+    TableManager(str(csv_dir), "csv", partitioned).append_table_from_matrix(
+        insight_matrix("a.json", section="010", checks=[check])
+    )
+    assert convert_table_dir(csv_dir, converted_dir, get_storage(table_format)) == 2
+    table_manager = TableManager(str(converted_dir))
+    assert table_manager.tables["MainTable"].df["section"].to_list() == ["010"]
+    checks = table_manager.tables["ConfirmFileExists"].df
+    assert checks.schema["file"] == pl.Utf8
+    assert checks["file"].to_list() == ["007"]
@@ -0,0 +1,44 @@
+"""Test the summaries kept next to the tables."""
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import SUMMARY_KEYS, TableManager
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_incremental_summaries_match_rebuild(tmp_path: Path, partitioned: bool):
+    """Summaries updated by every append count the same as summaries rebuilt."""
+    # Later matrices refetch some files with other checks and add new files
+    for matrix in [
+        synthetic_matrix(60, seed=0).head(40),
+        synthetic_matrix(60, seed=1).tail(40),
+        synthetic_matrix(80, seed=2).tail(30),
+    ]:
+        TableManager(str(tmp_path), partitioned=partitioned).append_table_from_matrix(
+            matrix
+        )
+    table_manager = TableManager(str(tmp_path))
+    incremental = {name: table_manager.summaries.read(name) for name in SUMMARY_KEYS}
+    table_manager.summaries.rebuild(table_manager.tables)
+    for summary_name, summary in incremental.items():
+        assert summary.frame_equal(table_manager.summaries.read(summary_name))
+
+
+def test_summaries_count_reports_and_checks(tmp_path: Path):
+    """The summaries add up to the rows of the tables."""
+    TableManager(str(tmp_path)).append_table_from_matrix(synthetic_matrix(50))
+    table_manager = TableManager(str(tmp_path))
+    check_amount = sum(
+        table.df.height
+        for table_name, table in table_manager.tables.items()
+        if table_name != "MainTable"
+    )
+    assert table_manager.get_summary("checks")["checks"].sum() == check_amount
+    repos = table_manager.get_summary("repos")
+    assert repos["reports"].sum() == 50
+    assert repos["checks"].sum() == check_amount
+    assert (repos["passed"] + repos["failed"]).sum() == check_amount
+    days = table_manager.get_summary("days", 'org-name == "org-0"')
+    assert days["org-name"].unique().to_list() == ["org-0"]
@@ -0,0 +1,74 @@
+"""Test flattening the fetched trees of insights."""
+import pytest
+
+from benchmarks.flatten_tree import deepcopy_flatten
+from benchmarks.synthetic import synthetic_tree
+from gatortracer.json_fetch import TreeDict
+
+TREE = {
+    "organizations": [
+        {
+            "org-name": "org-a",
+            "repositories": [
+                {
+                    "repo-name": "fib",
+                    "insights": [
+                        {"file-name": "insight-1", "insight": "{}"},
+                        {"file-name": "insight-2", "insight": "[]"},
+                    ],
+                },
+                {"repo-name": "empty", "insights": []},
+            ],
+        },
+        {
+            "org-name": "org-b",
+            "repositories": [
+                {
+                    "repo-name": "sum",
+                    "insights": [{"file-name": "insight-1", "insight": "{}"}],
+                }
+            ],
+        },
+    ]
+}
+
+
+def test_flatten_leaves_with_their_parents():
+    """Every leaf is a row led by the values of its parents, in order."""
+    assert TreeDict(TREE).to_flatten_columns() == {
+        "org-name": ["org-a", "org-a", "org-b"],
+        "repo-name": ["fib", "fib", "sum"],
+        "file-name": ["insight-1", "insight-2", "insight-1"],
+        "insight": ["{}", "[]", "{}"],
+    }
+
+
+def test_flatten_as_the_recursive_flattener():
+    """The matrix is the one the former recursive flattener built."""
+    tree = synthetic_tree(20, files_per_repo=5, checks_per_file=3, org_amount=3)
+    assert TreeDict(tree).to_flatten_matrix() == deepcopy_flatten(tree)
+
+
+def test_flatten_deeper_than_the_recursion_limit():
+    """Trees are flattened without recursion, however deep they are."""
+    depth = 5000
+    tree = leaf = {}
+    for level in range(depth):
+        leaf["nested"] = [{f"level-{level}": level}]
+        leaf = leaf["nested"][0]
+    title, rows = TreeDict(tree).flatten()
+    assert title == [f"level-{level}" for level in range(depth)]
+    assert rows == [tuple(range(depth))]
+
+
+def test_flatten_without_leaf():
+    """A tree without insight files can't be flattened."""
+    with pytest.raises(ValueError, match="No insight files"):
+        TreeDict({"organizations": []}).to_flatten_columns()
+
+
+def test_leaves_with_other_keys():
+    """Leaves with other keys don't make columns of the same length."""
+    tree = {"insights": [{"file-name": "a"}, {"file-name": "b", "insight": "{}"}]}
+    with pytest.raises(ValueError, match="same keys"):
+        TreeDict(tree).to_flatten_columns()
@@ -0,0 +1,96 @@
+"""Test the uid index of check tables."""
+import json
+from pathlib import Path
+
+import polars as pl
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import TableManager
+
+# A report of the example tables with checks in several check tables
+EXAMPLE_UID = "cZdEgIWQoeIofDdrYH/Afg=="
+
+
+def scanned_checks(table_manager: TableManager, uid: str) -> pl.DataFrame:
+    """Find the checks of a report by scanning every check table."""
+    check_dfs = [
+        table.lazy().filter(pl.col("uid") == uid).collect()
+        for table_name, table in table_manager.tables.items()
+        if table_name != "MainTable"
+    ]
+    return pl.concat(check_dfs, how="diagonal").unique()
+
+
+def test_append_indexes_tables_written_before_index(example_tables: Path):
+    """An append to tables without index indexes the check tables it doesn't touch."""
+    expected = scanned_checks(TableManager(str(example_tables)), EXAMPLE_UID)
+    assert expected.height == 26
+    # Only a few check types are in the new matrix
+    TableManager(str(example_tables)).append_table_from_matrix(
+        synthetic_matrix(5, checks_per_file=2)
+    )
+    table_manager = TableManager(str(example_tables))
+    indexed = table_manager.select_indexed_checks_by_uid(EXAMPLE_UID)
+    assert indexed is not None
+    assert indexed.height == expected.height
+    assert table_manager.select_checks_by_uid(EXAMPLE_UID).height == expected.height
+
+
+def test_indexed_lookup_matches_scan(tmp_path: Path):
+    """Every report is found with the index as by scanning, across appends."""
+    matrix = synthetic_matrix(40)
+    for batch in [matrix.head(20), matrix.tail(20)]:
+        TableManager(str(tmp_path)).append_table_from_matrix(batch)
+    table_manager = TableManager(str(tmp_path))
+    uids = table_manager.tables["MainTable"].df["uid"].to_list()
+    assert len(uids) == 40
+    for uid in uids[::7]:
+        indexed = table_manager.select_indexed_checks_by_uid(uid)
+        expected = scanned_checks(table_manager, uid)
+        assert indexed is not None
+        assert indexed.sort(indexed.columns).frame_equal(
+            expected.select(indexed.columns).sort(indexed.columns)
+        )
+
+
+def test_outdated_index_falls_back_to_scan(tmp_path: Path):
+    """Tables changed behind the back of the index are scanned instead."""
+    TableManager(str(tmp_path)).append_table_from_matrix(synthetic_matrix(10))
+    table_manager = TableManager(str(tmp_path))
+    uid = table_manager.tables["MainTable"].df["uid"][0]
+    expected = scanned_checks(table_manager, uid)
+    # Reverse the rows of every check table without updating the index
+    for check_file in (tmp_path / "CheckTables").glob("*.csv"):
+        pl.read_csv(check_file).reverse().write_csv(check_file)
+    table_manager = TableManager(str(tmp_path))
+    assert table_manager.select_indexed_checks_by_uid(uid) is None
+    assert table_manager.select_checks_by_uid(uid).height == expected.height
+
+
+def test_first_append_leaves_older_tables_as_they_are(tmp_path: Path):
+    """Indexing the tables of an older version neither rewrites nor retypes them."""
+    (tmp_path / "CheckTables").mkdir()
+    (tmp_path / "MainTable.csv").write_text(
+        "org-name,repo-name,file-name,uid\norg-a,fib,insight-1,old-uid\n",
+        encoding="utf-8",
+    )
+    check_path = tmp_path / "CheckTables" / "ConfirmFileExists.csv"
+    older_checks = "status,file,uid\ntrue,007,old-uid\nfalse,0.50,old-uid\n"
+    check_path.write_text(older_checks, encoding="utf-8")
+    new_insight = {
+        "checks": [{"check": "CountCommits", "status": True, "options": {"count": 3}}]
+    }
+    TableManager(str(tmp_path)).append_table_from_matrix(
+        pl.DataFrame(
+            {
+                "org-name": ["org-a"],
+                "repo-name": ["fib"],
+                "file-name": ["insight-2"],
+                "insight": [json.dumps(new_insight)],
+            }
+        )
+    )
+    assert check_path.read_text(encoding="utf-8") == older_checks
+    checks = TableManager(str(tmp_path)).select_indexed_checks_by_uid("old-uid")
+    assert checks is not None
+    assert checks.height == 2
@@ -0,0 +1,112 @@
+"""Test that the uids and tables are the same as before ingestion was batched."""
+import json
+from pathlib import Path
+
+import polars as pl
+
+from gatortracer.check_tables import TableManager
+
+# The tables the row by row ingestion wrote for the matrix below, rows sorted
+BASELINE_TABLES = Path(__file__).parent / "data" / "baseline_tables"
+
+# Insights with differing metadata, several checks of a type and line breaks
+INSIGHTS = [
+    {
+        "amount_correct": 2,
+        "report_time": "2023-07-01 10:00:00",
+        "checks": [
+            {
+                "check": "ConfirmFileExists",
+                "status": True,
+                "options": {"file": "README.md"},
+            },
+            {
+                "description": "Run pytest\nwith coverage",
+                "command": "pytest",
+                "status": False,
+            },
+        ],
+    },
+    {
+        "amount_correct": 1,
+        "percentage_score": 50,
+        "report_time": "2023-07-02 11:30:00",
+        "checks": [
+            {"check": "CountCommits", "status": True, "options": {"count": 3}},
+            {
+                "check": "ConfirmFileExists",
+                "status": False,
+                "options": {"file": "setup.py"},
+            },
+        ],
+    },
+    {
+        "amount_correct": 0,
+        "checks": [{"description": "Lint", "command": "mypy .", "status": False}],
+    },
+    {
+        "amount_correct": 3,
+        "percentage_score": 75,
+        "name": "fib",
+        "report_time": "2023-07-03 09:15:42",
+        "checks": [
+            {"check": "CountCommits", "status": True, "options": {"count": 7}},
+            {"check": "CountCommits", "status": True, "options": {"count": 8}},
+            {
+                "check": "MatchFileFragment",
+                "status": True,
+                "options": {"fragment": "def", "file": "a.py"},
+            },
+        ],
+    },
+    {
+        "amount_correct": 1,
+        "report_time": "2023-07-04 00:00:01",
+        "checks": [
+            {
+                "check": "ConfirmFileExists",
+                "status": True,
+                "options": {"file": "README.md"},
+            },
+        ],
+    },
+]
+
+
+def insight_matrix() -> pl.DataFrame:
+    """Build the matrix of insight files of three repositories."""
+    return pl.DataFrame(
+        {
+            "org-name": ["org-a", "org-a", "org-b", "org-b", "org-b"],
+            "repo-name": ["fib", "fib", "hello", "hello", "world"],
+            "file-name": ["insight-1", "insight-2", "insight-1", "insight-2", "x"],
+            "insight": [json.dumps(insight) for insight in INSIGHTS],
+        }
+    )
+
+
+def sorted_lines(table_path: Path) -> list:
+    """Read the header and the sorted rows of a csv table."""
+    header, *rows = table_path.read_text(encoding="utf-8").splitlines()
+    return [header, *sorted(rows)]
+
+
+def test_tables_identical_to_row_by_row_ingestion(tmp_path: Path):
+    """The uids and every table are byte for byte the ones written row by row."""
+    TableManager(str(tmp_path)).append_table_from_matrix(insight_matrix())
+    baseline_paths = sorted(BASELINE_TABLES.rglob("*.csv"))
+    assert [path.relative_to(BASELINE_TABLES) for path in baseline_paths] == sorted(
+        path.relative_to(tmp_path) for path in tmp_path.rglob("*.csv")
+    )
+    for baseline_path in baseline_paths:
+        table_path = tmp_path / baseline_path.relative_to(BASELINE_TABLES)
+        assert sorted_lines(table_path) == sorted_lines(baseline_path)
+
+
+def test_refetched_files_keep_their_uids(tmp_path: Path):
+    """Appending the same files again adds no report nor check."""
+    TableManager(str(tmp_path)).append_table_from_matrix(insight_matrix())
+    TableManager(str(tmp_path)).append_table_from_matrix(insight_matrix())
+    for baseline_path in BASELINE_TABLES.rglob("*.csv"):
+        table_path = tmp_path / baseline_path.relative_to(BASELINE_TABLES)
+        assert sorted_lines(table_path) == sorted_lines(baseline_path)
@@ -0,0 +1,51 @@
+"""Test parsing insight matrices with a pool of worker processes."""
+import json
+from pathlib import Path
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from benchmarks.synthetic import synthetic_matrix
+from gatortracer.check_tables import TableManager, TableManagerHelper
+
+
+def test_workers_store_what_one_process_stores(tmp_path: Path):
+    """Tables and their schemas are the same however many workers parse the matrix."""
+    matrix = synthetic_matrix(60, checks_per_file=6)
+    table_managers = {}
+    for workers in [1, 3]:
+        table_dir = tmp_path / str(workers)
+        TableManager(str(table_dir), workers=workers).append_table_from_matrix(matrix)
+        table_managers[workers] = TableManager(str(table_dir))
+    serial, parallel = table_managers[1], table_managers[3]
+    assert parallel.tables.keys() == serial.tables.keys()
+    # Deduplicating the rows of a table doesn't keep their order
+    for table_name, table in serial.tables.items():
+        assert_frame_equal(
+            parallel.tables[table_name].df.sort(table.df.columns),
+            table.df.sort(table.df.columns),
+        )
+        assert parallel.schemas.get(table_name) == serial.schemas.get(table_name)
+
+
+@pytest.mark.parametrize(
+    "counts, dtype",
+    [
+        ([None, 3, 4], pl.Int64),
+        ([3, 4.5, None], pl.Float64),
+        ([True, "many", None], pl.Utf8),
+    ],
+)
+def test_shards_typed_as_one_column(counts, dtype):
+    """A column is typed as if the shards were parsed together, one shard per value."""
+    insights = pl.Series(
+        [
+            json.dumps({"checks": [{"check": "CountCommits", "count": count}]})
+            for count in counts
+        ]
+    )
+    _, serial = TableManagerHelper.triage_matrix(insights)
+    _, parallel = TableManagerHelper.triage_matrix(insights, workers=3)
+    assert parallel["CountCommits"].schema["count"] == dtype
+    assert_frame_equal(parallel["CountCommits"], serial["CountCommits"])